@@ -4,17 +4,38 @@ import json
 import os
 import time
 import copy
-from zipfile import ZipFile
-import boto3
-from botocore.exceptions import ClientError
+import io
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+from boto3.s3.transfer import TransferConfig
+from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError, BotoCoreError
 from helpers.datasets import QSDataSetDef
 from helpers.analysis import QSAnalysisDef
+from helpers.graph import QSAssetGraph
 from helpers.datasources import SourceType, QSDataSourceDef, QSServiceDatasourceDef, QSRDSDatasourceDef, QSRDBMSDatasourceDef
 from helpers.datasets import ImportMode
+from helpers.cache import QSDescribeCache
+from helpers.metadata_store import LocalFileMetadataStore, S3MetadataStore
+from helpers.executor import AWSCallExecutor
+from helpers.clients import AWSClientRegistry
+from helpers.dynamo import DynamoTable
+from helpers.skeletons import SkeletonRegistry, copyTree
+from helpers.serialization import dumpYaml, loadJson, sortKeys
+from helpers.template_builder import TemplateBuilder
+from helpers.parameter_index import ParameterIndex
+from helpers.stack_packing import PackingUnit, packResourceGroups, findReferences, findDependencyCycle, findConnectedGroups
+from helpers.emitter import FileSink, S3MultipartSink, streamYaml, streamJson
+from helpers.artifacts import hashFile, hashYaml, isUnchanged, ZipArtifact, ETagCache, CapturingReader
+from helpers.incremental import S3SynthesisStateStore, getResourceOwnership, getOutputOwnership, mergeTemplates
+from helpers.template_diff import TemplateDiff, reuseVolatileValues
+from helpers.export_jobs import ExportJobPending, S3ExportJobStore, JitteredBackoff, pollExportJob, runExportJob
+from helpers.export_stub import LocalAssetBundleExportStub, STUB_URL_SCHEME
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 from dateutil.tz import tz
 from urllib.request import urlretrieve
+from urllib.parse import quote
 
 utc = tz.gettz('UTC')
 utc_now = datetime.now(tz=utc)
@@ -39,6 +60,60 @@ PARAMETER_DEFINITION_TABLE_NAME = 'QSAssetParameters-{pipelineName}'.format(pipe
 TRACKED_ASSETS_TABLE_NAME = 'QSTrackedAssets-{pipelineName}'.format(pipelineName=PIPELINE_NAME)
 CONFIGURATION_FILES_PREFIX = '{pipeline_name}/ConfigFiles'.format(pipeline_name=PIPELINE_NAME)
 ASSETS_FILES_PREFIX = '{pipeline_name}/CFNTemplates'.format(pipeline_name=PIPELINE_NAME)
+DISCOVERY_MAX_WORKERS = int(os.environ['DISCOVERY_MAX_WORKERS']) if 'DISCOVERY_MAX_WORKERS' in os.environ else 4
+RESOLVER_MAX_WORKERS = int(os.environ['RESOLVER_MAX_WORKERS']) if 'RESOLVER_MAX_WORKERS' in os.environ else 8
+METADATA_CACHE_STORE = os.environ['METADATA_CACHE_STORE'] if 'METADATA_CACHE_STORE' in os.environ else 'S3'
+METADATA_CACHE_KEY = '{pipeline_name}/MetadataCache/qs_metadata_cache.json'.format(pipeline_name=PIPELINE_NAME)
+METADATA_CACHE_LOCAL_PATH = os.environ['METADATA_CACHE_LOCAL_PATH'] if 'METADATA_CACHE_LOCAL_PATH' in os.environ else '/tmp/qs_metadata_cache.json'
+# JSON object of client side rate limits in requests per second, keyed by service ('quicksight') or by operation ('quicksight.describe_data_set')
+AWS_API_RATE_LIMITS = json.loads(os.environ['AWS_API_RATE_LIMITS']) if 'AWS_API_RATE_LIMITS' in os.environ else {}
+AWS_API_MAX_RETRIES = int(os.environ['AWS_API_MAX_RETRIES']) if 'AWS_API_MAX_RETRIES' in os.environ else 5
+AWS_CLIENT_MAX_POOL_CONNECTIONS = int(os.environ['AWS_CLIENT_MAX_POOL_CONNECTIONS']) if 'AWS_CLIENT_MAX_POOL_CONNECTIONS' in os.environ else 32
+INCREMENTAL_SYNTHESIS = os.environ['INCREMENTAL_SYNTHESIS'] if 'INCREMENTAL_SYNTHESIS' in os.environ else 'true'
+# Artifacts whose content hash matches the one of the object already in S3 are not uploaded again (which would also trigger the pipeline again)
+SKIP_UNCHANGED_ARTIFACTS = os.environ['SKIP_UNCHANGED_ARTIFACTS'] if 'SKIP_UNCHANGED_ARTIFACTS' in os.environ else 'true'
+# Budgets of each nested stack group, resources are packed into as few groups as possible without exceeding them (CFN allows 1MB, 500 resources and 200 parameters per template)
+NESTED_STACK_MAX_BYTES = int(os.environ['NESTED_STACK_MAX_BYTES']) if 'NESTED_STACK_MAX_BYTES' in os.environ else 900 * 1024
+NESTED_STACK_MAX_RESOURCES = int(os.environ['NESTED_STACK_MAX_RESOURCES']) if 'NESTED_STACK_MAX_RESOURCES' in os.environ else 200
+NESTED_STACK_MAX_PARAMETERS = int(os.environ['NESTED_STACK_MAX_PARAMETERS']) if 'NESTED_STACK_MAX_PARAMETERS' in os.environ else 180
+# DEPLOY artifacts are zipped in memory up to ARTIFACT_SPOOL_MAX_MEMORY bytes (then in a temporary file) and uploaded in parts of ARTIFACT_MULTIPART_PART_SIZE bytes
+ARTIFACT_SPOOL_MAX_MEMORY = int(os.environ['ARTIFACT_SPOOL_MAX_MEMORY']) if 'ARTIFACT_SPOOL_MAX_MEMORY' in os.environ else 64 * 1024 * 1024
+ARTIFACT_MULTIPART_PART_SIZE = int(os.environ['ARTIFACT_MULTIPART_PART_SIZE']) if 'ARTIFACT_MULTIPART_PART_SIZE' in os.environ else 8 * 1024 * 1024
+ARTIFACT_UPLOAD_MAX_CONCURRENCY = int(os.environ['ARTIFACT_UPLOAD_MAX_CONCURRENCY']) if 'ARTIFACT_UPLOAD_MAX_CONCURRENCY' in os.environ else 4
+DYNAMODB_SCAN_SEGMENTS = int(os.environ['DYNAMODB_SCAN_SEGMENTS']) if 'DYNAMODB_SCAN_SEGMENTS' in os.environ else 1
+PARAMETER_DEFINITION_KEY_ATTRIBUTES = ['StageName', 'AssetType']
+# Parameter definitions are sharded, one item per parameter with sort key <assetType>#PARAM#<ParameterKey> next to the <assetType> manifest item
+PARAMETER_SHARD_SEPARATOR = '#PARAM#'
+PARAMETER_SHARDED_LAYOUT = 'SHARDED'
+PARAMETER_DEFINITION_MAX_WORKERS = int(os.environ['PARAMETER_DEFINITION_MAX_WORKERS']) if 'PARAMETER_DEFINITION_MAX_WORKERS' in os.environ else 8
+TRACKED_ASSETS_KEY_ATTRIBUTES = ['AssetId', 'AssetType']
+# Objects up to this size are kept in memory between warm invocations (up to S3_OBJECT_CACHE_MAX_BYTES in total) and only fetched again when their
+# ETag changes, the ones not cached are prefetched by S3_DOWNLOAD_MAX_WORKERS threads while the previous objects are being zipped
+S3_OBJECT_CACHE_MAX_OBJECT_SIZE = 1024 * 1024
+# Assumed role credentials are reused by warm invocations while they stay valid for longer than this (more than an invocation can last)
+ASSUMED_ROLE_MIN_VALIDITY_SECONDS = int(os.environ['ASSUMED_ROLE_MIN_VALIDITY_SECONDS']) if 'ASSUMED_ROLE_MIN_VALIDITY_SECONDS' in os.environ else 900
+S3_OBJECT_CACHE_MAX_BYTES = int(os.environ['S3_OBJECT_CACHE_MAX_BYTES']) if 'S3_OBJECT_CACHE_MAX_BYTES' in os.environ else 16 * 1024 * 1024
+S3_DOWNLOAD_MAX_WORKERS = int(os.environ['S3_DOWNLOAD_MAX_WORKERS']) if 'S3_DOWNLOAD_MAX_WORKERS' in os.environ else 4
+NESTED_STACK_UPLOAD_MAX_WORKERS = int(os.environ['NESTED_STACK_UPLOAD_MAX_WORKERS']) if 'NESTED_STACK_UPLOAD_MAX_WORKERS' in os.environ else 8
+SYNTHESIS_STATE_KEY = '{pipeline_name}/SynthesisState/qs_synthesis_state.yaml'.format(pipeline_name=PIPELINE_NAME)
+SYNTHESIS_STATE_VERSION = 2
+# Seconds an invocation waits for the Assets as Bundle export job, once they elapse the job is left running and a later invocation resumes it (0 only starts the job)
+AAB_EXPORT_MAX_WAIT_SECONDS = float(os.environ['AAB_EXPORT_MAX_WAIT_SECONDS']) if 'AAB_EXPORT_MAX_WAIT_SECONDS' in os.environ else 155
+AAB_EXPORT_POLL_INITIAL_SECONDS = float(os.environ['AAB_EXPORT_POLL_INITIAL_SECONDS']) if 'AAB_EXPORT_POLL_INITIAL_SECONDS' in os.environ else 2
+AAB_EXPORT_POLL_MAX_SECONDS = float(os.environ['AAB_EXPORT_POLL_MAX_SECONDS']) if 'AAB_EXPORT_POLL_MAX_SECONDS' in os.environ else 30
+# Time of the invocation kept to process the bundle once the export job is SUCCESSFUL, the export job is never waited for past it
+AAB_EXPORT_DEADLINE_MARGIN_MS = int(os.environ['AAB_EXPORT_DEADLINE_MARGIN_MS']) if 'AAB_EXPORT_DEADLINE_MARGIN_MS' in os.environ else 90000
+# QUICKSIGHT or STUB, the stub (local executions) exports AAB_EXPORT_STUB_BUNDLE AAB_EXPORT_STUB_DURATION_SECONDS after the job is started
+AAB_EXPORT_API = os.environ['AAB_EXPORT_API'] if 'AAB_EXPORT_API' in os.environ else 'QUICKSIGHT'
+AAB_EXPORT_STUB_BUNDLE = os.environ['AAB_EXPORT_STUB_BUNDLE'] if 'AAB_EXPORT_STUB_BUNDLE' in os.environ else 'aab_export_stub_bundle.json'
+AAB_EXPORT_STUB_DURATION_SECONDS = float(os.environ['AAB_EXPORT_STUB_DURATION_SECONDS']) if 'AAB_EXPORT_STUB_DURATION_SECONDS' in os.environ else 30
+AAB_EXPORT_STUB_STATE_PATH = '/tmp/qs_export_stub_jobs.json'
+# Times the function invokes itself asynchronously to resume the same export job, once reached the job is resumed by the next invocation of the function
+AAB_EXPORT_MAX_RESUMES = int(os.environ['AAB_EXPORT_MAX_RESUMES']) if 'AAB_EXPORT_MAX_RESUMES' in os.environ else 10
+RESUME_EXPORT_JOB_EVENT_KEY = 'ResumeExportJob'
+EXPORT_JOB_KEY = '{pipeline_name}/ExportJobs/qs_export_job.json'.format(pipeline_name=PIPELINE_NAME)
+REFRESH_SCHEDULE_REQUIRED_FIELDS = ['ScheduleId', 'RefreshType', 'ScheduleFrequency']
+REFRESH_SCHEDULE_FREQUENCY_REQUIRED_FIELDS = ['Interval', 'Timezone']
 
 
 DEPLOYMENT_DEV_ACCOUNT_ROLE_ARN = 'arn:aws:iam::{deployment_account_id}:role/DevAccountS3AccessRole-QSCICD-{pipeline_name}'.format(deployment_account_id=DEPLOYMENT_ACCOUNT_ID, pipeline_name=PIPELINE_NAME)
@@ -51,33 +126,80 @@ except FileExistsError:
     print('Output dir {output_dir} already exists, skipping'.format(output_dir=OUTPUT_DIR))
 
 
-qs = boto3.client('quicksight', region_name=AWS_REGION)
+# Credentials of the roles assumed by previous (warm) invocations keyed by role ARN, reusing them lets the clients and bucket ownership checks (cached
+# per credentials) be reused too
+assumed_role_credentials = {}
 
+# Contents of the small S3 objects fetched by previous (warm) invocations, keyed by the ETag they had
+object_contents = ETagCache(maxBytes=S3_OBJECT_CACHE_MAX_BYTES)
 
-def generateQSTemplateCFN(analysisDefObj:QSAnalysisDef, appendContent:dict):
+# CFN skeletons are parsed once per container, generators get their own copy of each skeleton
+skeletons = SkeletonRegistry()
+
+# Every QuickSight, S3 and DynamoDB call goes through the same executor so rate limits, concurrency and retries are enforced across all the worker threads
+aws_executor = AWSCallExecutor(rateLimits=AWS_API_RATE_LIMITS, maxRetries=AWS_API_MAX_RETRIES)
+
+# Clients are built once per service, region and credentials (pooled keep-alive connections shared by all the worker threads) and survive warm invocations
+aws_clients = AWSClientRegistry(executor=aws_executor, maxPoolConnections=AWS_CLIENT_MAX_POOL_CONNECTIONS)
+
+# All describe/list calls are memoized per invocation, discovery and CFN generation request the same datasets, datasources and refresh schedules several times.
+# Cache hits are served before reaching the executor so they don't consume rate limit tokens
+qs = QSDescribeCache(client=aws_clients.getClient('quicksight', region=AWS_REGION))
+
+# Assets as Bundle export calls go to a local stub instead of QuickSight when AAB_EXPORT_API is STUB
+export_stub = LocalAssetBundleExportStub(bundleFile=AAB_EXPORT_STUB_BUNDLE, durationSeconds=AAB_EXPORT_STUB_DURATION_SECONDS, stateFile=AAB_EXPORT_STUB_STATE_PATH) if AAB_EXPORT_API == 'STUB' else None
+
+
+def get_analysis_version_suffix(analysisObj:QSAnalysisDef):
+    """
+    Helper function that returns the version suffix of the template VersionDescription and the analysis Updated tag. It is the LastUpdatedTime of
+    the source analysis, so they only change (and the template and analysis are only updated) when the analysis was edited. Falls back to the
+    current time when the analysis didn't report it
+
+    Parameters:
+
+    analysisObj(QSAnalysisDef): Analysis object
+
+    Returns:
+
+    suffix(str): Version suffix formatted as '%d-%m-%y-%H-%M-%S'
+
+    Examples:
+
+    >>> get_analysis_version_suffix(analysisObj=analysisObj)
+
+    """
+
+    last_updated = analysisObj.LastUpdatedTime
+    if last_updated is None:
+        last_updated = datetime.now(tz=utc)
+    elif type(last_updated) is str:
+        last_updated = datetime.fromisoformat(last_updated)
+    return last_updated.astimezone(utc).strftime('%d-%m-%y-%H-%M-%S')
+
+def generateQSTemplateCFN(analysisDefObj:QSAnalysisDef, builder:TemplateBuilder):
     """Function that generates a Cloudformation AWS::QuickSight::Template resource https://a.co/7A8bfh7
     synthesized from a given analysisName
 
     Parameters:
     analysisDefObj (QSAnalysisDef): Analysis name that will be templated   
-    appendContent(dict): Dictionary that represents the CFN template object (already built by other methods) where we want to append elements
+    builder(TemplateBuilder): Builder of the CFN template object (already built by other methods) where we want to append elements
 
     Returns:
-    dict: appendContent Object that represents the synthesized CFN template 
+    TemplateBuilder: builder of the synthesized CFN template 
 
     Example:
     >>> generateQSTemplateCFN('Analysis Name', {'Dataset1': 'DatasetPlaceholder1', 'Dataset2': 'DatasetPlaceholder2'}, 'Analysis ARN')
 
     """
    
-    template_version = 'QS_CI_CD_TEMPLATE_ANALYSIS_{analysis_id}_{suffix}'.format(suffix=utc_now.strftime('%d-%m-%y-%H-%M-%S'), analysis_id=analysisDefObj.id)
+    template_version = 'QS_CI_CD_TEMPLATE_ANALYSIS_{analysis_id}_{suffix}'.format(suffix=get_analysis_version_suffix(analysisDefObj), analysis_id=analysisDefObj.id)
 
-    if appendContent is None:
-        print("Append content is None")
-        raise ValueError("Error in createTemplateFromAnalysis:generateQSTemplateCFN, Append content is None")
+    if builder is None:
+        print("Template builder is None")
+        raise ValueError("Error in createTemplateFromAnalysis:generateQSTemplateCFN, Template builder is None")
 
-    with open('resources/template_resource_CFN_skel.yaml', 'r') as file:
-        yaml_template = yaml.safe_load(file)
+    yaml_template = skeletons.get('template_resource_CFN_skel.yaml')
 
     template_properties = yaml_template['Properties']
     analysis_id = analysisDefObj.id
@@ -110,9 +232,9 @@ def generateQSTemplateCFN(analysisDefObj:QSAnalysisDef, appendContent:dict):
 
     template_properties['SourceEntity']['SourceAnalysis']['DataSetReferences'] = dataset_ref_list
 
-    appendContent['Resources'][templateCFNResourceId] = yaml_template
+    builder.addResource(templateCFNResourceId, yaml_template)
 
-    return appendContent
+    return builder
 
 def generateDataSourceObject(datasourceId:str, datasourceIndex:int):
     
@@ -168,256 +290,252 @@ def generateDataSourceObject(datasourceId:str, datasourceIndex:int):
     return dataSourceDefObj
 
         
-def generateDataSourceCFN(datasourceDefObj: QSDataSourceDef, appendContent:dict, remap:bool):
+def generateDataSourceCFN(datasourceDefObj: QSDataSourceDef, builder:TemplateBuilder, remap:bool):
     """
     Function that generates a Cloudformation AWS::QuickSight::DataSource resource https://a.co/2xRL70Q
     synthesized from the source environment account
 
     Parameters:
     datasourceDefObj (QSDataSourceDef): Datasource definition object encapsulating info of the datasource to create
-    appendContent (dict): Dictionary that represents the CFN template object (already built by other methods) where we want to append elements    
+    builder (TemplateBuilder): Builder of the CFN template object (already built by other methods) where we want to append elements. If the datasource
+    cannot be synthesized the resource and parameters added for it are rolled back before the error is raised
     remap (bool): Whether or not the datasource connection parameters (host, port, Athena workgroup ...) should be remapped
 
     
     Returns:
-    dict: appendContent Object that represents the synthesized CFN template 
-    object: dataSourceDefObj helper datasource object representing the datasource object
+    TemplateBuilder: builder of the synthesized CFN template 
 
    
     """
 
-    originalAppendContent = copy.deepcopy(appendContent)
-    
     datasourceName = datasourceDefObj.name
     properties = {}
     RDMBS_DS = [SourceType.AURORA.name, SourceType.AURORA_POSTGRESQL.name,SourceType.MYSQL.name,SourceType.MARIADB.name,SourceType.ORACLE.name,SourceType.SQLSERVER.name, SourceType.REDSHIFT.name, SourceType.RDS.name]
     
     
-    if appendContent is None:
-        print("Append content is None")
-        raise ValueError("Error in createTemplateFromAnalysis:generateDataSourceCFN, Append content is None")
-                
-    with open('resources/datasource_resource_CFN_skel.yaml', 'r') as file:
-        yaml_datasource = yaml.safe_load(file)        
+    if builder is None:
+        print("Template builder is None")
+        raise ValueError("Error in createTemplateFromAnalysis:generateDataSourceCFN, Template builder is None")
     
     datasourceIdKey = datasourceDefObj.CFNId
     index = datasourceDefObj.index
-    appendContent['Resources'][datasourceIdKey] = yaml_datasource
-    properties = appendContent['Resources'][datasourceIdKey]['Properties']  
 
-    if datasourceIdKey in originalAppendContent['Resources']:
+    if builder.hasResource(datasourceIdKey):
         print('Datasource with CFNId {cfn_id} already exists, skipping'.format(cfn_id=datasourceIdKey)) 
-        return originalAppendContent
+        return builder
 
-    properties['DataSourceId'] = datasourceDefObj.id    
-    properties['Name'] = datasourceDefObj.name
+    with builder.transaction():
+        yaml_datasource = builder.addResource(datasourceIdKey, skeletons.get('datasource_resource_CFN_skel.yaml'))
+        properties = yaml_datasource['Properties']  
+
+        properties['DataSourceId'] = datasourceDefObj.id    
+        properties['Name'] = datasourceDefObj.name
     
 
-    dsType = datasourceDefObj.type
+        dsType = datasourceDefObj.type
     
-    print("Processing datasource {datasource_name} (datasource:{datasource_id}, type {type})".format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType))
+        print("Processing datasource {datasource_name} (datasource:{datasource_id}, type {type})".format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType))
     
-    if dsType == SourceType.S3:
-        destBucketKey = '{cfnid}{type}DestinationBucket'.format(cfnid=datasourceIdKey, type=dsType.name)
-        destKeyKey = '{cfnid}{type}DestinationKey'.format(cfnid=datasourceIdKey, type=dsType.name)
-        templateS3Parameters = {
-                'S3Parameters': {
-                    'ManifestFileLocation': {}
+        if dsType == SourceType.S3:
+            destBucketKey = '{cfnid}{type}DestinationBucket'.format(cfnid=datasourceIdKey, type=dsType.name)
+            destKeyKey = '{cfnid}{type}DestinationKey'.format(cfnid=datasourceIdKey, type=dsType.name)
+            templateS3Parameters = {
+                    'S3Parameters': {
+                        'ManifestFileLocation': {}
+                    }
+            } 
+            if remap:
+                builder.addParameters({
+                    destBucketKey: {
+                        'Description' : 'S3 bucket to use for datasource {datasource_name} (datasource:{datasource_id}, type {type}) in the stage, to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information about how to set it in Codepipeline. This parameter was added because REMAP_DS parameter was set in the synthesizer lambda'
+                        .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType),
+                        'Type': 'String',
+                        'Default': datasourceDefObj.parameters['Bucket']
+                    },
+                    destKeyKey: {
+                        'Description' : 'S3 key to use for datasource {datasource_name} (datasource:{datasource_id}, type {type}) in the stage, to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information about how to set it in Codepipeline. This parameter was added because REMAP_DS parameter was set in the synthesizer lambda'
+                        .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType),
+                        'Type': 'String',
+                        'Default': datasourceDefObj.parameters['Key']
+                    }
+                }, ownerType='datasource', ownerId=datasourceDefObj.id)
+                templateS3Parameters['S3Parameters']['ManifestFileLocation']['Bucket'] = {
+                    'Ref': destBucketKey
                 }
-        } 
-        if remap:
-            appendContent['Parameters'].update({
-                destBucketKey: {
-                    'Description' : 'S3 bucket to use for datasource {datasource_name} (datasource:{datasource_id}, type {type}) in the stage, to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information about how to set it in Codepipeline. This parameter was added because REMAP_DS parameter was set in the synthesizer lambda'
-                    .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType),
-                    'Type': 'String',
-                    'Default': datasourceDefObj.parameters['Bucket']
-                },
-                destKeyKey: {
-                    'Description' : 'S3 key to use for datasource {datasource_name} (datasource:{datasource_id}, type {type}) in the stage, to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information about how to set it in Codepipeline. This parameter was added because REMAP_DS parameter was set in the synthesizer lambda'
-                    .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType),
-                    'Type': 'String',
-                    'Default': datasourceDefObj.parameters['Key']
+                templateS3Parameters['S3Parameters']['ManifestFileLocation']['Key'] = {
+                    'Ref': destKeyKey
                 }
-            })
-            templateS3Parameters['S3Parameters']['ManifestFileLocation']['Bucket'] = {
-                'Ref': destBucketKey
-            }
-            templateS3Parameters['S3Parameters']['ManifestFileLocation']['Key'] = {
-                'Ref': destKeyKey
-            }
                     
-        else:              
-            templateS3Parameters['S3Parameters']['ManifestFileLocation']['Bucket'] = datasourceDefObj.parameters['Bucket']
-            templateS3Parameters['S3Parameters']['ManifestFileLocation']['Key'] = datasourceDefObj.parameters['Key']
+            else:              
+                templateS3Parameters['S3Parameters']['ManifestFileLocation']['Bucket'] = datasourceDefObj.parameters['Bucket']
+                templateS3Parameters['S3Parameters']['ManifestFileLocation']['Key'] = datasourceDefObj.parameters['Key']
             
-        properties['Type'] = dsType.name
-        properties['DataSourceParameters'] = templateS3Parameters
+            properties['Type'] = dsType.name
+            properties['DataSourceParameters'] = templateS3Parameters
     
-    if dsType == SourceType.ATHENA:
-        templateAthenaParameters = {
-            'AthenaParameters': {}
-        }
-        if remap:
-            athenaWorkgroupKey = '{cfnid}{type}Workgroup'.format(cfnid=datasourceIdKey, type=dsType.name)
-            appendContent['Parameters'].update({
-                athenaWorkgroupKey: {
-                    'Description' : 'Athena Workgroup to use for datasource {datasource_name} (datasource:{datasource_id}, type {type}) in the stage, \
-                                        to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information about how to set it in Codepipeline.\
-                                              This parameter was added because REMAP_DS parameter was set in the synthesizer lambda'
-                                              .format(datasource_name=datasourceName,  datasource_id=datasourceDefObj.id, type=dsType.name),
-                    'Type': 'String',
-                    'Default': datasourceDefObj.parameters['WorkGroup']
-                }
-            })
-            templateAthenaParameters['AthenaParameters']['WorkGroup'] = {
-                'Ref': athenaWorkgroupKey
-            }
-        else:
+        if dsType == SourceType.ATHENA:
             templateAthenaParameters = {
                 'AthenaParameters': {}
             }
-            templateAthenaParameters['AthenaParameters']['WorkGroup'] = datasourceDefObj.parameters['WorkGroup']
+            if remap:
+                athenaWorkgroupKey = '{cfnid}{type}Workgroup'.format(cfnid=datasourceIdKey, type=dsType.name)
+                builder.addParameters({
+                    athenaWorkgroupKey: {
+                        'Description' : 'Athena Workgroup to use for datasource {datasource_name} (datasource:{datasource_id}, type {type}) in the stage, \
+                                        to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information about how to set it in Codepipeline.\
+                                              This parameter was added because REMAP_DS parameter was set in the synthesizer lambda'
+                                                  .format(datasource_name=datasourceName,  datasource_id=datasourceDefObj.id, type=dsType.name),
+                        'Type': 'String',
+                        'Default': datasourceDefObj.parameters['WorkGroup']
+                    }
+                }, ownerType='datasource', ownerId=datasourceDefObj.id)
+                templateAthenaParameters['AthenaParameters']['WorkGroup'] = {
+                    'Ref': athenaWorkgroupKey
+                }
+            else:
+                templateAthenaParameters = {
+                    'AthenaParameters': {}
+                }
+                templateAthenaParameters['AthenaParameters']['WorkGroup'] = datasourceDefObj.parameters['WorkGroup']
         
-        properties['Type'] = dsType.name
-        properties['DataSourceParameters'] = templateAthenaParameters
-
-    if dsType.name in RDMBS_DS:
-        dsSecretKey = '{cfnid}SecretArn'.format(cfnid=datasourceIdKey)
-        properties['Credentials'] = {
-            'SecretArn':  {
-                'Ref': dsSecretKey
-            }
-        }
-        appendContent['Parameters'].update({
-            dsSecretKey: {
-                'Description' : 'Secret Arn to use for datasource {datasource_name} (datasource:{datasource_id}, type {type}) in the stage, to be parametrized via CFN'
-                .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType.name),
-                'Type': 'String'                
-            }
-        })
-        if datasourceDefObj.vpcConnectionArn != '':
-            vpcConnectionKey = '{cfnid}VpcConnectionArn'.format(cfnid=datasourceIdKey)
-            properties['VpcConnectionProperties'] = {
-                'VpcConnectionArn': {
-                    'Ref': vpcConnectionKey
+            properties['Type'] = dsType.name
+            properties['DataSourceParameters'] = templateAthenaParameters
+
+        if dsType.name in RDMBS_DS:
+            dsSecretKey = '{cfnid}SecretArn'.format(cfnid=datasourceIdKey)
+            properties['Credentials'] = {
+                'SecretArn':  {
+                    'Ref': dsSecretKey
                 }
             }
-            appendContent['Parameters'].update({
-                vpcConnectionKey:  {
-                        'Description' : 'VPC Connection Arn to use for datasource {datasource_name} (datasource:{datasource_id}, type {type}) in the stage, to be parametrized via CFN'
-                        .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType.name),
-                        'Type': 'String'
-                    }
-            }
-            )
-
-        if isinstance(datasourceDefObj, QSRDSDatasourceDef):
-            #its an RDS datasource
-            rdsInstanceParam = '{cfnid}RDSInstanceID'.format(cfnid=datasourceIdKey)
-            databaseParam = '{cfnid}RDSDBName'.format(cfnid=datasourceIdKey)
-            templateDSParameters = {
-                'RdsParameters' : {
+            builder.addParameters({
+                dsSecretKey: {
+                    'Description' : 'Secret Arn to use for datasource {datasource_name} (datasource:{datasource_id}, type {type}) in the stage, to be parametrized via CFN'
+                    .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType.name),
+                    'Type': 'String'                
                 }
-            }
-            if remap:
-                appendContent['Parameters'].update({
-                    rdsInstanceParam: {
-                        'Description' : 'RDS Instance Id for datasource {datasource_name} (datasource:{datasource_id}, type {type}) in the stage, to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information about how to set it in Codepipeline. This parameter was added because REMAP_DS parameter was set in the synthesizer lambda'
-                        .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType.name),
-                        'Type': 'String',
-                        'Default': datasourceDefObj.parameters['InstanceId']
-                    },
-                    databaseParam: {
-                        'Description' : 'Database name for datasource {datasource_name} (datasource:{datasource_id}, type {type}) in the stage, to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information about how to set it in Codepipeline. This parameter was added because REMAP_DS parameter was set in the synthesizer lambda'
-                        .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType.name),
-                        'Type': 'String',
-                        'Default': datasourceDefObj.parameters['Database']
+            }, ownerType='datasource', ownerId=datasourceDefObj.id)
+            if datasourceDefObj.vpcConnectionArn != '':
+                vpcConnectionKey = '{cfnid}VpcConnectionArn'.format(cfnid=datasourceIdKey)
+                properties['VpcConnectionProperties'] = {
+                    'VpcConnectionArn': {
+                        'Ref': vpcConnectionKey
                     }
-                })
-                templateDSParameters['RdsParameters']['InstanceId'] = {
-                    'Ref': rdsInstanceParam
                 }
-                templateDSParameters['RdsParameters']['Database'] = {
-                    'Ref': databaseParam
+                builder.addParameters({
+                    vpcConnectionKey:  {
+                            'Description' : 'VPC Connection Arn to use for datasource {datasource_name} (datasource:{datasource_id}, type {type}) in the stage, to be parametrized via CFN'
+                            .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType.name),
+                            'Type': 'String'
+                        }
+                }, ownerType='datasource', ownerId=datasourceDefObj.id
+                )
+
+            if isinstance(datasourceDefObj, QSRDSDatasourceDef):
+                #its an RDS datasource
+                rdsInstanceParam = '{cfnid}RDSInstanceID'.format(cfnid=datasourceIdKey)
+                databaseParam = '{cfnid}RDSDBName'.format(cfnid=datasourceIdKey)
+                templateDSParameters = {
+                    'RdsParameters' : {
+                    }
                 }
+                if remap:
+                    builder.addParameters({
+                        rdsInstanceParam: {
+                            'Description' : 'RDS Instance Id for datasource {datasource_name} (datasource:{datasource_id}, type {type}) in the stage, to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information about how to set it in Codepipeline. This parameter was added because REMAP_DS parameter was set in the synthesizer lambda'
+                            .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType.name),
+                            'Type': 'String',
+                            'Default': datasourceDefObj.parameters['InstanceId']
+                        },
+                        databaseParam: {
+                            'Description' : 'Database name for datasource {datasource_name} (datasource:{datasource_id}, type {type}) in the stage, to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information about how to set it in Codepipeline. This parameter was added because REMAP_DS parameter was set in the synthesizer lambda'
+                            .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType.name),
+                            'Type': 'String',
+                            'Default': datasourceDefObj.parameters['Database']
+                        }
+                    }, ownerType='datasource', ownerId=datasourceDefObj.id)
+                    templateDSParameters['RdsParameters']['InstanceId'] = {
+                        'Ref': rdsInstanceParam
+                    }
+                    templateDSParameters['RdsParameters']['Database'] = {
+                        'Ref': databaseParam
+                    }
 
+                else:
+                    templateDSParameters['RdsParameters']['InstanceId'] = datasourceDefObj.instanceId
+                    templateDSParameters['RdsParameters']['Database'] = datasourceDefObj.database
             else:
-                templateDSParameters['RdsParameters']['InstanceId'] = datasourceDefObj.instanceId
-                templateDSParameters['RdsParameters']['Database'] = datasourceDefObj.database
-        else:
-            #RDBMS connection
-            datasourceParametersKey = datasourceDefObj.dSourceParamKey
-            templateDSParameters = {
-                datasourceParametersKey : {
-                }
-            } 
-            if remap:
-                databaseParam = '{cfnid}{type}DBName'.format(cfnid=datasourceIdKey, type=dsType.name)
-                portParam = '{cfnid}{type}Port'.format(cfnid=datasourceIdKey, type=dsType.name)
-                hostParam = '{cfnid}{type}Host'.format(cfnid=datasourceIdKey,type=dsType.name)
-                appendContent['Parameters'].update({             
-                    databaseParam: {
-                        'Description' : 'Database name for datasource {datasource_name} (datasource:{datasource_id}, type {type}) to use in the stage, to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information about how to set it in Codepipeline. This parameter was added because REMAP_DS parameter was set in the synthesizer lambda'
-                        .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType.name),
-                        'Type': 'String',
-                        'Default': datasourceDefObj.parameters['Database']
-                    },
-                    portParam: {
-                        'Description' : 'Database port for datasource {datasource_name} (datasource:{datasource_id}, type {type}) to use in the stage, to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information about how to set it in Codepipeline. This parameter was added because REMAP_DS parameter was set in the synthesizer lambda'
-                        .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType.name),
-                        'Type': 'Number',
-                        'Default': datasourceDefObj.parameters['Port']
-                    },
-                    hostParam: {
-                        'Description' : 'Database host for datasource {datasource_name} (datasource:{datasource_id}, type {type}) to use in the stage, to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information about how to set it in Codepipeline. This parameter was added because REMAP_DS parameter was set in the synthesizer lambda'
-                        .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType.name),
-                        'Type': 'String',
-                        'Default': datasourceDefObj.parameters['Host']                        
+                #RDBMS connection
+                datasourceParametersKey = datasourceDefObj.dSourceParamKey
+                templateDSParameters = {
+                    datasourceParametersKey : {
                     }
-                })
+                } 
+                if remap:
+                    databaseParam = '{cfnid}{type}DBName'.format(cfnid=datasourceIdKey, type=dsType.name)
+                    portParam = '{cfnid}{type}Port'.format(cfnid=datasourceIdKey, type=dsType.name)
+                    hostParam = '{cfnid}{type}Host'.format(cfnid=datasourceIdKey,type=dsType.name)
+                    builder.addParameters({             
+                        databaseParam: {
+                            'Description' : 'Database name for datasource {datasource_name} (datasource:{datasource_id}, type {type}) to use in the stage, to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information about how to set it in Codepipeline. This parameter was added because REMAP_DS parameter was set in the synthesizer lambda'
+                            .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType.name),
+                            'Type': 'String',
+                            'Default': datasourceDefObj.parameters['Database']
+                        },
+                        portParam: {
+                            'Description' : 'Database port for datasource {datasource_name} (datasource:{datasource_id}, type {type}) to use in the stage, to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information about how to set it in Codepipeline. This parameter was added because REMAP_DS parameter was set in the synthesizer lambda'
+                            .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType.name),
+                            'Type': 'Number',
+                            'Default': datasourceDefObj.parameters['Port']
+                        },
+                        hostParam: {
+                            'Description' : 'Database host for datasource {datasource_name} (datasource:{datasource_id}, type {type}) to use in the stage, to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information about how to set it in Codepipeline. This parameter was added because REMAP_DS parameter was set in the synthesizer lambda'
+                            .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType.name),
+                            'Type': 'String',
+                            'Default': datasourceDefObj.parameters['Host']                        
+                        }
+                    }, ownerType='datasource', ownerId=datasourceDefObj.id)
                 
-                templateDSParameters[datasourceParametersKey]['Database'] = {
-                    'Ref': databaseParam
-                }    
-                templateDSParameters[datasourceParametersKey]['Port'] = {
-                    'Ref': portParam
-                }
-                templateDSParameters[datasourceParametersKey]['Host'] = {
-                    'Ref': hostParam
-                }        
-            else:
-                templateDSParameters[datasourceParametersKey]['Host'] = datasourceDefObj.host
-                templateDSParameters[datasourceParametersKey]['Port'] = datasourceDefObj.port
-                templateDSParameters[datasourceParametersKey]['Database'] = datasourceDefObj.database
+                    templateDSParameters[datasourceParametersKey]['Database'] = {
+                        'Ref': databaseParam
+                    }    
+                    templateDSParameters[datasourceParametersKey]['Port'] = {
+                        'Ref': portParam
+                    }
+                    templateDSParameters[datasourceParametersKey]['Host'] = {
+                        'Ref': hostParam
+                    }        
+                else:
+                    templateDSParameters[datasourceParametersKey]['Host'] = datasourceDefObj.host
+                    templateDSParameters[datasourceParametersKey]['Port'] = datasourceDefObj.port
+                    templateDSParameters[datasourceParametersKey]['Database'] = datasourceDefObj.database
              
         
-        if dsType == SourceType.REDSHIFT:
-            if remap:
-                RSclusterIdParam = '{cfnid}{type}ClusterId'.format(cfnid=datasourceIdKey,type=dsType.name)
-                appendContent['Parameters'].update({
-                    RSclusterIdParam: {
-                        'Description' : 'ClusterId for datasource {datasource_name} (datasource:{datasource_id}, type {type}) to use in the stage, to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information about how to set it in Codepipeline'
-                        .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType.name),
-                        'Type': 'String',
-                        'Default': datasourceDefObj.parameters['ClusterId']
+            if dsType == SourceType.REDSHIFT:
+                if remap:
+                    RSclusterIdParam = '{cfnid}{type}ClusterId'.format(cfnid=datasourceIdKey,type=dsType.name)
+                    builder.addParameters({
+                        RSclusterIdParam: {
+                            'Description' : 'ClusterId for datasource {datasource_name} (datasource:{datasource_id}, type {type}) to use in the stage, to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information about how to set it in Codepipeline'
+                            .format(datasource_name=datasourceName, datasource_id=datasourceDefObj.id, type=dsType.name),
+                            'Type': 'String',
+                            'Default': datasourceDefObj.parameters['ClusterId']
+                        }
+                    }, ownerType='datasource', ownerId=datasourceDefObj.id)
+                    templateDSParameters[datasourceParametersKey]['ClusterId'] = {
+                        'Ref': RSclusterIdParam
                     }
-                })
-                templateDSParameters[datasourceParametersKey]['ClusterId'] = {
-                    'Ref': RSclusterIdParam
-                }
-            else:
-                templateDSParameters[datasourceParametersKey]['ClusterId'] = datasourceDefObj.clusterId
+                else:
+                    templateDSParameters[datasourceParametersKey]['ClusterId'] = datasourceDefObj.clusterId
             
-        properties['Type'] = dsType.name
-        properties['DataSourceParameters'] = templateDSParameters
+            properties['Type'] = dsType.name
+            properties['DataSourceParameters'] = templateDSParameters
 
-    
-    return appendContent
+    return builder
     
 
 
-def generateDataSetCFN(datasetObj: QSDataSetDef, datasourceObjs: QSDataSourceDef, tableMap: object, appendContent: dict):
+def generateDataSetCFN(datasetObj: QSDataSetDef, datasourceObjs: QSDataSourceDef, tableMap: object, builder: TemplateBuilder):
     """
     Function that generates a Cloudformation AWS::QuickSight::DataSet resource https://a.co/5EVM6yD
     synthesized from the source environment account
@@ -427,15 +545,15 @@ def generateDataSetCFN(datasetObj: QSDataSetDef, datasourceObjs: QSDataSourceDef
     datasetObj(object): Dataset object from the source environment account
     datasourceObjs(list): List of QSDataSourceDef objects
     tableMap (dict): Dictionary of table names and corresponding physical table names
-    appendContent(dict): Dictionary that represents the CFN template object (already built by other methods) where we want to append elements
+    builder(TemplateBuilder): Builder of the CFN template object (already built by other methods) where we want to append elements
     
     Returns:
 
-    appendContent(dict): Dictionary containing the definition of Cloudformation template elements    
+    builder(TemplateBuilder): Builder of the Cloudformation template elements    
 
     Examples:
 
-    >>> generateDataSetCFN(datasetObj=datasetObj, datasourceObjs=datasourceObjs, tableMap=tableMap, appendContent=appendContent)
+    >>> generateDataSetCFN(datasetObj=datasetObj, datasourceObjs=datasourceObjs, tableMap=tableMap, builder=builder)
 
     """
     
@@ -445,14 +563,13 @@ def generateDataSetCFN(datasetObj: QSDataSetDef, datasourceObjs: QSDataSourceDef
     datasetId = datasetObj.id
     ret = qs.describe_data_set(AwsAccountId=FIRST_STAGE_ACCOUNT_ID, DataSetId=datasetId)
 
-    with open('resources/dataset_resource_CFN_skel.yaml', 'r') as file:
-        yaml_dataset = yaml.safe_load(file) 
+    yaml_dataset = skeletons.get('dataset_resource_CFN_skel.yaml')
 
     dataSetName = ret['DataSet']['Name']
 
   
-    if appendContent is None:
-        raise ValueError("Error in createTemplateFromAnalysis:generateDataSetCFN, Append  content is None")
+    if builder is None:
+        raise ValueError("Error in createTemplateFromAnalysis:generateDataSetCFN, Template builder is None")
     
     id_sanitized = datasetId.replace('-', '')
     dataSetIdKey = 'DSet{id}'.format(id=id_sanitized)    
@@ -482,10 +599,10 @@ def generateDataSetCFN(datasetObj: QSDataSetDef, datasourceObjs: QSDataSourceDef
         }
         properties['PhysicalTableMap'][table][physicalTableKey]['DataSourceArn'] = datasourceArnSubStr
 
-    appendContent['Resources'][dataSetIdKey] = yaml_dataset
+    builder.addResource(dataSetIdKey, yaml_dataset)
     
 
-    appendContent = generateRefreshSchedulesCFN(datasetObj=datasetObj, appendContent=appendContent)
+    builder = generateRefreshSchedulesCFN(datasetObj=datasetObj, builder=builder)
 
     for property in OPTIONAL_PROPS:
         if property in ret['DataSet'] and bool(ret['DataSet'][property]):
@@ -502,17 +619,17 @@ def generateDataSetCFN(datasetObj: QSDataSetDef, datasourceObjs: QSDataSourceDef
                 'Arn'
             ]
         }
-        appendContent['Resources'][dataSetIdKey]['Properties']['RowLevelPermissionDataSet'] = datasetObj.rlsDSetDef
+        properties['RowLevelPermissionDataSet'] = datasetObj.rlsDSetDef
 
-    appendContent['Resources'][dataSetIdKey]['DependsOn'] = dependingResources
+    builder.addDependsOn(dataSetIdKey, dependingResources)
 
-    return appendContent
+    return builder
 
-def generateRowLevelPermissionDataSetCFN( appendContent:dict, targetDatasetIdKey:str, rlsDatasetDef:dict, datasourceOrd:int, lambdaEvent: object):
+def generateRowLevelPermissionDataSetCFN( builder:TemplateBuilder, targetDatasetIdKey:str, rlsDatasetDef:dict, datasourceOrd:int, lambdaEvent: object):
     """ Helper function that generates the dataset and datasource used to implement the RLS of a source dataset
 
     Args:        
-        appendContent (dict): Dictionary containing the definition of Cloudformation template elements
+        builder (TemplateBuilder): Builder of the Cloudformation template elements
         targetDatasetIdKey (str): Dataset CFNId this RLS applies to
         rlsDatasetDef (dict): Object defining the RLS dataset to be applied to the target dataset
         datasourceOrd(int): number of datasources that have been generated (used to build the parameters in cloudformation)
@@ -521,7 +638,7 @@ def generateRowLevelPermissionDataSetCFN( appendContent:dict, targetDatasetIdKey
 
 
     Returns:
-        appendContent (dict): Dictionary containing the definition of Cloudformation template elements including the ones processed by this function
+        builder (TemplateBuilder): Builder of the Cloudformation template elements including the ones processed by this function
         datasourceOrd(int): number of datasources that have been generated (used to build the parameters in cloudformation)
     """
     ret_refresh_schedules  = []
@@ -540,12 +657,12 @@ def generateRowLevelPermissionDataSetCFN( appendContent:dict, targetDatasetIdKey
     tableChildKey = list(retRLSDSet['DataSet']['PhysicalTableMap'][tableKey].keys()).pop()
     rlsDatasourceArn = retRLSDSet['DataSet']['PhysicalTableMap'][tableKey][tableChildKey]['DataSourceArn'] 
     rlsDatasourceId = rlsDatasourceArn.split('/')[-1]    
-    appendContent, RLSdataSourceDefObj = generateDataSourceCFN(datasourceId=rlsDatasourceId, appendContent=appendContent, index=datasourceOrd, lambdaEvent=lambdaEvent)
+    builder, RLSdataSourceDefObj = generateDataSourceCFN(datasourceId=rlsDatasourceId, builder=builder, index=datasourceOrd, lambdaEvent=lambdaEvent)
     physicalTableKeys= get_physical_table_map_object(retRLSDSet['DataSet']['PhysicalTableMap'])
     RLSdatasetObj = QSDataSetDef(id=rlsDatasetId, name=retRLSDSet['DataSet']['Name'], importMode=importMode,physicalTableMap=physicalTableKeys, placeholdername=retRLSDSet['DataSet']['Name'], refreshSchedules=ret_refresh_schedules)
     RLSdatasetObj.dependingDSources = [RLSdataSourceDefObj]
-    appendContent, datasourceOrd = generateDataSetCFN(datasetObj=RLSdatasetObj, datasourceObjs=RLSdatasetObj.dependingDSources, tableMap=RLSdatasetObj.physicalTableMap, appendContent=appendContent, datasourceOrd=datasourceOrd, lambdaEvent=lambdaEvent)    
-    appendContent['Resources'][targetDatasetIdKey]['Properties']['RowLevelPermissionDataSet'] = {
+    builder, datasourceOrd = generateDataSetCFN(datasetObj=RLSdatasetObj, datasourceObjs=RLSdatasetObj.dependingDSources, tableMap=RLSdatasetObj.physicalTableMap, builder=builder, datasourceOrd=datasourceOrd, lambdaEvent=lambdaEvent)    
+    builder.getResource(targetDatasetIdKey)['Properties']['RowLevelPermissionDataSet'] = {
         "Arn" : {
             'Fn::Sub': 'arn:aws:quicksight:${AWS::Region}:${AWS::AccountId}:dataset/${datasetId}'.replace('${datasetId}', rlsDatasetId)
         },
@@ -555,11 +672,11 @@ def generateRowLevelPermissionDataSetCFN( appendContent:dict, targetDatasetIdKey
         "Status" : rlsDatasetDef['Status']
     }
     
-    appendContent['Resources'][targetDatasetIdKey]['DependsOn'].append(RLSdatasetObj.CFNId)
+    builder.addDependsOn(targetDatasetIdKey, RLSdatasetObj.CFNId)
 
-    return appendContent, datasourceOrd
+    return builder, datasourceOrd
 
-def generateAnalysisFromTemplateCFN(analysisObj: QSAnalysisDef, templateId:str, appendContent: dict):
+def generateAnalysisFromTemplateCFN(analysisObj: QSAnalysisDef, templateId:str, builder: TemplateBuilder):
 
     """
     Function that generates a Cloudformation AWS::QuickSight::Analysis resource https://a.co/1V5noMj
@@ -569,22 +686,21 @@ def generateAnalysisFromTemplateCFN(analysisObj: QSAnalysisDef, templateId:str,
 
     analysisObj(object): Analysis helper object containing all the properties of the analysis we want to build using CFN
     templateId(str): Template Id of the template that will be used as the source for the analysis
-    appendContent(dict): Dictionary that represents the CFN template object (already built by other methods) where we want to append elements
+    builder(TemplateBuilder): Builder of the CFN template object (already built by other methods) where we want to append elements
 
     Returns:
 
-    appendContent(dict): Dictionary containing the definition of Cloudformation template elements
+    builder(TemplateBuilder): Builder of the Cloudformation template elements
 
     Examples:
 
-    >>> generateAnalysisFromTemplateCFN(analysisObj=analysisObj, templateId=templateId, appendContent=appendContent)
+    >>> generateAnalysisFromTemplateCFN(analysisObj=analysisObj, templateId=templateId, builder=builder)
 
     """
 
-    analysis_tag = 'UPDATED_{suffix}'.format(suffix=utc_now.strftime('%d-%m-%y-%H-%M-%S'))
+    analysis_tag = 'UPDATED_{suffix}'.format(suffix=get_analysis_version_suffix(analysisObj))
 
-    with open('resources/analysis_resource_CFN_skel.yaml', 'r') as file:
-        yaml_analysis = yaml.safe_load(file)  
+    yaml_analysis = skeletons.get('analysis_resource_CFN_skel.yaml')
 
     properties = yaml_analysis['Properties']
     properties['AnalysisId'] = analysisObj.id
@@ -620,13 +736,38 @@ def generateAnalysisFromTemplateCFN(analysisObj: QSAnalysisDef, templateId:str,
         datasetReferencesObjList.append(datasetReferencesObj)
         
     properties['SourceEntity']['SourceTemplate']['DataSetReferences'] = datasetReferencesObjList
-    yaml_analysis['DependsOn'] = analysisObj.getDependingDatasets()
-    
-    appendContent['Resources'][analysisObj.CFNId] = yaml_analysis    
+    builder.addResource(analysisObj.CFNId, yaml_analysis)
+    builder.addDependsOn(analysisObj.CFNId, analysisObj.getDependingDatasets())
+
+    return builder
+
+def is_complete_refresh_schedule(schedule: dict):
+
+    """
+    Helper function that checks if a refresh schedule payload (as returned by list_refresh_schedules) contains all the fields needed to synthesize
+    its AWS::QuickSight::RefreshSchedule resource, so it doesn't need to be described again
+
+    Parameters:
+
+    schedule(dict): Refresh schedule payload
+
+    Returns:
+
+    True if the schedule has all the required fields, False otherwise
+
+    Examples:
+
+    >>> is_complete_refresh_schedule(schedule=schedule)
+
+    """
 
-    return appendContent
+    if any(field not in schedule for field in REFRESH_SCHEDULE_REQUIRED_FIELDS):
+        return False
+
+    return all(field in schedule['ScheduleFrequency'] for field in REFRESH_SCHEDULE_FREQUENCY_REQUIRED_FIELDS)
 
-def generateRefreshSchedulesCFN(datasetObj: QSDataSetDef, appendContent: dict):
+
+def generateRefreshSchedulesCFN(datasetObj: QSDataSetDef, builder: TemplateBuilder):
 
     """
     Function that generates a Cloudformation AWS::QuickSight::RefreshSchedule resource https://a.co/74TVBln
@@ -635,15 +776,15 @@ def generateRefreshSchedulesCFN(datasetObj: QSDataSetDef, appendContent: dict):
     Parameters:
 
     datasetObj(object): Dataset helper object containing all the properties of the dataset we want to build using CFN
-    appendContent(dict): Dictionary that represents the CFN template object (already built by other methods) where we want to append elements
+    builder(TemplateBuilder): Builder of the CFN template object (already built by other methods) where we want to append elements
 
     Returns:
 
-    appendContent(dict): Dictionary containing the definition of Cloudformation template elements
+    builder(TemplateBuilder): Builder of the Cloudformation template elements
 
     Examples:
 
-    >>> generateRefreshSchedulesCFN(datasetObj=datasetObj, appendContent=appendContent)
+    >>> generateRefreshSchedulesCFN(datasetObj=datasetObj, builder=builder)
 
     """
 
@@ -651,13 +792,19 @@ def generateRefreshSchedulesCFN(datasetObj: QSDataSetDef, appendContent: dict):
 
         DSETIdSanitized = datasetObj.id.replace('-', '')
 
-        ret = qs.list_refresh_schedules(AwsAccountId=FIRST_STAGE_ACCOUNT_ID, DataSetId=datasetObj.id)
+        # Schedules listed during discovery already carry the full schedule definition, they are only fetched again when fields are missing
+        schedules = datasetObj.refreshSchedules
+        if not all(is_complete_refresh_schedule(schedule) for schedule in schedules):
+            ret = qs.list_refresh_schedules(AwsAccountId=FIRST_STAGE_ACCOUNT_ID, DataSetId=datasetObj.id)
+            schedules = ret['RefreshSchedules']
 
-        for schedule in ret['RefreshSchedules']:
+        for schedule in schedules:
             refresh_schedule_id = schedule['ScheduleId']
-            retSchedule = qs.describe_refresh_schedule(AwsAccountId=FIRST_STAGE_ACCOUNT_ID, DataSetId=datasetObj.id, ScheduleId=refresh_schedule_id)
-            with open('resources/dataset_refresh_schedule_CFN_skel.yaml', 'r') as file:
-                yaml_schedule = yaml.safe_load(file)  
+            if is_complete_refresh_schedule(schedule):
+                retSchedule = {'RefreshSchedule': copy.deepcopy(schedule)}
+            else:
+                retSchedule = qs.describe_refresh_schedule(AwsAccountId=FIRST_STAGE_ACCOUNT_ID, DataSetId=datasetObj.id, ScheduleId=refresh_schedule_id)
+            yaml_schedule = skeletons.get('dataset_refresh_schedule_CFN_skel.yaml')
             
             yaml_schedule['Properties']['DataSetId'] = datasetObj.id
             yaml_schedule['Properties']['Schedule'] = retSchedule['RefreshSchedule']
@@ -673,50 +820,85 @@ def generateRefreshSchedulesCFN(datasetObj: QSDataSetDef, appendContent: dict):
             # Remove timezone info as it is included separately in the object
             yaml_schedule['Properties']['Schedule']['StartAfterDateTime'] = futurestartAfterTimeTz.strftime('%Y-%m-%dT%H:%M:%SZ')
             scheduleCFNId = 'RSchedule{id}'.format(id=refresh_schedule_id.replace('-', ''))
-            appendContent['Resources'][scheduleCFNId] = yaml_schedule            
-            appendContent['Resources'][scheduleCFNId]['DependsOn'] = 'DSet{id}'.format(id=DSETIdSanitized) 
+            builder.addResource(scheduleCFNId, yaml_schedule)
+            builder.addDependsOn(scheduleCFNId, 'DSet{id}'.format(id=DSETIdSanitized))
     
     
-    return appendContent
+    return builder
 
 
-def zipAndUploadToS3(bucket: str, files: list, zip_name: str, bucket_owner:str, prefix=None, object_name=None, region='us-east-1', credentials=None):
+def assembleZipAndUploadToS3(bucket: str, object_prefix: str, files: list, object_name: str, bucket_owner:str, prefix=None, region='us-east-1', credentials=None):
 
     """
-    Helper function that zips a file and uploads a file to S3 in a particular bucket with a particular key (including a prefix)
+    Helper function that assembles a zip from the S3 objects under a prefix (their bodies are streamed into the zip, they are not downloaded to disk) and local files,
+    then uploads it to S3 in a particular bucket with a particular key (including a prefix). The zip is kept in memory up to ARTIFACT_SPOOL_MAX_MEMORY
+    bytes and uploaded with a multipart upload of ARTIFACT_MULTIPART_PART_SIZE parts (ARTIFACT_UPLOAD_MAX_CONCURRENCY in parallel). The zip is
+    deterministic (fixed entry timestamps and permissions) and the upload is skipped when the object already in S3 has the same content
 
     Parameters:
 
     bucket(str): S3 bucket name
-    files(list): Filename to be zipped and uploaded
-    zip_name(str): Name of the zip file to be used when zipping the content
+    object_prefix(str): Prefix of the S3 objects (in bucket) to be zipped
+    files(list): Local files to be zipped after the S3 objects
+    object_name(str): S3 object name of the zip
     bucket_owner(str): Expected AWS account owning the bucket
     prefix(str): Prefix to be used in the S3 object name
-    object_name(str): S3 object name
     region(str): AWS region where the bucket is located
-    credentials(dict): AWS credentials to be used in the upload operation
+    credentials(dict): AWS credentials to be used in the S3 operations
 
     Returns:
 
-    True if the file was uploaded successfully, False otherwise
+    True if the zip was uploaded successfully (or was already up to date), False otherwise
 
     Examples:
 
-    >>> zipAndUploadToS3(bucket=DEPLOYMENT_S3_BUCKET, filename=filename, zip_name=zip_name, prefix=prefix, object_name=object_name, region=region, credentials=credentials)
+    >>> assembleZipAndUploadToS3(bucket=DEPLOYMENT_S3_BUCKET, object_prefix=object_prefix, files=files, object_name='DEST_assets_CFN.zip', prefix=prefix, bucket_owner=bucket_owner, region=region, credentials=credentials)
 
     """
 
-    with ZipFile(zip_name, 'w') as assetszip:
+    s3 = aws_clients.getClient('s3', region=region, credentials=credentials)
+
+    if not aws_clients.isBucketOwnedBy(bucket=bucket, bucketOwner=bucket_owner, region=region, credentials=credentials):
+        print('The provided bucket {bucket} doesn\'t belong to the expected account {account_id}'.format(bucket=bucket, account_id=bucket_owner))
+        return False
+
+    if prefix is not None:
+        if prefix[-1] != '/':
+            object_name = '{prefix}/{object}'.format(prefix=prefix, object=object_name)
+        else:
+            object_name = '{prefix}{object}'.format(prefix=prefix, object=object_name)
+
+    artifact = ZipArtifact(maxMemory=ARTIFACT_SPOOL_MAX_MEMORY)
+    try:
+        objects = list_s3_objects(bucket=bucket, prefix=object_prefix, region=region, credentials=credentials)
+        for object, stream in open_s3_objects(bucket=bucket, objects=objects, bucket_owner=bucket_owner, region=region, credentials=credentials):
+            artifact.addStream(os.path.basename(object['Key']), stream)
+            print('Adding object {key} to zip {zip_name}'.format(key=object['Key'], zip_name=object_name))
         for file in files:
-            print('Adding file {file} to zip {zip_name}'.format(file=file, zip_name=zip_name))
-            assetszip.write(file, arcname=os.path.basename(file))
-    
-    return uploadFileToS3(bucket=bucket, filename=zip_name, prefix=prefix, object_name=object_name, bucket_owner=bucket_owner, region=region, credentials=credentials)
+            artifact.addFile(os.path.basename(file), file)
+            print('Adding file {file} to zip {zip_name}'.format(file=file, zip_name=object_name))
+        content_hash = artifact.close()
+
+        if SKIP_UNCHANGED_ARTIFACTS == 'true' and isUnchanged(client=s3, bucket=bucket, key=object_name, contentHash=content_hash, bucketOwner=bucket_owner):
+            print('File {file} is already up to date in {bucket} at prefix {prefix}, skipping upload'.format(file=object_name, bucket=bucket, prefix=prefix))
+            return True
+        transfer_config = TransferConfig(multipart_threshold=ARTIFACT_MULTIPART_PART_SIZE, multipart_chunksize=ARTIFACT_MULTIPART_PART_SIZE, max_concurrency=ARTIFACT_UPLOAD_MAX_CONCURRENCY)
+        s3.upload_fileobj(artifact.buffer, bucket, object_name, ExtraArgs={'Metadata': content_hash.getMetadata(), 'ExpectedBucketOwner': bucket_owner}, Config=transfer_config)
+        print('File {file} uploaded successfully to {bucket} at prefix {prefix} (assembled {location})'
+              .format(file=object_name, bucket=bucket, prefix=prefix, location='in memory' if artifact.isInMemory() else 'in a temporary file'))
+    except ClientError as e:
+        logging.error(e)
+        print('There was an error uploading file {file} to {bucket} at prefix {prefix}'.format(file=object_name, bucket=bucket, prefix=prefix))
+        return False
+    finally:
+        artifact.discard()
+    return True
 
 def uploadFileToS3(bucket: str, filename: str, region: str, bucket_owner:str, prefix=None, object_name=None, credentials=None):
 
     """
-    Helper function that uploads a file to S3 in a particular bucket with a particular key (including a prefix)
+    Helper function that uploads a file to S3 in a particular bucket with a particular key (including a prefix). The SHA256 of the file is stored in
+    the object metadata and the upload is skipped when the object already in S3 has the same content
 
     Parameters:
 
@@ -730,7 +912,7 @@ def uploadFileToS3(bucket: str, filename: str, region: str, bucket_owner:str, pr
 
     Returns:
 
-    True if the file was uploaded successfully, False otherwise
+    True if the file was uploaded successfully (or was already up to date), False otherwise
 
     Examples:
 
@@ -738,14 +920,9 @@ def uploadFileToS3(bucket: str, filename: str, region: str, bucket_owner:str, pr
 
     """
 
-    if credentials is None:
-            s3 = boto3.client('s3', region_name=region)     
-    else:
-        s3 = boto3.client('s3', region_name=region, aws_access_key_id=credentials['AccessKeyId'], aws_secret_access_key=credentials['SecretAccessKey'], aws_session_token=credentials['SessionToken'])
+    s3 = aws_clients.getClient('s3', region=region, credentials=credentials)
 
-    try:
-        s3.get_bucket_location(Bucket=bucket, ExpectedBucketOwner=bucket_owner)
-    except ClientError as error:
+    if not aws_clients.isBucketOwnedBy(bucket=bucket, bucketOwner=bucket_owner, region=region, credentials=credentials):
         print('The provided bucket {bucket} doesn\'t belong to the expected account {account_id}'.format(bucket=bucket, account_id=bucket_owner))
         return False
 
@@ -762,7 +939,11 @@ def uploadFileToS3(bucket: str, filename: str, region: str, bucket_owner:str, pr
     # Upload the file
     
     try:
-        response = s3.upload_file(filename, bucket, object_name)
+        content_hash = hashFile(filename)
+        if SKIP_UNCHANGED_ARTIFACTS == 'true' and isUnchanged(client=s3, bucket=bucket, key=object_name, contentHash=content_hash, bucketOwner=bucket_owner):
+            print('File {file} is already up to date in {bucket} at prefix {prefix}, skipping upload'.format(file=object_name, bucket=bucket, prefix=prefix))
+            return True
+        response = s3.upload_file(filename, bucket, object_name, ExtraArgs={'Metadata': content_hash.getMetadata()})
         print('File {file} uploaded successfully to {bucket} at prefix {prefix}'.format(file=object_name, bucket=DEPLOYMENT_S3_BUCKET, prefix=prefix))
     except ClientError as e:
         logging.error(e)
@@ -770,254 +951,1133 @@ def uploadFileToS3(bucket: str, filename: str, region: str, bucket_owner:str, pr
         return False
     return True
 
-#helper function to generate a presigned url in S3 from a given s3 url
-def generatePresignedUrl(bucket: str, key:str, region: str, credentials=None):
+def uploadTemplateToS3(bucket: str, content: dict, object_name: str, region: str, bucket_owner:str, prefix=None, credentials=None):
 
     """
-    Helper function that generates a presigne url in S3 from a given s3 url
+    Helper function that serializes a CFN template to YAML and streams it to S3 in a particular bucket with a particular key (including a prefix). The
+    template is uploaded with a multipart upload as it is serialized, so neither the document nor a local copy of it needs to be kept. As with
+    uploadFileToS3 the upload is skipped when the object already in S3 has the same content
 
     Parameters:
 
-    s3_url(str): S3 url
+    bucket(str): S3 bucket name
+    content(dict): Template to be uploaded
+    object_name(str): S3 object name
     region(str): AWS region where the bucket is located
+    bucket_owner(str): Expected AWS account owning the bucket
+    prefix(str): Prefix to be used in the S3 object name
     credentials(dict): AWS credentials to be used in the upload operation
 
     Returns:
 
-    str: Presigned url
+    True if the template was uploaded successfully (or was already up to date), False otherwise
 
     Examples:
 
-    >>> generatePresignedUrl(s3_url=s3_url, region=region, credentials=credentials)
+    >>> uploadTemplateToS3(bucket=DEPLOYMENT_S3_BUCKET, content=content, object_name=object_name, prefix=prefix, region=region, bucket_owner=bucket_owner, credentials=credentials)
 
     """
-    if credentials is None:
-            s3 = boto3.client('s3', region_name=region)
-    else:
-        s3 = boto3.client('s3', region_name=region, aws_access_key_id=credentials['AccessKeyId'], aws_secret_access_key=credentials['SecretAccessKey'], aws_session_token=credentials['SessionToken'])
-    
-    # Generate a presigned URL for an S3 object
-    expires_in_seconds = 3600
 
-    presigned_url = s3.generate_presigned_url(
-        ClientMethod='get_object',
-        Params={
-            'Bucket': bucket, 
-            'Key': key
-        },
-        ExpiresIn=expires_in_seconds
-    )
+    s3 = aws_clients.getClient('s3', region=region, credentials=credentials)
 
-    return presigned_url
+    if not aws_clients.isBucketOwnedBy(bucket=bucket, bucketOwner=bucket_owner, region=region, credentials=credentials):
+        print('The provided bucket {bucket} doesn\'t belong to the expected account {account_id}'.format(bucket=bucket, account_id=bucket_owner))
+        return False
 
+    if prefix is not None:
+        if prefix[-1] != '/':
+            object_name = '{prefix}/{object}'.format(prefix=prefix, object=object_name)
+        else:
+            object_name = '{prefix}{object}'.format(prefix=prefix, object=object_name)
 
+    return streamTemplateToS3(s3=s3, bucket=bucket, content=content, key=object_name, bucket_owner=bucket_owner, prefix=prefix)
 
-def get_s3_objects(bucket: str, prefix: str, region: str, credentials=None):
+def streamTemplateToS3(s3, bucket: str, content: dict, key: str, bucket_owner:str, prefix=None):
 
     """
-    Helper function that gets all objects in a particular S3 bucket with a particular prefix
+    Helper function that streams a CFN template to S3 with an existing client, the ownership of the bucket is expected to be checked by the caller
 
     Parameters:
 
+    s3(object): S3 client
     bucket(str): S3 bucket name
-    prefix(str): Prefix to be used in the S3 object name
-    region(str): AWS region where the bucket is located
-    credentials(dict): AWS credentials to be used in the upload operation
+    content(dict): Template to be uploaded
+    key(str): S3 object key
+    bucket_owner(str): Expected AWS account owning the bucket
+    prefix(str): Prefix of the key, only used for logging
 
     Returns:
 
-    list: List of files downloaded from S3
+    True if the template was uploaded successfully (or was already up to date), False otherwise
 
     Examples:
 
-    >>> get_s3_objects(bucket=DEPLOYMENT_S3_BUCKET, prefix=prefix, region=region, credentials=credentials)
+    >>> streamTemplateToS3(s3=s3, bucket=DEPLOYMENT_S3_BUCKET, content=content, key=key, bucket_owner=bucket_owner)
 
     """
 
-    downloaded_files = []
-    if credentials is None:
-            s3 = boto3.client('s3', region_name=region)     
-    else:
-        s3 = boto3.client('s3', region_name=region, aws_access_key_id=credentials['AccessKeyId'], aws_secret_access_key=credentials['SecretAccessKey'], aws_session_token=credentials['SessionToken'])
-
-    ret = s3.list_objects(Bucket=bucket, Prefix=prefix)
-
-    for object in ret.get('Contents', []):
-        key = object['Key']
-        filename = os.path.basename(key)
-        local_directory = OUTPUT_DIR
-        local_path = os.path.join(local_directory, filename)
-        s3.download_file(bucket, key, local_path)
-        print('Downloaded {filename} to {local_path}'.format(filename=filename, local_path=local_path))
-        downloaded_files.append(local_path)
+    try:
+        content_hash = hashYaml(content)
+        if SKIP_UNCHANGED_ARTIFACTS == 'true' and isUnchanged(client=s3, bucket=bucket, key=key, contentHash=content_hash, bucketOwner=bucket_owner):
+            print('File {file} is already up to date in {bucket} at prefix {prefix}, skipping upload'.format(file=key, bucket=bucket, prefix=prefix))
+            return True
+        streamYaml(content, S3MultipartSink(client=s3, bucket=bucket, key=key, bucketOwner=bucket_owner, metadata=content_hash.getMetadata()))
+        print('File {file} uploaded successfully to {bucket} at prefix {prefix}'.format(file=key, bucket=bucket, prefix=prefix))
+    except ClientError as e:
+        logging.error(e)
+        print('There was an error uploading file {file} to {bucket} at prefix {prefix}'.format(file=key, bucket=bucket, prefix=prefix))
+        return False
+    return True
 
-    return downloaded_files
+def uploadTemplatesToS3(bucket: str, templates: dict, region: str, bucket_owner:str, prefix=None, credentials=None, max_workers:int=None):
 
-## Helper function that stores dashboard parameter definition in JSON into a given dynamo db table
-def store_dashboard_parameter_definition_in_dynamo(parameter_definition: dict, table_name: str, assetType:str, stage:str, region:str, parameter_help:dict, credentials=None):
     """
-    Helper function that stores dashboard parameter definition in JSON into a given dynamo db table
+    Helper function that uploads several CFN templates to S3 in parallel and returns the URL of each of them. A single client (whose connection
+    pool is shared by the upload threads) is used and the ownership of the bucket is checked once
 
     Parameters:
 
-    parameter_definition(dict): Dashboard parameter definition in JSON
-    parameter_help(dict): Parameter dictionary that contains a list of default values, description and type information for each parameter
-    table_name(str): Name of the dynamo db table where the parameter definition will be stored
-    credentials(dict): AWS credentials to be used in the upload operation
-    assetType(str): Type of the asset (valid values are dest or source)
-    stage(str): Stage of the dashboard (e.g. dev, prod)    
+    bucket(str): S3 bucket name
+    templates(dict): Dictionary of object name to the template to be uploaded
+    region(str): AWS region where the bucket is located
+    bucket_owner(str): Expected AWS account owning the bucket
+    prefix(str): Prefix to be used in the S3 object names
+    credentials(dict): AWS credentials to be used in the upload operations
+    max_workers(int): Number of concurrent uploads, NESTED_STACK_UPLOAD_MAX_WORKERS if not provided
 
     Returns:
 
-    True if the parameter definition was stored successfully, False otherwise
+    url_map(dict): Dictionary of object name to the S3 URL of the uploaded template (stable across runs, unlike a presigned URL, so the templates
+    that embed it hash the same when nothing changed)
+
+    Raises:
+
+    ValueError: If the bucket doesn't belong to bucket_owner or any of the templates couldn't be uploaded
 
     Examples:
 
-    >>> store_dashboard_parameter_definition_in_dynamo(parameter_definition=parameter_definition, table_name=table_name, assetId=assetId, stage=stage, assetType=assetType)
+    >>> uploadTemplatesToS3(bucket=DEPLOYMENT_S3_BUCKET, templates=templates, region=region, bucket_owner=bucket_owner, prefix=prefix, credentials=credentials)
 
     """
 
-    if assetType not in ['dest', 'source']:
-       raise ValueError('Invalid asset type {assetType}, should be either dest or source'.format(assetType=assetType))
+    max_workers = max_workers if max_workers is not None else NESTED_STACK_UPLOAD_MAX_WORKERS
+    s3 = aws_clients.getClient('s3', region=region, credentials=credentials)
 
-    if credentials is None:
-        dynamodb = boto3.resource('dynamodb', region_name=region)
-    else:
-        dynamodb = boto3.resource('dynamodb', region_name=region, aws_access_key_id=credentials['AccessKeyId'], aws_secret_access_key=credentials['SecretAccessKey'], aws_session_token=credentials['SessionToken'])
-    
-    table = dynamodb.Table(table_name)
+    if not aws_clients.isBucketOwnedBy(bucket=bucket, bucketOwner=bucket_owner, region=region, credentials=credentials):
+        raise ValueError('The provided bucket {bucket} doesn\'t belong to the expected account {account_id}'.format(bucket=bucket, account_id=bucket_owner))
 
-    try:
-        response = table.put_item(
-            Item= {
-                'AssetType': assetType,
-                'StageName': stage,
-                'ParameterDefinition': parameter_definition,
-                'ParameterDefinitionHelp': parameter_help
-            }
-        )
-    except ClientError as e:
-        logging.error(e)
-        return False
-    return True
+    keys = {}
+    for object_name in templates.keys():
+        if prefix is None:
+            keys[object_name] = object_name
+        elif prefix[-1] != '/':
+            keys[object_name] = '{prefix}/{object}'.format(prefix=prefix, object=object_name)
+        else:
+            keys[object_name] = '{prefix}{object}'.format(prefix=prefix, object=object_name)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(templates)))) as executor:
+        futures = {object_name: executor.submit(streamTemplateToS3, s3=s3, bucket=bucket, content=templates[object_name], key=keys[object_name], bucket_owner=bucket_owner, prefix=prefix)
+                   for object_name in templates.keys()}
+        failed = [object_name for object_name, future in futures.items() if not future.result()]
+    if len(failed) > 0:
+        raise ValueError('The following templates couldn\'t be uploaded to {bucket}: {templates}'.format(bucket=bucket, templates=', '.join(failed)))
+
+    # CloudFormation reads the templates with the credentials of the deploying role, which has access to the deployment bucket
+    url_map = {}
+    for object_name in templates.keys():
+        url_map[object_name] = 'https://{bucket}.s3.{region}.amazonaws.com/{key}'.format(bucket=bucket, region=region, key=quote(keys[object_name]))
+
+    return url_map
+
+#helper function to generate a presigned url in S3 from a given s3 url
+def generatePresignedUrl(bucket: str, key:str, region: str, credentials=None):
 
-def read_dashboard_parameter_definition_from_dynamo(table_name: str, assetType:str, stage:str, region:str, credentials=None):
     """
-    Helper function that reads the QuickSight asset parameter definition from a given DynamoDB table using sts provided credentials
+    Helper function that generates a presigne url in S3 from a given s3 url
 
     Parameters:
 
-    table_name(str): Name of the dynamo db table where the parameter definition is stored
+    s3_url(str): S3 url
+    region(str): AWS region where the bucket is located
     credentials(dict): AWS credentials to be used in the upload operation
-    assetType(str): Type of the asset (valid values are dest or source)
-    stage(str): Stage of the dashboard (e.g. dev, prod)
-    
-
 
     Returns:
 
-    parameter_definition(dict): Dashboard parameter definition in JSON
+    str: Presigned url
 
     Examples:
 
-    >>> read_dashboard_parameter_definition_from_dynamo(table_name=table_name, assetId=assetId, stage=stage, assetType=assetType)
+    >>> generatePresignedUrl(s3_url=s3_url, region=region, credentials=credentials)
 
     """
+    s3 = aws_clients.getClient('s3', region=region, credentials=credentials)
+    
+    # Generate a presigned URL for an S3 object
+    expires_in_seconds = 3600
 
-    if credentials is None:
-        dynamodb = boto3.resource('dynamodb', region_name=region)
-    else:
-        dynamodb = boto3.resource('dynamodb', region_name=region, aws_access_key_id=credentials['AccessKeyId'], aws_secret_access_key=credentials['SecretAccessKey'], aws_session_token=credentials['SessionToken'])
+    presigned_url = s3.generate_presigned_url(
+        ClientMethod='get_object',
+        Params={
+            'Bucket': bucket, 
+            'Key': key
+        },
+        ExpiresIn=expires_in_seconds
+    )
 
-    table = dynamodb.Table(table_name)
+    return presigned_url
 
-    try:
-        response = table.get_item(
-            Key={
-                'AssetType': assetType,
-                'StageName': stage
-            }
-        )
-        # filter out items based on assetType
-        if 'Item' not in response:
-            raise ValueError('No configuration item found in the response when querying {table} parameter table for stage {stage} and assetId {assetId}'.format(table=table_name, stage=stage, assetId=assetType))
-        parameter_definition = json.loads(response['Item']['ParameterDefinition'])
-    except ClientError as e:
-        logging.error(e)
-        return {}
 
-    return parameter_definition
 
-def read_all_assetIds_from_dynamo(region:str, credentials=None, table_name=TRACKED_ASSETS_TABLE_NAME):
+def list_s3_objects(bucket: str, prefix: str, region: str, credentials=None):
+
     """
-    Helper function that reads all the assetIds defined in a given DynamoDB table and returns the set of items
+    Helper function that lists all the objects in a particular S3 bucket with a particular prefix (every page of the listing)
 
     Parameters:
 
-    region(str): The AWS region where the table is located
-    credentials(dict): AWS credentials to be used in the upload operation
-    table_name(str): Name of the dynamo db table where the parameter definition is stored, defaults to the TRACKED_ASSETS_TABLE_NAME
+    bucket(str): S3 bucket name
+    prefix(str): Prefix of the S3 objects
+    region(str): AWS region where the bucket is located
+    credentials(dict): AWS credentials to be used in the list operation
 
     Returns:
 
-    assetIds(set): List of assetIds
+    list: List of objects (Key, ETag, Size ...) sorted by key
 
     Examples:
 
-    >>> read_all_assetIds_from_dynamo(table_name=table_name, credentials=credentials)
+    >>> list_s3_objects(bucket=DEPLOYMENT_S3_BUCKET, prefix=prefix, region=region, credentials=credentials)
 
     """
 
-    if credentials is None:
-        dynamodb = boto3.resource('dynamodb', region_name=region)
-    else:
-        dynamodb = boto3.resource('dynamodb', region_name=region, aws_access_key_id=credentials['AccessKeyId'], aws_secret_access_key=credentials['SecretAccessKey'], aws_session_token=credentials['SessionToken'])
-
-    table = dynamodb.Table(table_name)
+    s3 = aws_clients.getClient('s3', region=region, credentials=credentials)
+    objects = []
+    for page in s3.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix):
+        objects.extend(page.get('Contents', []))
 
-    try:
-        response = table.scan()
-        assetIds = [item['AssetId'] for item in response['Items']]
-    except ClientError as e:
-        logging.error(e)
+    return objects
 
-    return set(assetIds)
+def open_s3_objects(bucket: str, objects: list, bucket_owner:str, region: str, credentials=None):
 
-# helper function to validate if a given asset Id is a QuickSight dashboard
-def validate_asset_id(assetId:str, region:str, credentials=None):
     """
-    Helper function that validates if a given asset Id is a QuickSight dashboard
+    Helper function that opens S3 objects in order for the consumer. Small objects whose ETag didn't change since a previous invocation fetched them
+    are served from memory, the rest of the small objects are fetched ahead by a pool of S3_DOWNLOAD_MAX_WORKERS threads (at most that many are held
+    in memory) while the consumer reads the previous ones, and are kept in memory for later invocations. Larger objects are opened when they are
+    reached and their bodies are streamed (they are never fully read into memory)
 
     Parameters:
 
-    assetId(str): Asset ID of the dashboard
-    region(str): The AWS region where the table is located
-    credentials(dict): AWS credentials to be used in the upload operation
+    bucket(str): S3 bucket name
+    objects(list): Objects (Key and ETag) as returned by list_s3_objects
+    bucket_owner(str): Expected AWS account owning the bucket
+    region(str): AWS region where the bucket is located
+    credentials(dict): AWS credentials to be used in the get operations
 
     Returns:
 
-    True if the assetId is a QuickSight dashboard, False otherwise
+    Iterator[(dict, stream)]: Each object along with a readable stream of its content, in the same order. A stream must be consumed before the next
+    object is requested
+
+    Examples:
+
+    >>> for object, stream in open_s3_objects(bucket=DEPLOYMENT_S3_BUCKET, objects=objects, bucket_owner=bucket_owner, region=region, credentials=credentials):
+
+    """
+
+    s3 = aws_clients.getClient('s3', region=region, credentials=credentials)
+
+    def fetch(object: dict):
+        body = s3.get_object(Bucket=bucket, Key=object['Key'], ExpectedBucketOwner=bucket_owner)['Body']
+        try:
+            return body.read()
+        finally:
+            body.close()
+
+    # Small objects not cached are prefetched in order, keeping at most S3_DOWNLOAD_MAX_WORKERS of them ahead of the consumer
+    to_prefetch = iter([index for index, object in enumerate(objects)
+                        if object.get('Size', S3_OBJECT_CACHE_MAX_OBJECT_SIZE + 1) <= S3_OBJECT_CACHE_MAX_OBJECT_SIZE and object_contents.get(bucket, object['Key'], object['ETag']) is None])
+    prefetched = {}
+    with ThreadPoolExecutor(max_workers=max(1, S3_DOWNLOAD_MAX_WORKERS)) as executor:
+        for index, object in enumerate(objects):
+            while len(prefetched) < max(1, S3_DOWNLOAD_MAX_WORKERS):
+                next_index = next(to_prefetch, None)
+                if next_index is None:
+                    break
+                prefetched[next_index] = executor.submit(fetch, objects[next_index])
+
+            if index in prefetched:
+                content = prefetched.pop(index).result()
+                object_contents.put(bucket, object['Key'], object['ETag'], content, size=len(content))
+                yield object, io.BytesIO(content)
+                continue
+            content = object_contents.get(bucket, object['Key'], object['ETag'])
+            if content is not None:
+                yield object, io.BytesIO(content)
+                continue
+            body = s3.get_object(Bucket=bucket, Key=object['Key'], ExpectedBucketOwner=bucket_owner)['Body']
+            try:
+                reader = CapturingReader(body, maxCapture=S3_OBJECT_CACHE_MAX_OBJECT_SIZE)
+                yield object, reader
+            finally:
+                body.close()
+            content = reader.getCaptured()
+            if content is not None:
+                object_contents.put(bucket, object['Key'], object['ETag'], content, size=len(content))
+
+# helper function that returns the DynamoDB access layer of a table
+def get_dynamo_table(table_name: str, key_attributes: list, region: str, credentials=None):
+    """
+    Helper function that returns the DynamoDB access layer (paginated scans, batched reads and batched writes) of a table
+
+    Parameters:
+
+    table_name(str): Name of the dynamo db table
+    key_attributes(list): Names of the key attributes of the table (partition and sort key)
+    region(str): The AWS region where the table is located
+    credentials(dict): AWS credentials to be used in the DynamoDB operations
+
+    Returns:
+
+    table(DynamoTable): Access layer of the table
+
+    Examples:
+
+    >>> get_dynamo_table(table_name=PARAMETER_DEFINITION_TABLE_NAME, key_attributes=PARAMETER_DEFINITION_KEY_ATTRIBUTES, region=region, credentials=credentials)
+
+    """
+
+    resource = aws_clients.getResource('dynamodb', region=region, credentials=credentials)
+    return DynamoTable(resource=resource, table=aws_clients.getTable(table_name, region=region, credentials=credentials), keyAttributes=key_attributes)
+
+# helper function that returns the key of a parameter definition item
+def get_parameter_shard_key(assetType: str, stage: str, parameterKey: str = None):
+    """
+    Helper function that returns the key of the item of a parameter (sort key <assetType>#PARAM#<ParameterKey>) or, when parameterKey is not
+    provided, the key of the manifest item of the asset type and stage (sort key <assetType>, the item that held the whole definition before it was sharded)
+
+    Parameters:
+
+    assetType(str): Type of the asset (valid values are dest or source)
+    stage(str): Stage of the dashboard (e.g. dev, prod)
+    parameterKey(str): Name of the CFN parameter
+
+    Returns:
+
+    key(dict): Key of the item in the parameter definition table
+
+    Examples:
+
+    >>> get_parameter_shard_key(assetType='dest', stage='PRO', parameterKey='DataSourcedsath1WorkGroup')
+
+    """
+
+    if parameterKey is None:
+        return {'StageName': stage, 'AssetType': assetType}
+    return {'StageName': stage, 'AssetType': '{asset_type}{separator}{parameter}'.format(asset_type=assetType, separator=PARAMETER_SHARD_SEPARATOR, parameter=parameterKey)}
+
+## Helper function that stores the parameter definitions of several stages and asset types into a given dynamo db table, one item per parameter
+def store_dashboard_parameter_definitions_in_dynamo(parameter_definitions: list, table_name: str, region:str, credentials=None, replace_legacy=False):
+    """
+    Helper function that stores the parameter definitions of several stages and asset types into a given dynamo db table. Each parameter is stored in
+    its own item (ParameterKey, ParameterValue, ParameterPosition and ParameterHelp attributes) so definitions are not bound by the DynamoDB item
+    size limit, the <assetType> item of each stage becomes the manifest of the sharded layout (replacing the ParameterDefinition attribute of the
+    previous layout). The items that are already stored with the same content are not written again, the others are written with a batch writer.
+    Manifests are only written once every parameter item is stored (a failure leaves the previous manifest, and the definition it holds, in place)
+    and the items of parameters that are no longer defined are deleted last
+
+    Parameters:
+
+    parameter_definitions(list): List of dictionaries with the assetType (dest or source), stage, parameter_definition (list of ParameterKey and ParameterValue, or its JSON)
+    and parameter_help (dictionary of parameter to its description and type, or its JSON) to store
+    table_name(str): Name of the dynamo db table where the parameter definitions will be stored
+    region(str): The AWS region where the table is located
+    credentials(dict): AWS credentials to be used in the DynamoDB operations
+    replace_legacy(bool): Whether the manifests replace items of the previous layout (migration). Definitions already migrated by a concurrent invocation
+    are skipped and manifests are only written if the item still holds the ParameterDefinition attribute
+
+    Returns:
+
+    True if the parameter definitions were stored successfully, False otherwise
+
+    Examples:
+
+    >>> store_dashboard_parameter_definitions_in_dynamo(parameter_definitions=[{'assetType': 'dest', 'stage': 'PRO', 'parameter_definition': parameter_definition, 'parameter_help': parameter_help}], table_name=table_name, region=region)
+
+    """
+
+    manifests = []
+    shards_by_manifest = {}
+    for definition in parameter_definitions:
+        if definition['assetType'] not in ['dest', 'source']:
+            raise ValueError('Invalid asset type {assetType}, should be either dest or source'.format(assetType=definition['assetType']))
+        parameter_list = json.loads(definition['parameter_definition']) if type(definition['parameter_definition']) is str else definition['parameter_definition']
+        parameter_help = json.loads(definition['parameter_help']) if type(definition['parameter_help']) is str else definition['parameter_help']
+        manifest = dict(get_parameter_shard_key(definition['assetType'], definition['stage']), Layout=PARAMETER_SHARDED_LAYOUT)
+        manifests.append(manifest)
+        shards_by_manifest[(definition['stage'], definition['assetType'])] = [
+            dict(get_parameter_shard_key(definition['assetType'], definition['stage'], parameter['ParameterKey']),
+                 ParameterKey=parameter['ParameterKey'], ParameterValue=parameter['ParameterValue'], ParameterPosition=position,
+                 ParameterHelp=json.dumps(parameter_help.get(parameter['ParameterKey'], {}), indent=2))
+            for position, parameter in enumerate(parameter_list)]
+
+    table = get_dynamo_table(table_name=table_name, key_attributes=PARAMETER_DEFINITION_KEY_ATTRIBUTES, region=region, credentials=credentials)
+
+    try:
+        if replace_legacy:
+            # definitions migrated by a concurrent invocation are left as they are, their parameter values may have been edited since
+            stored_manifests = table.batchGet([get_parameter_shard_key(manifest['AssetType'], manifest['StageName']) for manifest in manifests], attributes=['Layout'])
+            for key, manifest in stored_manifests.items():
+                if manifest.get('Layout') == PARAMETER_SHARDED_LAYOUT:
+                    print('Parameter definition of {key} was already migrated, keeping the stored one'.format(key=key))
+            manifests = [manifest for manifest in manifests if stored_manifests.get(table.getKey(manifest), {}).get('Layout') != PARAMETER_SHARDED_LAYOUT]
+        items = [shard for manifest in manifests for shard in shards_by_manifest[table.getKey(manifest)]]
+
+        # the batch writer retries unprocessed items until every parameter item is stored, an error is raised before any manifest is written
+        written = table.putChanged(items)
+        if replace_legacy:
+            # the legacy definition is only replaced if it is still there
+            manifests = [manifest for manifest in manifests if table.putConditional(manifest, Attr('ParameterDefinition').exists())]
+            written.extend(table.getKey(manifest) for manifest in manifests)
+        else:
+            written.extend(table.putChanged(manifests))
+
+        stored = {table.getKey(item) for item in items}
+        stale = []
+        for manifest in manifests:
+            shards = table.query(Key('StageName').eq(manifest['StageName']) & Key('AssetType').begins_with(manifest['AssetType'] + PARAMETER_SHARD_SEPARATOR), attributes=[], ConsistentRead=True)
+            stale.extend(shard for shard in shards if table.getKey(shard) not in stored)
+        table.deleteKeys(stale)
+        print('Stored {written} parameter definition items in {table}, {unchanged} were already up to date and {deleted} were deleted'
+              .format(written=len(written), table=table_name, unchanged=len(items) + len(manifests) - len(written), deleted=len(stale)))
+    except ClientError as e:
+        logging.error(e)
+        return False
+    return True
+
+## Helper function that stores dashboard parameter definition in JSON into a given dynamo db table
+def store_dashboard_parameter_definition_in_dynamo(parameter_definition: dict, table_name: str, assetType:str, stage:str, region:str, parameter_help:dict, credentials=None):
+    """
+    Helper function that stores dashboard parameter definition in JSON into a given dynamo db table
+
+    Parameters:
+
+    parameter_definition(dict): Dashboard parameter definition in JSON
+    parameter_help(dict): Parameter dictionary that contains a list of default values, description and type information for each parameter
+    table_name(str): Name of the dynamo db table where the parameter definition will be stored
+    credentials(dict): AWS credentials to be used in the upload operation
+    assetType(str): Type of the asset (valid values are dest or source)
+    stage(str): Stage of the dashboard (e.g. dev, prod)    
+
+    Returns:
+
+    True if the parameter definition was stored successfully, False otherwise
+
+    Examples:
+
+    >>> store_dashboard_parameter_definition_in_dynamo(parameter_definition=parameter_definition, table_name=table_name, assetId=assetId, stage=stage, assetType=assetType)
+
+    """
+
+    return store_dashboard_parameter_definitions_in_dynamo(parameter_definitions=[{'assetType': assetType, 'stage': stage, 'parameter_definition': parameter_definition, 'parameter_help': parameter_help}],
+                                                           table_name=table_name, region=region, credentials=credentials)
+
+def migrate_parameter_definitions_in_dynamo(table_name: str, legacy_items: list, region:str, credentials=None):
+    """
+    Helper function that migrates parameter definitions stored with the previous layout (the whole definition in the ParameterDefinition attribute and its
+    help in the ParameterDefinitionHelp attribute of the <assetType> item) to the sharded layout, keeping the parameter values configured by the user
+
+    Parameters:
+
+    table_name(str): Name of the dynamo db table where the parameter definitions are stored
+    legacy_items(list): Items of the previous layout
+    region(str): The AWS region where the table is located
+    credentials(dict): AWS credentials to be used in the DynamoDB operations
+
+    Returns:
+
+    parameter_definitions(dict): Dictionary of (assetType, stage) to the migrated parameter definition
+
+    Examples:
+
+    >>> migrate_parameter_definitions_in_dynamo(table_name=table_name, legacy_items=[item], region=region)
+
+    """
+
+    definitions = [{'assetType': item['AssetType'], 'stage': item['StageName'], 'parameter_definition': json.loads(item['ParameterDefinition']),
+                    'parameter_help': json.loads(item['ParameterDefinitionHelp']) if 'ParameterDefinitionHelp' in item else {}} for item in legacy_items]
+    print('Migrating the parameter definitions of {keys} in {table} to one item per parameter'
+          .format(keys=[(definition['assetType'], definition['stage']) for definition in definitions], table=table_name))
+    if not store_dashboard_parameter_definitions_in_dynamo(parameter_definitions=definitions, table_name=table_name, region=region, credentials=credentials, replace_legacy=True):
+        print('WARNING: parameter definitions could not be migrated, they will be migrated on the next read')
+
+    return {(definition['assetType'], definition['stage']): definition['parameter_definition'] for definition in definitions}
+
+def read_dashboard_parameter_definitions_from_dynamo(table_name: str, keys: list, region:str, credentials=None, parameter_keys: list = None):
+    """
+    Helper function that reads the QuickSight asset parameter definitions of several stages and asset types from a given DynamoDB table. The manifest
+    items are read with batched reads, then the parameter items of each stage are read with a query (in parallel) projecting only the key and value of
+    the parameters. If parameter_keys is provided (e.g. the parameters of a nested stack group) only the items of those parameters are read with
+    batched reads. Definitions stored with the previous layout are migrated to the sharded layout the first time they are read
+
+    Parameters:
+
+    table_name(str): Name of the dynamo db table where the parameter definitions are stored
+    keys(list): List of (assetType, stage) tuples to read
+    region(str): The AWS region where the table is located
+    credentials(dict): AWS credentials to be used in the DynamoDB operations
+    parameter_keys(list): Names of the parameters to read, all the parameters are read if not provided
+
+    Returns:
+
+    parameter_definitions(dict): Dictionary of (assetType, stage) to the parameter definition (list of ParameterKey and ParameterValue)
+
+    Raises:
+
+    ValueError: If there is no item for one of the keys
+
+    Examples:
+
+    >>> read_dashboard_parameter_definitions_from_dynamo(table_name=table_name, keys=[('dest', 'PRE'), ('dest', 'PRO')], region=region)
+    >>> read_dashboard_parameter_definitions_from_dynamo(table_name=table_name, keys=[('dest', 'PRO')], region=region, parameter_keys=list(group_template['Parameters'].keys()))
+
+    """
+
+    table = get_dynamo_table(table_name=table_name, key_attributes=PARAMETER_DEFINITION_KEY_ATTRIBUTES, region=region, credentials=credentials)
+    shard_attributes = ['ParameterKey', 'ParameterValue', 'ParameterPosition']
+
+    def read_shards(key):
+        assetType, stage = key
+        return table.query(Key('StageName').eq(stage) & Key('AssetType').begins_with(assetType + PARAMETER_SHARD_SEPARATOR), attributes=shard_attributes, ConsistentRead=True)
+
+    def to_definition(shards):
+        # parameters added by hand (without position) go last
+        ordered = sorted(shards, key=lambda shard: (int(shard['ParameterPosition']) if 'ParameterPosition' in shard else float('inf'), shard['ParameterKey']))
+        return [{'ParameterKey': shard['ParameterKey'], 'ParameterValue': shard['ParameterValue']} for shard in ordered]
+
+    parameter_definitions = {}
+    try:
+        manifests = table.batchGet([get_parameter_shard_key(assetType, stage) for assetType, stage in keys])
+
+        legacy_items = []
+        sharded_keys = []
+        for assetType, stage in keys:
+            item = manifests.get((stage, assetType))
+            if item is None:
+                raise ValueError('No configuration item found in the response when querying {table} parameter table for stage {stage} and assetId {assetId}'.format(table=table_name, stage=stage, assetId=assetType))
+            if item.get('Layout') == PARAMETER_SHARDED_LAYOUT:
+                sharded_keys.append((assetType, stage))
+            else:
+                legacy_items.append(item)
+
+        if len(legacy_items) > 0:
+            parameter_definitions.update(migrate_parameter_definitions_in_dynamo(table_name=table_name, legacy_items=legacy_items, region=region, credentials=credentials))
+            if parameter_keys is not None:
+                parameter_definitions = {key: [parameter for parameter in definition if parameter['ParameterKey'] in parameter_keys] for key, definition in parameter_definitions.items()}
+
+        if parameter_keys is None:
+            with ThreadPoolExecutor(max_workers=max(1, min(PARAMETER_DEFINITION_MAX_WORKERS, len(sharded_keys)))) as executor:
+                parameter_definitions.update(zip(sharded_keys, [to_definition(shards) for shards in executor.map(read_shards, sharded_keys)]))
+        else:
+            shards = table.batchGet([get_parameter_shard_key(assetType, stage, parameter) for assetType, stage in sharded_keys for parameter in parameter_keys], attributes=shard_attributes)
+            for assetType, stage in sharded_keys:
+                shard_keys = [table.getKey(get_parameter_shard_key(assetType, stage, parameter)) for parameter in parameter_keys]
+                parameter_definitions[(assetType, stage)] = to_definition([shards[key] for key in shard_keys if key in shards])
+    except ClientError as e:
+        logging.error(e)
+        return {key: [] for key in keys}
+
+    return {key: parameter_definitions[key] for key in keys}
+
+def read_dashboard_parameter_definition_from_dynamo(table_name: str, assetType:str, stage:str, region:str, credentials=None):
+    """
+    Helper function that reads the QuickSight asset parameter definition from a given DynamoDB table using sts provided credentials
+
+    Parameters:
+
+    table_name(str): Name of the dynamo db table where the parameter definition is stored
+    credentials(dict): AWS credentials to be used in the upload operation
+    assetType(str): Type of the asset (valid values are dest or source)
+    stage(str): Stage of the dashboard (e.g. dev, prod)
+    
+
+
+    Returns:
+
+    parameter_definition(dict): Dashboard parameter definition in JSON
+
+    Examples:
+
+    >>> read_dashboard_parameter_definition_from_dynamo(table_name=table_name, assetId=assetId, stage=stage, assetType=assetType)
+
+    """
+
+    return read_dashboard_parameter_definitions_from_dynamo(table_name=table_name, keys=[(assetType, stage)], region=region, credentials=credentials)[(assetType, stage)]
+
+def read_all_assetIds_from_dynamo(region:str, credentials=None, table_name=TRACKED_ASSETS_TABLE_NAME):
+    """
+    Helper function that reads all the assetIds defined in a given DynamoDB table and returns the set of items, every page of the scan is read
+    (DYNAMODB_SCAN_SEGMENTS segments in parallel)
+
+    Parameters:
+
+    region(str): The AWS region where the table is located
+    credentials(dict): AWS credentials to be used in the upload operation
+    table_name(str): Name of the dynamo db table where the parameter definition is stored, defaults to the TRACKED_ASSETS_TABLE_NAME
+
+    Returns:
+
+    assetIds(set): List of assetIds
+
+    Examples:
+
+    >>> read_all_assetIds_from_dynamo(table_name=table_name, credentials=credentials)
+
+    """
+
+    table = get_dynamo_table(table_name=table_name, key_attributes=TRACKED_ASSETS_KEY_ATTRIBUTES, region=region, credentials=credentials)
+
+    assetIds = []
+    try:
+        assetIds = [item['AssetId'] for item in table.scan(segments=DYNAMODB_SCAN_SEGMENTS)]
+    except ClientError as e:
+        logging.error(e)
+
+    return set(assetIds)
+
+# helper function to validate if a given asset Id is a QuickSight dashboard
+def validate_asset_id(assetId:str, region:str, credentials=None):
+    """
+    Helper function that validates if a given asset Id is a QuickSight dashboard
+
+    Parameters:
+
+    assetId(str): Asset ID of the dashboard
+    region(str): The AWS region where the table is located
+    credentials(dict): AWS credentials to be used in the upload operation
+
+    Returns:
+
+    True if the assetId is a QuickSight dashboard, False otherwise
+
+    Examples:
+
+    >>> validate_asset_id(assetId=assetId, region=region, credentials=credentials)
+
+    """
+
+    # Use the shared (cached) client when possible so the describe_dashboard result is reused by discovery
+    quicksight = qs if region == AWS_REGION else aws_clients.getClient('quicksight', region=region)
+    
+    try:
+        response = quicksight.describe_dashboard(AwsAccountId=FIRST_STAGE_ACCOUNT_ID, DashboardId=assetId)
+    except quicksight.exceptions.ResourceNotFoundException as e:
+        print('The assetId {assetId} configured in the source DDB parameter table is not a QuickSight dashboard or the IAM role used by the function doesn''t have access to it, please fix and retry.'.format(assetId=assetId))
+        print('At the moment only dashboard objects are supported in the code for this Guidance')
+        return False
+    
+    return True
+
+def validate_asset_ids(assetIds:set, region:str):
+    """
+    Helper function that validates in bulk that all the given asset Ids are QuickSight dashboards. Dashboards are listed once (with pagination) and
+    each asset id is checked in memory, only ids that are not part of the listing are described individually to confirm they are not dashboards
+
+    Parameters:
+
+    assetIds(set): Asset IDs to validate
+    region(str): The AWS region where the dashboards are located
+
+    Returns:
+
+    invalid_asset_ids(list): Sorted list of asset ids that are not QuickSight dashboards (empty if all of them are valid)
+
+    Examples:
+
+    >>> validate_asset_ids(assetIds=asset_id_list, region=region)
+
+    """
+
+    dashboard_ids = set()
+    paginator = qs.get_paginator('list_dashboards')
+
+    for page in paginator.paginate(AwsAccountId=FIRST_STAGE_ACCOUNT_ID):
+        for summary in page['DashboardSummaryList']:
+            dashboard_ids.add(summary['DashboardId'])
+
+    invalid_asset_ids = []
+
+    for assetId in sorted(assetIds):
+        if assetId in dashboard_ids:
+            continue
+        if not validate_asset_id(assetId=assetId, region=region):
+            invalid_asset_ids.append(assetId)
+
+    return invalid_asset_ids
+
+def get_metadata_store(credentials=None):
+    """
+    Helper function that returns the store used to persist QuickSight describe results across invocations according to METADATA_CACHE_STORE
+    (S3 to use the deployment bucket, LOCAL to use a local file or NONE to disable the persistent cache)
+
+    Parameters:
+
+    credentials(dict): AWS credentials to be used to access the deployment bucket
+
+    Returns:
+
+    store(S3MetadataStore|LocalFileMetadataStore): Metadata store or None if the persistent cache is disabled
+
+    Examples:
+
+    >>> get_metadata_store(credentials=credentials)
+
+    """
+
+    if METADATA_CACHE_STORE == 'S3':
+        s3 = aws_clients.getClient('s3', region=DEPLOYMENT_S3_REGION, credentials=credentials)
+        return S3MetadataStore(client=s3, bucket=DEPLOYMENT_S3_BUCKET, key=METADATA_CACHE_KEY, bucketOwner=DEPLOYMENT_ACCOUNT_ID)
+    elif METADATA_CACHE_STORE == 'LOCAL':
+        return LocalFileMetadataStore(path=METADATA_CACHE_LOCAL_PATH)
+
+    return None
+
+def list_asset_versions():
+    """
+    Helper function that lists analyses, datasets and datasources in the first stage account and returns their LastUpdatedTime, used to validate
+    the entries of the persistent metadata cache
+
+    Parameters:
+
+    None
+
+    Returns:
+
+    versions(dict): LastUpdatedTime of each resource indexed by the describe operation and resource id {operation: {resourceId: str}}
+
+    Examples:
+
+    >>> list_asset_versions()
+
+    """
+
+    LIST_OPERATIONS = [
+        ('describe_analysis', 'list_analyses', 'AnalysisSummaryList', 'AnalysisId'),
+        ('describe_data_set', 'list_data_sets', 'DataSetSummaries', 'DataSetId'),
+        ('describe_data_source', 'list_data_sources', 'DataSources', 'DataSourceId')
+    ]
+
+    versions = {}
+
+    for describe_operation, list_operation, list_key, id_key in LIST_OPERATIONS:
+        versions[describe_operation] = {}
+        paginator = qs.get_paginator(list_operation)
+        for page in paginator.paginate(AwsAccountId=FIRST_STAGE_ACCOUNT_ID):
+            for summary in page[list_key]:
+                if 'LastUpdatedTime' in summary:
+                    versions[describe_operation][summary[id_key]] = str(summary['LastUpdatedTime'])
+
+    return versions
+
+def load_persistent_metadata_cache(store):
+    """
+    Helper function that loads the describe results persisted by previous invocations into the describe cache, entries are only reused if the resource
+    LastUpdatedTime didn't change. Errors are logged and the invocation proceeds with an empty cache
+
+    Parameters:
+
+    store(S3MetadataStore|LocalFileMetadataStore): Metadata store to load the entries from
+
+    Returns:
+
+    None
+
+    Examples:
+
+    >>> load_persistent_metadata_cache(store=store)
+
+    """
+
+    if store is None:
+        return
+
+    try:
+        persisted = store.load()
+        versions = list_asset_versions()
+    except (ClientError, BotoCoreError, ValueError) as error:
+        logging.error(error)
+        print('Could not load the persistent metadata cache, all QuickSight assets will be described')
+        return
+
+    entries = persisted['Entries'] if 'Entries' in persisted else {}
+    qs.loadPersistentEntries(entries=entries, versions=versions)
+
+def save_persistent_metadata_cache(store, keep_persisted=False):
+    """
+    Helper function that persists the describe results used in this invocation so they can be reused by subsequent invocations
+
+    Parameters:
+
+    store(S3MetadataStore|LocalFileMetadataStore): Metadata store to save the entries to
+    keep_persisted(bool): Whether up to date entries loaded from the store but not used in this invocation should be kept (incremental synthesis)
+
+    Returns:
+
+    None
+
+    Examples:
+
+    >>> save_persistent_metadata_cache(store=store)
+
+    """
+
+    if store is None:
+        return
+
+    try:
+        store.save({'Entries': qs.dumpPersistentEntries(keepPersisted=keep_persisted)})
+    except (ClientError, BotoCoreError, OSError) as error:
+        logging.error(error)
+        print('Could not save the persistent metadata cache, next invocation will describe all QuickSight assets again')
+
+def get_synthesis_state_store(credentials=None):
+    """
+    Helper function that returns the store keeping the last synthesized templates and their dashboard ownership manifest, used by the incremental
+    synthesis of EventBridge invocations
+
+    Parameters:
+
+    credentials(dict): AWS credentials to be used to access the deployment bucket
+
+    Returns:
+
+    store(S3SynthesisStateStore): Synthesis state store
+
+    Examples:
+
+    >>> get_synthesis_state_store(credentials=credentials)
+
+    """
+
+    s3 = aws_clients.getClient('s3', region=DEPLOYMENT_S3_REGION, credentials=credentials)
+
+    return S3SynthesisStateStore(client=s3, bucket=DEPLOYMENT_S3_BUCKET, key=SYNTHESIS_STATE_KEY, bucketOwner=DEPLOYMENT_ACCOUNT_ID)
+
+def get_export_job_store(credentials=None):
+    """
+    Helper function that returns the store keeping the Assets as Bundle export job in progress, so the invocation that started it can return before it
+    finishes and a later invocation resumes it
+
+    Parameters:
+
+    credentials(dict): AWS credentials to be used to access the deployment bucket
+
+    Returns:
+
+    store(S3ExportJobStore): Export job store
+
+    Examples:
+
+    >>> get_export_job_store(credentials=credentials)
+
+    """
+
+    s3 = aws_clients.getClient('s3', region=DEPLOYMENT_S3_REGION, credentials=credentials)
+
+    return S3ExportJobStore(client=s3, bucket=DEPLOYMENT_S3_BUCKET, key=EXPORT_JOB_KEY, bucketOwner=DEPLOYMENT_ACCOUNT_ID)
+
+def load_pending_export_job(store):
+    """
+    Helper function that loads the Assets as Bundle export job a previous invocation left in progress
+
+    Parameters:
+
+    store(S3ExportJobStore): Export job store
+
+    Returns:
+
+    job(dict): Persisted export job (JobId, JobStatus, ResourceArns, Remap and the Inputs of the synthesis that started it) or None if there is no job to resume
+
+    Examples:
+
+    >>> load_pending_export_job(store=store)
+
+    """
+
+    try:
+        return store.loadPending()
+    except (ClientError, ValueError) as error:
+        logging.error(error)
+        print('Could not load the pending export job, a new one will be started')
+        return None
+
+def load_previous_synthesis(store):
+    """
+    Helper function that loads the state of the previous synthesis (its templates and manifest), used to incrementally synthesize EventBridge
+    invocations and to detect if the new synthesis changed anything
+
+    Parameters:
+
+    store(S3SynthesisStateStore): Synthesis state store
+
+    Returns:
+
+    state(dict): Previous synthesis state {'Manifest': dict, 'Source': dict, 'Dest': dict, 'Published': bool} or None if there is no (readable) previous
+    state. Published tells whether the artifacts built from it were uploaded
+
+    Examples:
+
+    >>> load_previous_synthesis(store=store)
+
+    """
+
+    try:
+        state = store.load()
+    except (ClientError, yaml.YAMLError) as error:
+        logging.error(error)
+        print('Could not load the previous synthesis state')
+        return None
+
+    if state is None:
+        print('No previous synthesis state found')
+
+    return state
+
+def load_synthesis_state(state, asset_id_list:list, remap:bool, updated_dashboard_id:str):
+    """
+    Helper function that checks if the state of the previous synthesis can be used to incrementally synthesize the updated dashboard, that is only
+    possible if the previous synthesis covered exactly the same tracked dashboards with the same replication settings
+
+    Parameters:
+
+    state(dict): Previous synthesis state as returned by load_previous_synthesis
+    asset_id_list(list): Ids of the tracked dashboards
+    remap(bool): Whether datasources are remapped in this invocation
+    updated_dashboard_id(str): Id of the dashboard that triggered the invocation
+
+    Returns:
+
+    state(dict): Previous synthesis state {'Manifest': dict, 'Source': dict, 'Dest': dict} or None if a full synthesis is needed
+
+    Examples:
+
+    >>> load_synthesis_state(state=previous_synthesis, asset_id_list=asset_id_list, remap=remap, updated_dashboard_id=updated_dashboard_id)
+
+    """
+
+    if state is None:
+        print('No previous synthesis state available, performing a full synthesis')
+        return None
+
+    manifest = state['Manifest']
+    if manifest.get('Version') != SYNTHESIS_STATE_VERSION or manifest.get('ReplicationMethod') != REPLICATION_METHOD or manifest.get('Remap') != remap:
+        print('Previous synthesis was done with different settings, performing a full synthesis')
+        return None
+
+    if manifest.get('TrackedAssets') != sorted(asset_id_list) or updated_dashboard_id not in manifest.get('Dashboards', {}):
+        print('Tracked dashboards changed since the previous synthesis, performing a full synthesis')
+        return None
+
+    return state
+
+def build_synthesis_manifest(source_account_yaml:dict, dest_account_yaml:dict, assetGraph:QSAssetGraph, asset_id_list:list, remap:bool, previous_manifest=None):
+    """
+    Helper function that builds the manifest of a synthesis, recording which resources and outputs of the SOURCE and DEST templates belong to each
+    dashboard. Dashboards not present in the asset graph (not re-synthesized in an incremental invocation) keep the ownership of the previous manifest
+
+    Parameters:
+
+    source_account_yaml(dict): Synthesized source template
+    dest_account_yaml(dict): Synthesized dest template
+    assetGraph(QSAssetGraph): Dependency graph of the synthesized dashboards
+    asset_id_list(list): Ids of the tracked dashboards
+    remap(bool): Whether datasources were remapped
+    previous_manifest(dict): Manifest of the previous synthesis (incremental invocations only)
+
+    Returns:
+
+    manifest(dict): Synthesis manifest
+
+    Examples:
+
+    >>> build_synthesis_manifest(source_account_yaml=source_account_yaml, dest_account_yaml=dest_account_yaml, assetGraph=assetGraph, asset_id_list=asset_id_list, remap=remap)
+
+    """
+
+    asset_ids_by_dashboard = {analysisObj.AssociatedDashboardId: assetGraph.getAssetIdsOfAnalysis(analysisObj.id) for analysisObj in assetGraph.getAnalyses()}
+    source_ownership = getResourceOwnership(template=source_account_yaml, assetIdsByDashboard=asset_ids_by_dashboard)
+    dest_ownership = getResourceOwnership(template=dest_account_yaml, assetIdsByDashboard=asset_ids_by_dashboard)
+    source_output_ownership = getOutputOwnership(template=source_account_yaml, assetIdsByDashboard=asset_ids_by_dashboard, ownership=source_ownership)
+    dest_output_ownership = getOutputOwnership(template=dest_account_yaml, assetIdsByDashboard=asset_ids_by_dashboard, ownership=dest_ownership)
+
+    def kept_outputs(outputs:dict, template:dict):
+        return {name: output for name, output in outputs.items() if template.get('Outputs', {}).get(name) == output}
+
+    dashboards = {}
+    if previous_manifest is not None:
+        for dashboard_id, owned in previous_manifest['Dashboards'].items():
+            dashboards[dashboard_id] = {
+                'Source': [logical_id for logical_id in owned['Source'] if logical_id in source_account_yaml.get('Resources', {})],
+                'Dest': [logical_id for logical_id in owned['Dest'] if logical_id in dest_account_yaml.get('Resources', {})],
+                'SourceOutputs': kept_outputs(owned['SourceOutputs'], source_account_yaml),
+                'DestOutputs': kept_outputs(owned['DestOutputs'], dest_account_yaml)
+            }
+
+    for dashboard_id in asset_ids_by_dashboard:
+        dashboards[dashboard_id] = {
+            'Source': source_ownership[dashboard_id],
+            'Dest': dest_ownership[dashboard_id],
+            'SourceOutputs': source_output_ownership[dashboard_id],
+            'DestOutputs': dest_output_ownership[dashboard_id]
+        }
+
+    return {
+        'Version': SYNTHESIS_STATE_VERSION,
+        'ReplicationMethod': REPLICATION_METHOD,
+        'Remap': remap,
+        'TrackedAssets': sorted(asset_id_list),
+        'Dashboards': dashboards
+    }
+
+def merge_incremental_synthesis(state:dict, source_account_yaml:dict, dest_account_yaml:dict, updated_dashboard_id:str, asset_id_list:list):
+    """
+    Helper function that merges the templates synthesized for the updated dashboard into the templates of the previous synthesis
+
+    Parameters:
+
+    state(dict): Previous synthesis state as returned by load_synthesis_state
+    source_account_yaml(dict): Source template synthesized for the updated dashboard
+    dest_account_yaml(dict): Dest template synthesized for the updated dashboard
+    updated_dashboard_id(str): Id of the dashboard that triggered the invocation
+    asset_id_list(list): Ids of the tracked dashboards
+
+    Returns:
+
+    source_account_yaml, dest_account_yaml (dict): Merged source and dest templates
+
+    Examples:
+
+    >>> merge_incremental_synthesis(state=state, source_account_yaml=source_account_yaml, dest_account_yaml=dest_account_yaml, updated_dashboard_id=updated_dashboard_id, asset_id_list=asset_id_list)
+
+    """
+
+    dashboards = state['Manifest']['Dashboards']
+    # A full synthesis processes the dashboards in id order, Outputs are rebuilt in that order from the outputs each dashboard owns
+    dashboard_order = sorted(asset_id_list)
+
+    source_ownership = {dashboard_id: owned['Source'] for dashboard_id, owned in dashboards.items()}
+    dest_ownership = {dashboard_id: owned['Dest'] for dashboard_id, owned in dashboards.items()}
+    source_output_ownership = {dashboard_id: owned['SourceOutputs'] for dashboard_id, owned in dashboards.items()}
+    dest_output_ownership = {dashboard_id: owned['DestOutputs'] for dashboard_id, owned in dashboards.items()}
+
+    merged_source_yaml = mergeTemplates(previous=state['Source'], partial=source_account_yaml, ownership=source_ownership, dashboardId=updated_dashboard_id,
+                                        outputOwnership=source_output_ownership, dashboardOrder=dashboard_order)
+    merged_dest_yaml = mergeTemplates(previous=state['Dest'], partial=dest_account_yaml, ownership=dest_ownership, dashboardId=updated_dashboard_id,
+                                      outputOwnership=dest_output_ownership, dashboardOrder=dashboard_order)
+
+    return merged_source_yaml, merged_dest_yaml
+
+def stabilize_synthesized_templates(previous_source_yaml:dict, previous_dest_yaml:dict, source_account_yaml:dict, dest_account_yaml:dict):
+    """
+    Helper function that diffs the synthesized templates against the ones of the previous synthesis ignoring the values stamped with the synthesis
+    time (refresh schedules StartAfterDateTime). Materially unchanged resources get the volatile values of the previous synthesis back, so when
+    nothing changed the templates (and the artifacts built from them) are byte identical to the previous ones and the caller skips the artifacts, and
+    CloudFormation doesn't update resources that didn't change. The template VersionDescription and the analysis Updated tag are derived from the
+    source analysis LastUpdatedTime, editing the analysis changes them and is a material change
+
+    Parameters:
+
+    previous_source_yaml(dict): Source template of the previous synthesis
+    previous_dest_yaml(dict): Dest template of the previous synthesis
+    source_account_yaml(dict): Synthesized source template
+    dest_account_yaml(dict): Synthesized dest template
+
+    Returns:
+
+    source_account_yaml, dest_account_yaml (dict): Synthesized templates with the volatile values of unchanged resources reused
+    unchanged(bool): True if neither template has material changes
+
+    Examples:
+
+    >>> source_account_yaml, dest_account_yaml, unchanged = stabilize_synthesized_templates(previous_source_yaml=previous_source_yaml, previous_dest_yaml=previous_dest_yaml, source_account_yaml=source_account_yaml, dest_account_yaml=dest_account_yaml)
+
+    """
+
+    source_diff = TemplateDiff(previous=previous_source_yaml, current=source_account_yaml)
+    dest_diff = TemplateDiff(previous=previous_dest_yaml, current=dest_account_yaml)
+    # Refresh schedules can't start in the past, previous StartAfterDateTime values that already passed are not reused
+    not_before = datetime.now(tz=utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    source_account_yaml = reuseVolatileValues(previous=previous_source_yaml, current=source_account_yaml, logicalIds=source_diff.unchanged, notBefore=not_before)
+    dest_account_yaml = reuseVolatileValues(previous=previous_dest_yaml, current=dest_account_yaml, logicalIds=dest_diff.unchanged, notBefore=not_before)
+
+    for template_name, diff in [('SOURCE', source_diff), ('DEST', dest_diff)]:
+        print('{template_name} template: {added} added, {removed} removed, {changed} changed, {unchanged} unchanged resources, {parameters} changed parameters{outputs}'
+              .format(template_name=template_name, added=diff.added, removed=diff.removed, changed=diff.changed, unchanged=len(diff.unchanged),
+                      parameters=diff.changedParameters, outputs=', outputs changed' if diff.outputsChanged else ''))
+
+    unchanged = not source_diff.hasMaterialChanges() and not dest_diff.hasMaterialChanges()
+    if unchanged:
+        print('Nothing changed since the previous synthesis')
+
+    return source_account_yaml, dest_account_yaml, unchanged
+
+def save_synthesis_state(store, manifest:dict, source_account_yaml:dict, dest_account_yaml:dict):
+    """
+    Helper function that persists the synthesized templates and their manifest for the incremental synthesis of later invocations. Errors are logged
+    and the next EventBridge invocation will perform a full synthesis
+
+    Parameters:
+
+    store(S3SynthesisStateStore): Synthesis state store
+    manifest(dict): Synthesis manifest as returned by build_synthesis_manifest
+    source_account_yaml(dict): Synthesized source template
+    dest_account_yaml(dict): Synthesized dest template
+
+    Returns:
+
+    None
+
+    Examples:
+
+    >>> save_synthesis_state(store=store, manifest=manifest, source_account_yaml=source_account_yaml, dest_account_yaml=dest_account_yaml)
+
+    """
+
+    try:
+        store.save(manifest=manifest, sourceTemplate=source_account_yaml, destTemplate=dest_account_yaml)
+    except (ClientError, yaml.YAMLError) as error:
+        logging.error(error)
+        print('Could not save the synthesis state, next EventBridge invocation will perform a full synthesis')
+
+def mark_synthesis_published(store):
+    """
+    Helper function that records that the artifacts of the saved synthesis state were uploaded, so a later synthesis without material changes can
+    skip them. Errors are logged and the next synthesis will assemble the artifacts again
+
+    Parameters:
+
+    store(S3SynthesisStateStore): Synthesis state store
+
+    Returns:
+
+    None
 
     Examples:
 
-    >>> validate_asset_id(assetId=assetId, region=region, credentials=credentials)
+    >>> mark_synthesis_published(store=store)
 
     """
 
-    quicksight = boto3.client('quicksight', region_name=region)
-    
     try:
-        response = quicksight.describe_dashboard(AwsAccountId=FIRST_STAGE_ACCOUNT_ID, DashboardId=assetId)
-    except quicksight.exceptions.ResourceNotFoundException as e:
-        print('The assetId {assetId} configured in the source DDB parameter table is not a QuickSight dashboard or the IAM role used by the function doesn''t have access to it, please fix and retry.'.format(assetId=assetId))
-        print('At the moment only dashboard objects are supported in the code for this Guidance')
-        return False
-    
-    return True
+        store.markPublished()
+    except ClientError as error:
+        logging.error(error)
+        print('Could not mark the synthesis state as published, next synthesis will assemble the artifacts again')
 
 def writeToFile(filename: str, content: object, format="yaml"):
     """
-    Helper function that writes the contents of the object to a file
+    Helper function that writes the contents of the object to a file. The content is streamed to the file one resource at a time so the serialized
+    document is never held in memory as a whole
 
     Parameters:
 
@@ -1034,18 +2094,18 @@ def writeToFile(filename: str, content: object, format="yaml"):
 
     """
     
-    with open(filename, 'w+') as file:
-        if format == 'yaml':
-            yaml.dump(content, file)
-        elif format == 'json':
-            json.dump(content, file, indent=2)
-            
+    if format == 'yaml':
+        streamYaml(content, FileSink(filename))
+    elif format == 'json':
+        streamJson(content, FileSink(filename))
+
     
     return filename
 
 def assumeRoleInDeplAccount(role_arn):
     """
-    Helper function that assumes a role in the deployment account
+    Helper function that assumes a role in the deployment account, the credentials of a previous invocation are returned while they are valid for
+    more than ASSUMED_ROLE_MIN_VALIDITY_SECONDS
 
     Parameters:
 
@@ -1061,7 +2121,11 @@ def assumeRoleInDeplAccount(role_arn):
 
     """    
 
-    sts_client = boto3.client('sts')
+    credentials = assumed_role_credentials.get(role_arn)
+    if credentials is not None and (credentials['Expiration'] - datetime.now(tz=utc)).total_seconds() > ASSUMED_ROLE_MIN_VALIDITY_SECONDS:
+        return credentials
+
+    sts_client = aws_clients.getClient('sts')
 
     # The session name to identify the temporary session
     session_name = 'QSAutomationSession'
@@ -1073,7 +2137,10 @@ def assumeRoleInDeplAccount(role_arn):
         ExternalId=ASSUME_ROLE_EXT_ID
     )
 
-    return response['Credentials']
+    credentials = response['Credentials']
+    if isinstance(credentials.get('Expiration'), datetime):
+        assumed_role_credentials[role_arn] = credentials
+    return credentials
 
 def summarize_template(template_content: dict, templateName: str, s3Credentials: dict, conf_files_prefix: str):
     """
@@ -1112,14 +2179,14 @@ def summarize_template(template_content: dict, templateName: str, s3Credentials:
 
     print(DIVIDER_SECTION)
     print("Template {template_name} contains parameters that need to be set in CodePipeline's CloudFormation artifact. These can be configured in the DynamoDB table in your DEPLOYMENT" \
-           "account ({deployment_account_id}) {ddb_param_table} each development stage two records in this table with a different AssetType attribute value (source and dest)."\
-           "You will need to open this table in the DDB console and edit the records for each of the environments ({environments}) filling the ParameterDefinition attribute as"\
-           "needed and then execute this function with \"MODE\" : \"DEPLOY\" key present in the lambda event. Refer to https://a.co/0DrKhVm for more information on how to use this file"
+           "account ({deployment_account_id}) {ddb_param_table}, each development stage has one record per parameter in this table with an AssetType attribute value of"\
+           "source#PARAM#<ParameterKey> or dest#PARAM#<ParameterKey>. You will need to open this table in the DDB console and edit the records for each of the environments ({environments})"\
+           "filling the ParameterValue attribute as needed and then execute this function with \"MODE\" : \"DEPLOY\" key present in the lambda event. Refer to https://a.co/0DrKhVm for more information on how to use this file"
           .format(template_name=templateName, ddb_param_table=PARAMETER_DEFINITION_TABLE_NAME, deployment_account_id=DEPLOYMENT_ACCOUNT_ID, environments=parameters_info.keys()))
     print("You can access {ddb_param_table} table directly on the console using this link in your DEPLOYMENT_ACCOUNT ({deployment_account_id}): "\
            "https://{region}.console.aws.amazon.com/dynamodbv2/home?region={region}#item-explorer?fromTables=true&maximize=true&table={ddb_param_table}"
           .format(region=AWS_REGION, ddb_param_table=PARAMETER_DEFINITION_TABLE_NAME, deployment_account_id=DEPLOYMENT_ACCOUNT_ID))
-    print("Find below a list of the parameters needed for each stack (source and dest) this information is also available under the ParameterDefinitionHelp attribute for each DynamoDB record in the {ddb_param_table} table"
+    print("Find below a list of the parameters needed for each stack (source and dest) this information is also available under the ParameterHelp attribute of each parameter record in the {ddb_param_table} table"
           .format(ddb_param_table=PARAMETER_DEFINITION_TABLE_NAME))
     print("")
     for parameter in parameters_info.keys():
@@ -1172,7 +2239,7 @@ def generate_cloudformation_template_parameters(template_content: dict):
 
     return parameter_list
 
-def check_parameters_cloudformation(template_param_list, region, credentials, assetType):
+def check_parameters_cloudformation(template_param_list, region, credentials, assetType, parameter_definitions=None):
     """
     Helper function that checks if the parameters defined in the template are the same as the ones defined in the DynamoDB parameter definition table
 
@@ -1182,10 +2249,11 @@ def check_parameters_cloudformation(template_param_list, region, credentials, as
     region(str): The AWS region where the table is located
     credentials(dict): AWS credentials to be used in the upload operation
     assetType(str): Type of asset, either 'dest' or 'source'    
+    parameter_definitions(dict): Parameter definitions keyed by (assetType, stage) as returned by read_dashboard_parameter_definitions_from_dynamo, read from DynamoDB if not provided
 
     Returns:
 
-    None
+    changed(bool): True if the parameter file of any stage was uploaded because its content changed
 
     Examples:
 
@@ -1197,12 +2265,15 @@ def check_parameters_cloudformation(template_param_list, region, credentials, as
         raise ValueError('Invalid asset type {assetType}, should be either dest or source'.format(assetType=assetType))
     
     
-    deployment_stages = STAGES_NAMES.split(",")[1:]
+    deployment_stages = [stage.strip() for stage in STAGES_NAMES.split(",")[1:]]
+    changed = False
+    if parameter_definitions is None:
+        parameter_definitions = read_dashboard_parameter_definitions_from_dynamo(table_name=PARAMETER_DEFINITION_TABLE_NAME, keys=[(assetType, stage) for stage in deployment_stages], region=region, credentials=credentials)
+
     for stage in deployment_stages:
-        stage = stage.strip()
         print('Checking {asset_type} parameters for stage {stage}'.format(stage=stage, asset_type=assetType))
         key = '{prefix}/{asset_type}_cfn_template_parameters_{stage}.txt'.format(prefix=CONFIGURATION_FILES_PREFIX, asset_type=assetType, stage=stage.strip())
-        file_param_obj = read_dashboard_parameter_definition_from_dynamo(table_name=PARAMETER_DEFINITION_TABLE_NAME, assetType=assetType, stage=stage, region=region, credentials=credentials)
+        file_param_obj = parameter_definitions[(assetType, stage)]
         
         file_param_object_keys = []
         template_param_object_keys = []
@@ -1231,10 +2302,43 @@ def check_parameters_cloudformation(template_param_list, region, credentials, as
                   .format(table=PARAMETER_DEFINITION_TABLE_NAME, stage=stage, asset_type=assetType))
             
             param_file_path = writeToFile('{output_dir}/{asset_type}_cfn_template_parameters_{stage}.txt'.format(output_dir=OUTPUT_DIR, asset_type=assetType, stage=stage.strip()), content=file_param_obj, format='json')            
+            if SKIP_UNCHANGED_ARTIFACTS == 'true' and isParameterFileUnchanged(filename=param_file_path, key=key, region=region, credentials=credentials):
+                print('Parameter file {file} is already up to date in {bucket}'.format(file=key, bucket=DEPLOYMENT_S3_BUCKET))
+                continue
             uploadFileToS3(bucket=DEPLOYMENT_S3_BUCKET, filename=param_file_path, region=region, object_name=os.path.basename(key), prefix=CONFIGURATION_FILES_PREFIX, bucket_owner=DEPLOYMENT_ACCOUNT_ID, credentials=credentials)
+            changed = True
     
 
-    return
+    return changed
+
+def isParameterFileUnchanged(filename: str, key: str, region: str, credentials=None):
+    """
+    Helper function that checks whether the stage parameter file stored in the deployment bucket already has the content of filename, errors are
+    reported as changed
+
+    Parameters:
+
+    filename(str): Local parameter file
+    key(str): S3 key of the parameter file
+    region(str): AWS region where the bucket is located
+    credentials(dict): AWS credentials to be used in the check
+
+    Returns:
+
+    True if the parameter file is up to date, False otherwise
+
+    Examples:
+
+    >>> isParameterFileUnchanged(filename=param_file_path, key=key, region=region, credentials=credentials)
+
+    """
+
+    s3 = aws_clients.getClient('s3', region=region, credentials=credentials)
+    try:
+        return isUnchanged(client=s3, bucket=DEPLOYMENT_S3_BUCKET, key=key, contentHash=hashFile(filename), bucketOwner=DEPLOYMENT_ACCOUNT_ID)
+    except ClientError as error:
+        logging.error(error)
+        return False
 
 def get_physical_table_map_object(physical_table_map:dict):
     """
@@ -1282,10 +2386,10 @@ def json_to_yaml(json_file, yaml_file):
     
     # Read the JSON file and convert it to YAML format
     with open(json_file, 'r') as f:
-        data = json.load(f)
+        data = loadJson(f)
     
     with open(yaml_file, 'w') as f:
-        yaml.dump(data, f)
+        dumpYaml(data, f)
     
     return yaml_file
 
@@ -1309,21 +2413,17 @@ def add_permissions_to_AAB_resources(template_content:dict):
     # Get the list of AAB resources
     aab_resources = template_content['Resources']
 
-    with open('resources/datasource_resource_CFN_skel.yaml', 'r') as file:
-        yaml_datasource = yaml.safe_load(file) 
-        datasource_permissions_obj = yaml_datasource['Properties']['Permissions']  
+    yaml_datasource = skeletons.get('datasource_resource_CFN_skel.yaml')
+    datasource_permissions_obj = yaml_datasource['Properties']['Permissions']  
 
-    with open('resources/dataset_resource_CFN_skel.yaml', 'r') as file:
-        yaml_dataset = yaml.safe_load(file) 
-        dataset_permissions_obj = yaml_dataset['Properties']['Permissions']  
+    yaml_dataset = skeletons.get('dataset_resource_CFN_skel.yaml')
+    dataset_permissions_obj = yaml_dataset['Properties']['Permissions']  
     
-    with open('resources/analysis_resource_CFN_skel.yaml', 'r') as file:
-        yaml_analysis = yaml.safe_load(file) 
-        analysis_permissions_obj = yaml_analysis['Properties']['Permissions']  
+    yaml_analysis = skeletons.get('analysis_resource_CFN_skel.yaml')
+    analysis_permissions_obj = yaml_analysis['Properties']['Permissions']  
 
-    with open('resources/theme_resource_CFN_skel.yaml', 'r') as file:
-        yaml_theme = yaml.safe_load(file)
-        theme_permissions_obj = yaml_theme['Properties']['Permissions']
+    yaml_theme = skeletons.get('theme_resource_CFN_skel.yaml')
+    theme_permissions_obj = yaml_theme['Properties']['Permissions']
 
     updated = False
 
@@ -1353,7 +2453,7 @@ def add_permissions_to_AAB_resources(template_content:dict):
 
     return template_content    
 
-def generate_template_outputs(analysis_obj:QSAnalysisDef, source_template_content:dict, dest_template_content:dict):
+def generate_template_outputs(analysis_obj:QSAnalysisDef, source_builder:TemplateBuilder, dest_builder:TemplateBuilder):
     """
     Helper function that generates the CloudFormation template outputs section to populate to be used to generate the file and upload it to S3 so it
     can be filled by the devops team
@@ -1361,34 +2461,34 @@ def generate_template_outputs(analysis_obj:QSAnalysisDef, source_template_conten
     Parameters:
 
     analysis_obj(QSAnalysisDef): Analysis object as returned by describe_analysis QS API method
-    source_template_content(dict): Source Template content in YAML
-    dest_template_content(dict): Dest Template content in YAML
+    source_builder(TemplateBuilder): Builder of the source template
+    dest_builder(TemplateBuilder): Builder of the dest template
 
     Returns:
 
-    source_template_content(dict): Source Template content in YAML with outputs appended
-    dest_template_content(dict): Dest Template content in YAML with outputs appended
+    source_builder(TemplateBuilder): Builder of the source template with outputs set
+    dest_builder(TemplateBuilder): Builder of the dest template with outputs set
 
     Examples:
 
-    >>> generate_template_outputs(analysis_obj=analysis_obj, source_template_content=source_template_content,  dest_template_content=dest_template_content)
+    >>> generate_template_outputs(analysis_obj=analysis_obj, source_builder=source_builder,  dest_builder=dest_builder)
 
     """    
-    source_template_content['Outputs'] = {
+    source_builder.setOutputs({
         'TemplateId': {
             'Description': 'Id of the QuickSight Template that models the analysis provided as input to the lambda synthesizer function',
             'Value': analysis_obj.TemplateId}
-    }
-    dest_template_content['Outputs'] = {
+    })
+    dest_builder.setOutputs({
         'AnalysisURL': {
             'Description': 'URL of the QuickSight Analysis modeled by the QuickSight template, will be the same id for all the stages',
             'Value': 'https://{region}.quicksight.aws.amazon.com/sn/analyses/{analysis_id}'.format(region=AWS_REGION, analysis_id=analysis_obj.id)
         }
-    }
+    })
 
-    return source_template_content, dest_template_content
+    return source_builder, dest_builder
 
-def generate_cloud_formation_override_list_AAB(analysisObjList:QSAnalysisDef):
+def generate_cloud_formation_override_list_AAB(analysisObjList:QSAnalysisDef, assetGraph:QSAssetGraph=None):
     """
     Helper function that generates the CloudFormation template override object to be used in the start_asset_bundle_export_job
     API call
@@ -1396,6 +2496,7 @@ def generate_cloud_formation_override_list_AAB(analysisObjList:QSAnalysisDef):
     Parameters:
 
     analysisObjList [QSAnalysisDef]: List of Analysis object as returned by describe_analysis QS API method
+    assetGraph (QSAssetGraph): Dependency graph of the analyses, built from analysisObjList if not provided
 
     Returns:
 
@@ -1403,58 +2504,45 @@ def generate_cloud_formation_override_list_AAB(analysisObjList:QSAnalysisDef):
 
     Examples:
 
-    >>> generate_cloud_formation_override_list_AAB(analysisObj=analysisObj)
+    >>> generate_cloud_formation_override_list_AAB(analysisObj=analysisObj, assetGraph=assetGraph)
 
     """    
-    vpc_conn_arns = []
     VPCConnectionOverridePropertiesList = []
-    refresh_schedules_arns = []
     RefreshScheduleOverridePropertiesList = []
-    datasource_arns = []
     DataSourceOverridePropertiesList = []
-    
-    for analysisObj in analysisObjList:    
-        for dataset in analysisObj.datasets:
-            if dataset.refreshSchedules != []:
-                for schedule in dataset.refreshSchedules:
-                    refresh_schedules_arns.append(schedule['Arn'])
-                    RefreshScheduleOverridePropertyObj = {
-                        'Arn': schedule['Arn'],
-                        'Properties': ['StartAfterDateTime']
-                    }
-                    RefreshScheduleOverridePropertiesList.append(RefreshScheduleOverridePropertyObj)
-                
-            for datasource in dataset.dependingDSources:
-                if datasource.arn not in datasource_arns:
-                    datasource_arns.append(datasource.arn)
-                else:
-                    print('generate_cloud_formation_override_list_AAB: Skipping datasource {datasource_name} as it has been already processed'.format(datasource_name=datasource.name))
-                    continue
-                if (isinstance(datasource, QSRDSDatasourceDef) or isinstance(datasource, QSRDBMSDatasourceDef)) and datasource.vpcConnectionArn != '':
-                    vpc_conn_arns.append(datasource.vpcConnectionArn)
-                properties = []
-                # TODO add support for other datasource types
-                if isinstance(datasource, QSRDSDatasourceDef):
-                    properties = ['SecretArn','Username','Password','InstanceId', 'Database']
-                if isinstance(datasource, QSRDBMSDatasourceDef):
-                    properties = ['SecretArn','Username','Password','Host', 'Database']
-                    if datasource.type == SourceType.REDSHIFT:
-                        properties.append('ClusterId')
-                if isinstance(datasource, QSServiceDatasourceDef):
-                    if datasource.type == SourceType.S3:
-                        properties = ['ManifestFileLocation']
-                    if datasource.type == SourceType.ATHENA:
-                        properties = ['WorkGroup']
-                DataSourceOverridePropertyObj = {
-                    'Arn': datasource.arn,
-                    'Properties': properties
-                }
-                DataSourceOverridePropertiesList.append(DataSourceOverridePropertyObj)
 
-    #remove any duplicates
-    vpc_conn_arns = list(set(vpc_conn_arns))
+    if assetGraph is None:
+        assetGraph = QSAssetGraph(analysisObjList)
+    
+    for schedule in assetGraph.getRefreshSchedules():
+        RefreshScheduleOverridePropertyObj = {
+            'Arn': schedule['Arn'],
+            'Properties': ['StartAfterDateTime']
+        }
+        RefreshScheduleOverridePropertiesList.append(RefreshScheduleOverridePropertyObj)
+
+    # datasources are indexed by ARN in the graph so each of them is processed only once even if used by several datasets
+    for datasource in assetGraph.getDatasources():
+        properties = []
+        # TODO add support for other datasource types
+        if isinstance(datasource, QSRDSDatasourceDef):
+            properties = ['SecretArn','Username','Password','InstanceId', 'Database']
+        if isinstance(datasource, QSRDBMSDatasourceDef):
+            properties = ['SecretArn','Username','Password','Host', 'Database']
+            if datasource.type == SourceType.REDSHIFT:
+                properties.append('ClusterId')
+        if isinstance(datasource, QSServiceDatasourceDef):
+            if datasource.type == SourceType.S3:
+                properties = ['ManifestFileLocation']
+            if datasource.type == SourceType.ATHENA:
+                properties = ['WorkGroup']
+        DataSourceOverridePropertyObj = {
+            'Arn': datasource.arn,
+            'Properties': properties
+        }
+        DataSourceOverridePropertiesList.append(DataSourceOverridePropertyObj)
 
-    for vpc_conn_arn in vpc_conn_arns:
+    for vpc_conn_arn in assetGraph.getVpcConnectionArns():
         VPCConnectionOverridePropertyObj = {
                 'Arn': vpc_conn_arn,
                 'Properties': ['Name','DnsResolvers','RoleArn']
@@ -1470,15 +2558,15 @@ def generate_cloud_formation_override_list_AAB(analysisObjList:QSAnalysisDef):
         'DataSources': DataSourceOverridePropertiesList
     }
     
-    if len(vpc_conn_arns) == 0:
+    if len(VPCConnectionOverridePropertiesList) == 0:
         del CloudFormationOverridePropertyConfiguration['VPCConnections']
     
-    if len(refresh_schedules_arns) == 0:
+    if len(RefreshScheduleOverridePropertiesList) == 0:
         del CloudFormationOverridePropertyConfiguration['RefreshSchedules']
 
     return CloudFormationOverridePropertyConfiguration
 
-def replicate_dashboard_via_template(analysisObjList:list, remap):
+def replicate_dashboard_via_template(analysisObjList:list, remap, assetGraph:QSAssetGraph=None):
     """
     Helper function that replicates a QuickSight dashboard using a template and also create assets for all the depending assets (datasets, datasources and secrets)
 
@@ -1486,9 +2574,11 @@ def replicate_dashboard_via_template(analysisObjList:list, remap):
     
     analysisObjList(List[QSAnalysisDef]): List of Analysis objects 
     remap(Boolean): Whether or not the datasource definitions should be remapped (always True for AAB)    
+    assetGraph(QSAssetGraph): Dependency graph of the analyses, built from analysisObjList if not provided
     Returns:
 
     source_account_yaml, dest_account_yaml YAML objects representing the generated templates (source and destination)
+    parameter_index(ParameterIndex): Owners of the parameters of the dest template, as recorded by the generators
 
 
     Examples:
@@ -1500,115 +2590,222 @@ def replicate_dashboard_via_template(analysisObjList:list, remap):
     dest_account_yaml = {}
     source_account_yaml = {}
 
-    with open('resources/dest_CFN_skel.yaml', 'r') as file:
-        dest_account_yaml = yaml.safe_load(file)
-    with open('resources/source_CFN_skel.yaml', 'r') as file:
-        source_account_yaml = yaml.safe_load(file) 
+    dest_account_yaml = skeletons.get('dest_CFN_skel.yaml')
+    source_account_yaml = skeletons.get('source_CFN_skel.yaml')
 
     dest_account_yaml['Resources'] = {}
     source_account_yaml['Resources'] = {}
+    dest_builder = TemplateBuilder(dest_account_yaml)
+    source_builder = TemplateBuilder(source_account_yaml)
     analysisIndex = 0
+
+    if assetGraph is None:
+        assetGraph = QSAssetGraph(analysisObjList)
+
     for analysisObj in analysisObjList:        
         print("Item {index}/{total}: Replicating dashboard {dashboard_id} from analysis {analysis_id} ..."
               .format(index=analysisIndex+1, total=len(analysisObjList),dashboard_id=analysisObj.AssociatedDashboardId, analysis_id=analysisObj.id))
 
-        datasets = analysisObj.datasets
-        # TODO: Check logic
+        datasets = assetGraph.getDatasetsOfAnalysis(analysisObj.id)
         for datasetDefObj in datasets:        
             
-            for datasourceDefObj in datasetDefObj.dependingDSources:
+            for datasourceDefObj in assetGraph.getDatasourcesOfDataset(datasetDefObj.id):
                 try:
-                    dest_account_yaml = generateDataSourceCFN(datasourceDefObj=datasourceDefObj, appendContent=dest_account_yaml, remap=remap)
+                    dest_builder = generateDataSourceCFN(datasourceDefObj=datasourceDefObj, builder=dest_builder, remap=remap)
                 except ValueError as error:
                     print(error)
-                    print('There was an issue creating the following datasource: {datasourceId} cannot proceed further'.format(datasourceId=datasourceDefObj.id))
-                    return {
-                    'statusCode': 500
-                    }            
+                    raise ValueError('There was an issue creating the following datasource: {datasourceId} cannot proceed further'.format(datasourceId=datasourceDefObj.id)) from error
 
-        source_account_yaml = generateQSTemplateCFN(analysisDefObj=analysisObj, appendContent=source_account_yaml)   
+        source_builder = generateQSTemplateCFN(analysisDefObj=analysisObj, builder=source_builder)   
         
         for datasetObj in analysisObj.datasets:
-            dest_account_yaml = generateDataSetCFN(datasetObj=datasetObj, datasourceObjs=datasetObj.dependingDSources, tableMap=datasetObj.physicalTableMap, appendContent=dest_account_yaml)
+            dest_builder = generateDataSetCFN(datasetObj=datasetObj, datasourceObjs=datasetObj.dependingDSources, tableMap=datasetObj.physicalTableMap, builder=dest_builder)
 
-        dest_account_yaml = generateAnalysisFromTemplateCFN(analysisObj=analysisObj, templateId=analysisObj.TemplateId, appendContent=dest_account_yaml)
+        dest_builder = generateAnalysisFromTemplateCFN(analysisObj=analysisObj, templateId=analysisObj.TemplateId, builder=dest_builder)
 
-        source_account_yaml, dest_account_yaml = generate_template_outputs(analysis_obj=analysisObj, source_template_content=source_account_yaml, dest_template_content=dest_account_yaml)
+        source_builder, dest_builder = generate_template_outputs(analysis_obj=analysisObj, source_builder=source_builder, dest_builder=dest_builder)
         analysisIndex = analysisIndex + 1
 
     
-    return source_account_yaml, dest_account_yaml
+    return source_builder.build(), dest_builder.build(), dest_builder.parameterIndex
 
-def replicate_dashboard_via_AAB(analysisObjList:list, remap):
+def start_AAB_export_job(analysisObjList:list, remap, assetGraph:QSAssetGraph=None):
     """
-    Helper function that replicates a QuickSight dashboard using a assets as bundle and outputs results in CLOUDFORMATION_JSON 
+    Helper function that starts the assets as bundle export job (CLOUDFORMATION_JSON format) of a list of analyses
 
-    Parameters: 
-    
-    analysisObjList(List[QSAnalysisDef]): List of Analysis objects 
+    Parameters:
+
+    analysisObjList(List[QSAnalysisDef]): List of Analysis objects
     remap(Boolean): Whether or not the datasource definitions and other properties should be remapped (more info here https://a.co/g1Tf0fp)
-    
+    assetGraph(QSAssetGraph): Dependency graph of the analyses, built from analysisObjList if not provided
+
     Returns:
 
-    source_account_yaml, dest_account_yaml YAML objects representing the generated templates (source and destination)
+    job(dict): Export job (JobId, JobStatus, StartedAt, ResourceArns and Remap)
 
     Examples:
 
-    >>> replicate_dashboard_template(analysisObj, event)
+    >>> start_AAB_export_job(analysisObjList=analysisObjList, remap=remap, assetGraph=assetGraph)
 
-    """   
+    """
 
-    MAX_RETRIES = 5
-    now = datetime.now()    
+    now = datetime.now()
     EXPORT_JOB_ID = 'QS_CI_CD_EXPORT_{suffix}'.format(suffix=now.strftime('%d-%m-%y-%H-%M-%S'))
-    EXPORT_TERMINAL_STATUSES = ['SUCCESSFUL', 'FAILED']
-    initial_wait_time_sec = 5
+    export_api = export_stub if export_stub is not None else qs
 
     resourceArns = [ analysis.arn for analysis in analysisObjList]
 
     if remap:
-        CloudFormationOverridePropertyConfiguration = generate_cloud_formation_override_list_AAB(analysisObjList=analysisObjList)   
-        ret = qs.start_asset_bundle_export_job (AwsAccountId=FIRST_STAGE_ACCOUNT_ID, AssetBundleExportJobId=EXPORT_JOB_ID, ResourceArns=resourceArns, IncludeAllDependencies=True, 
-                                      ExportFormat='CLOUDFORMATION_JSON', CloudFormationOverridePropertyConfiguration=CloudFormationOverridePropertyConfiguration)
+        CloudFormationOverridePropertyConfiguration = generate_cloud_formation_override_list_AAB(analysisObjList=analysisObjList, assetGraph=assetGraph)
+        export_api.start_asset_bundle_export_job(AwsAccountId=FIRST_STAGE_ACCOUNT_ID, AssetBundleExportJobId=EXPORT_JOB_ID, ResourceArns=resourceArns, IncludeAllDependencies=True,
+                                                 ExportFormat='CLOUDFORMATION_JSON', CloudFormationOverridePropertyConfiguration=CloudFormationOverridePropertyConfiguration)
     else:
-        ret = qs.start_asset_bundle_export_job (AwsAccountId=FIRST_STAGE_ACCOUNT_ID, AssetBundleExportJobId=EXPORT_JOB_ID, ResourceArns=resourceArns, IncludeAllDependencies=True, 
-                                      ExportFormat='CLOUDFORMATION_JSON', ValidationStrategy={'StrictModeForAllResources':False})
-    
-    # Check progress
+        export_api.start_asset_bundle_export_job(AwsAccountId=FIRST_STAGE_ACCOUNT_ID, AssetBundleExportJobId=EXPORT_JOB_ID, ResourceArns=resourceArns, IncludeAllDependencies=True,
+                                                 ExportFormat='CLOUDFORMATION_JSON', ValidationStrategy={'StrictModeForAllResources':False})
+
+    return {'JobId': EXPORT_JOB_ID, 'JobStatus': 'QUEUED_FOR_IMMEDIATE_EXECUTION', 'StartedAt': now.isoformat(), 'ResourceArns': resourceArns, 'Remap': remap}
+
+def wait_for_AAB_export_job(job:dict, context=None):
+    """
+    Helper function that polls an assets as bundle export job with jittered, growing intervals until it reaches a terminal status. The job is waited for
+    AAB_EXPORT_MAX_WAIT_SECONDS at most and never past AAB_EXPORT_DEADLINE_MARGIN_MS before the invocation timeout, the time needed to process the bundle
+
+    Parameters:
+
+    job(dict): Export job as returned by start_AAB_export_job
+    context(LambdaContext): Context of the invocation, used to know its remaining time
 
+    Returns:
+
+    ret(dict): Last description of the export job, its JobStatus is not terminal if the job didn't finish in time
+
+    Examples:
+
+    >>> wait_for_AAB_export_job(job=job, context=context)
+
+    """
+
+    export_api = export_stub if export_stub is not None else qs
+    wait_deadline = time.monotonic() + AAB_EXPORT_MAX_WAIT_SECONDS
+
+    def remaining_seconds():
+        remaining = wait_deadline - time.monotonic()
+        if context is not None:
+            remaining = min(remaining, (context.get_remaining_time_in_millis() - AAB_EXPORT_DEADLINE_MARGIN_MS) / 1000)
+        return remaining
+
+    backoff = JitteredBackoff(initialDelay=AAB_EXPORT_POLL_INITIAL_SECONDS, maxDelay=AAB_EXPORT_POLL_MAX_SECONDS)
+
+    return pollExportJob(describe=lambda: export_api.describe_asset_bundle_export_job(AwsAccountId=FIRST_STAGE_ACCOUNT_ID, AssetBundleExportJobId=job['JobId']),
+                         backoff=backoff, remainingSeconds=remaining_seconds)
+
+def schedule_export_job_resume(job:dict, store, context=None):
+    """
+    Helper function that invokes this function asynchronously (an event with the ResumeExportJob key holding the job id) so the export job left in progress
+    is resumed without waiting for another dashboard update. The number of resumes is persisted with the job and bounded by AAB_EXPORT_MAX_RESUMES
+
+    Parameters:
+
+    job(dict): Export job left in progress, as persisted in the store
+    store(S3ExportJobStore): Export job store
+    context(LambdaContext): Context of the invocation, its invoked_function_arn is the function invoked
+
+    Returns:
+
+    True if the invocation that resumes the job was requested, False otherwise
+
+    Examples:
+
+    >>> schedule_export_job_resume(job=pending.job, store=export_job_store, context=context)
+
+    """
+
+    function_arn = getattr(context, 'invoked_function_arn', None)
+    if function_arn is None:
+        print('No function to invoke (not running in Lambda), export job {job_id} will be resumed by the next invocation'.format(job_id=job['JobId']))
+        return False
+    resumes = job.get('Resumes', 0)
+    if resumes >= AAB_EXPORT_MAX_RESUMES:
+        print('WARNING: export job {job_id} was already resumed {resumes} times, it will be resumed by the next invocation'.format(job_id=job['JobId'], resumes=resumes))
+        return False
+
+    try:
+        store.save(dict(job, Resumes=resumes + 1))
+        lambda_client = aws_clients.getClient('lambda', region=AWS_REGION)
+        lambda_client.invoke(FunctionName=function_arn, InvocationType='Event', Payload=json.dumps({RESUME_EXPORT_JOB_EVENT_KEY: job['JobId']}).encode('utf-8'))
+    except (ClientError, BotoCoreError) as error:
+        logging.error(error)
+        print('Could not invoke {function} to resume export job {job_id}, it will be resumed by the next invocation'.format(function=function_arn, job_id=job['JobId']))
+        return False
+    print('Invoked {function} asynchronously to resume export job {job_id} ({resumes}/{max_resumes})'
+          .format(function=function_arn, job_id=job['JobId'], resumes=resumes + 1, max_resumes=AAB_EXPORT_MAX_RESUMES))
+    return True
+
+def replicate_dashboard_via_AAB(analysisObjList:list, remap, assetGraph:QSAssetGraph=None, context=None, export_job_store=None, pending_export_job:dict=None, export_job_inputs:dict=None):
+    """
+    Helper function that replicates a QuickSight dashboard using a assets as bundle and outputs results in CLOUDFORMATION_JSON. The export job is persisted
+    in the export job store as soon as it starts, if it doesn't finish within the time this invocation can wait for it ExportJobPending is raised and the
+    next invocation resumes it (pending_export_job) instead of starting a new one
+
+    Parameters: 
+    
+    analysisObjList(List[QSAnalysisDef]): List of Analysis objects 
+    remap(Boolean): Whether or not the datasource definitions and other properties should be remapped (more info here https://a.co/g1Tf0fp)
+    assetGraph(QSAssetGraph): Dependency graph of the analyses, built from analysisObjList if not provided
+    context(LambdaContext): Context of the invocation, used to bound the time spent waiting for the export job
+    export_job_store(S3ExportJobStore): Store where the export job is persisted, the job is not persisted if not provided
+    pending_export_job(dict): Export job left in progress by a previous invocation, resumed if it exported the same analyses with the same remap setting
+    export_job_inputs(dict): Inputs of the synthesis persisted along with the export job, so the invocation that resumes it synthesizes the same dashboards
     
+    Returns:
+
+    source_account_yaml, dest_account_yaml YAML objects representing the generated templates (source and destination)
+    parameter_index(ParameterIndex): Owners of the parameters of the dest template, indexed from the parameter descriptions of the bundle
+
+    Raises:
+
+    ExportJobPending: If the export job didn't reach a terminal status in time, it was persisted to be resumed
+    ValueError: If the export job failed
+
+    Examples:
+
+    >>> replicate_dashboard_via_AAB(analysisObjList, remap, assetGraph, context=context, export_job_store=export_job_store)
+
+    """   
 
-    while MAX_RETRIES > 0:
-        MAX_RETRIES = MAX_RETRIES - 1
-        ret = qs.describe_asset_bundle_export_job(AwsAccountId=FIRST_STAGE_ACCOUNT_ID, AssetBundleExportJobId=EXPORT_JOB_ID)
-        if ret['JobStatus'] in EXPORT_TERMINAL_STATUSES:
-            break
-        print('Assets as Bundle export job with id {id} is currently in a non terminal status ({status}) waiting for {seconds} seconds'.format(id=EXPORT_JOB_ID, status=ret['JobStatus'], seconds=initial_wait_time_sec))
-        time.sleep(initial_wait_time_sec)
-        initial_wait_time_sec = initial_wait_time_sec * 2
+    resourceArns = [ analysis.arn for analysis in analysisObjList]
+
+    def start():
+        job = start_AAB_export_job(analysisObjList=analysisObjList, remap=remap, assetGraph=assetGraph)
+        job['Inputs'] = export_job_inputs if export_job_inputs is not None else {}
+        return job
+
+    job, ret = runExportJob(pendingJob=pending_export_job, resourceArns=resourceArns, remap=remap, start=start,
+                            wait=lambda job: wait_for_AAB_export_job(job=job, context=context), store=export_job_store)
 
     if ret['JobStatus'] == 'FAILED':
-        raise ValueError('Export job with ID {id} failed with error {error}, cannot continue'.format(id=EXPORT_JOB_ID, error=ret['Errors']))
+        raise ValueError('Export job with ID {id} failed with error {error}, cannot continue'.format(id=job['JobId'], error=ret['Errors']))
     
     downloadURL = ret['DownloadUrl']
 
-    json_filename = '{output_dir}/{export_job_id}_CFN_bundle.json'.format(output_dir=OUTPUT_DIR, export_job_id=EXPORT_JOB_ID)
-    yaml_filename = '{output_dir}/{export_job_id}_CFN_bundle.yaml'.format(output_dir=OUTPUT_DIR, export_job_id=EXPORT_JOB_ID)
+    json_filename = '{output_dir}/{export_job_id}_CFN_bundle.json'.format(output_dir=OUTPUT_DIR, export_job_id=job['JobId'])
     
-    if downloadURL.lower().startswith('http'):
+    if export_stub is not None and downloadURL.lower().startswith(STUB_URL_SCHEME + '://'):
+        ret = export_stub.download(downloadURL, json_filename)
+    elif downloadURL.lower().startswith('http'):
         ret = urlretrieve(downloadURL, json_filename)
     else:
         raise ValueError('Illegal scheme in downloadURL ({downloadURL}) should be http(s). Aborting ...'.format(downloadURL=downloadURL))
 
-    json_to_yaml(json_file=json_filename, yaml_file=yaml_filename)
-
-    with open('resources/dummy_CFN_skel.yaml', 'r') as file:
-        source_account_yaml = yaml.safe_load(file)
+    source_account_yaml = skeletons.get('dummy_CFN_skel.yaml')
     
-    with open(yaml_filename, 'r') as file:
-        dest_account_yaml = yaml.safe_load(file)
+    # The bundle is only made of JSON types, a JSON -> YAML -> dict round trip would only sort its keys so that is done directly
+    with open(json_filename, 'r') as file:
+        dest_account_yaml = sortKeys(loadJson(file))
+
+    parameter_index = ParameterIndex().indexDescriptions(dest_account_yaml.get('Parameters', {}))
     
-    return source_account_yaml, dest_account_yaml
+    return source_account_yaml, dest_account_yaml, parameter_index
 
 # helper function that takes a cloudformation stack definition and returns a list of objects mapping the CFN resource Id and the QS resource Id
 def generate_resource_id_mapping(template_content:dict):
@@ -1760,44 +2957,71 @@ def change_stack_references_to_ids(template_content:dict, resource_id_mapping: d
             
     return template_content
 
-# helper function that returns the group where a given resource id is located in a grouped_resources_content
-def get_resource_group(resource_id:str, grouped_resources_content:dict):
+# helper function that indexes the group of each resource in a grouped_resources_content by logical id and by QuickSight asset id
+def build_resource_group_index(grouped_resources_content:dict):
     """
-    Helper function that returns the group where a given resource id is located in a grouped_resources_content
+    Helper function that indexes the group of each resource in a grouped_resources_content by logical id and by QuickSight asset id
 
     Parameters:
 
-    resource_id(str): Resource id to find in grouped_resources_content
     grouped_resources_content(dict): Dictionary of grouped resources to generate nested stacks
 
     Returns:
 
-    group(str): Group where resource_id is located in grouped_resources_content
+    resource_group_index(dict): Dictionary of (kind, id) to group, kind being 'logical' for CFN logical ids or the id property of the asset (DataSetId, DataSourceId ...)
 
     Examples:
 
-    >>> get_resource_group(resource_id, grouped_resources_content)
+    >>> build_resource_group_index(grouped_resources_content)
 
     """
-    sanitized_id = resource_id.replace('-', '')
-    # print('Looking for resource id:'+sanitized_id)
-    # print('Grouped resources content is:')
-    # print(grouped_resources_content)
+    asset_id_properties = ['DataSourceId', 'DataSetId', 'AnalysisId', 'DashboardId', 'ThemeId', 'VPCConnectionId', 'TemplateId']
+    resource_group_index = {}
     for group in grouped_resources_content.keys():
-        for CFNresourceId in grouped_resources_content[group]['Resources'].keys():
-            if sanitized_id[:20] in CFNresourceId:
-                return group
+        for CFNresourceId, resource in grouped_resources_content[group]['Resources'].items():
+            resource_group_index[('logical', CFNresourceId)] = group
+            if resource['Type'] == 'AWS::QuickSight::RefreshSchedule':
+                # refresh schedules carry the DataSetId of the dataset they belong to
+                continue
+            for id_property in asset_id_properties:
+                if id_property in resource.get('Properties', {}):
+                    resource_group_index[(id_property, resource['Properties'][id_property])] = group
+
+    return resource_group_index
+
+# helper function that returns the group where a given resource id is located
+def get_resource_group(resource_id:str, resource_group_index:dict, id_property:str='logical'):
+    """
+    Helper function that returns the group where a given resource id is located
 
-    return None
+    Parameters:
+
+    resource_id(str): Resource id to find, a CFN logical id or a QuickSight asset id
+    resource_group_index(dict): Index of the grouped resources as returned by build_resource_group_index
+    id_property(str): 'logical' if resource_id is a CFN logical id, otherwise the id property of the asset (DataSetId, DataSourceId ...)
+
+    Returns:
+
+    group(str): Group where resource_id is located, None if it is not in any group
+
+    Examples:
+
+    >>> get_resource_group(datasetId, resource_group_index, 'DataSetId')
+
+    """
+    return resource_group_index.get((id_property, resource_id))
 
 # helper function that takes a cloudformation stack definition in yaml and splits its resources into nested stacks
-def split_stack_resources_and_parameters_into_groups(template_content:dict):
+def split_stack_resources_and_parameters_into_groups(template_content:dict, parameter_index:ParameterIndex=None):
     """
-    Helper function that takes a cloudformation stack definition in yaml and splits its resources into groups based on configuration, also parameters for resources are grouped and returned
+    Helper function that takes a cloudformation stack definition in yaml and splits its resources into groups based on configuration, also parameters for resources are grouped and returned.
+    The resources of each type are packed into as few groups as possible within the NESTED_STACK_MAX_BYTES, NESTED_STACK_MAX_RESOURCES and NESTED_STACK_MAX_PARAMETERS budgets, refresh
+    schedules are packed along with their dataset and RLS datasets along with the datasets they restrict (otherwise the datasets groups could depend on each other in a cycle)
 
     Parameters:
 
     template_content(dict): Cloudformation stack definition in yaml
+    parameter_index(ParameterIndex): Owners of the template parameters, indexed from the parameter descriptions if not provided
 
     Returns:
 
@@ -1836,66 +3060,121 @@ def split_stack_resources_and_parameters_into_groups(template_content:dict):
     template_resources = template_content['Resources']
     template_parameters = template_content['Parameters']
     added_parameters = ['DstQSAdminRegion', 'QSUser']
-    
-    MAX_RESOURCES_PER_GROUP = 10
+
+    if parameter_index is None:
+        parameter_index = ParameterIndex().indexDescriptions(template_parameters)
+
+    def owned_parameters(owner_type, owner_id):
+        # the index can outlive parameters removed from the template (e.g. by the incremental merge)
+        return [key for key in parameter_index.getParameters(owner_type, owner_id) if key in template_parameters]
+    
+    # Remove DependsOn elements as now dependencies are managed between stack sets so they are no longer needed exept if the resource type is a colocated resource ...
+    colocated_by_dataset = {}
+    for resource_key, resource in template_resources.items():
+        if 'DependsOn' in resource.keys() and resource['Type'] not in colocated_resources:
+            del(resource['DependsOn'])
+        if resource['Type'] == 'AWS::QuickSight::RefreshSchedule':
+            colocated_by_dataset.setdefault(resource['Properties']['DataSetId'], []).append(resource_key)
+
+    dataset_ids = [resource['Properties']['DataSetId'] for resource in template_resources.values() if resource['Type'] == 'AWS::QuickSight::DataSet']
+
+    # datasets and the RLS datasets they reference (by ARN or logical id) are packed in the same unit
+    dataset_keys = [resource_key for resource_key, resource in template_resources.items() if resource['Type'] == 'AWS::QuickSight::DataSet']
+    dataset_keys_by_id = {template_resources[resource_key]['Properties']['DataSetId']: resource_key for resource_key in dataset_keys}
+    rls_links = {}
+    for resource_key in dataset_keys:
+        for kind, reference in findReferences(template_resources[resource_key]['Properties'].get('RowLevelPermissionDataSet', {})):
+            rls_key = dataset_keys_by_id.get(reference) if kind == 'DataSetId' else reference
+            if rls_key is not None:
+                rls_links.setdefault(resource_key, []).append(rls_key)
+    colocated_datasets = {group[0]: group for group in findConnectedGroups(nodes=dataset_keys, links=rls_links)}
+
     for resource_type in resources_to_split.keys():
-        group_index = 0
-        for resource_key in template_resources.keys():            
-            resource = template_resources[resource_key]
-            # Remove DependsOn elements as now dependencies are managed between stack sets so they are no longer needed exept if the resource type is a colocated resource ...
-            if 'DependsOn' in resource.keys() and resource['Type'] not in colocated_resources:
-                del(resource['DependsOn'])
+        units = []
+        for resource_key, resource in template_resources.items():
             if resource['Type'] in resources_to_split[resource_type]:
-                resource_index = '{resource_type}_{index}'.format(resource_type=resource_type, index=group_index)
-                if resource_index in grouped_resources_content.keys() and len(grouped_resources_content[resource_index]['Resources']) >= MAX_RESOURCES_PER_GROUP:
-                    group_index = group_index + 1
-                    resource_index = '{resource_type}_{index}'.format(resource_type=resource_type, index=group_index)
-                
-                if resource_index not in grouped_resources_content.keys():
-                    grouped_resources_content[resource_index] = {}
-                    grouped_resources_content[resource_index]['Resources'] = {}
-                    grouped_parameters_content[resource_index] = {}
-                    grouped_parameters_content[resource_index]['Parameters'] = {}
-                
-                grouped_resources_content[resource_index]['Resources'][resource_key] = resource
-                # adding grouped parameters                
-                for parameter in parameters_mapping[resource_type]:
-                    grouped_parameters_content[resource_index]['Parameters'][parameter] = template_parameters[parameter]
-                
+                unit_resources = {resource_key: resource}
+                unit_parameters = {parameter: template_parameters[parameter] for parameter in parameters_mapping[resource_type]}
+
                 if resource_type == 'datasources':
                     # we need to add datasource parameters
-                    datasourceId = resource['Properties']['DataSourceId']
-                    parameter_list = [{key: template_parameters[key]} for key in list(template_parameters) if 'datasource:{datasource_id}'.format(datasource_id=datasourceId) in template_parameters[key]['Description']]
-                    for parameter in parameter_list:
-                        param_key = list(parameter.keys())[0]
-                        grouped_parameters_content[resource_index]['Parameters'][param_key] = parameter[param_key]
-                        added_parameters.append(param_key)
-                if resource_type == 'vpcConnections' and resource['Type'] == 'AWS::QuickSight::VPCConnection':
+                    owned = owned_parameters('datasource', resource['Properties']['DataSourceId'])
+                elif resource_type == 'vpcConnections' and resource['Type'] == 'AWS::QuickSight::VPCConnection':
                     # we need to add vpc connection parameters
-                    vpcConnectionId = resource['Properties']['VPCConnectionId']
-                    parameter_list = [{key: template_parameters[key]} for key in list(template_parameters) if 'vpcConnection:{vpc_connection_id}'.format(vpc_connection_id=vpcConnectionId) in template_parameters[key]['Description']]
-                    for parameter in parameter_list:
-                        param_key = list(parameter.keys())[0]
-                        grouped_parameters_content[resource_index]['Parameters'][param_key] = parameter[param_key]
-                        added_parameters.append(param_key)
-
-            elif resource['Type'] in colocated_resources and resource_type == colocated_resources[resource['Type']]:
-                # needs to be colocated and is a RefreshSchedule
-                if resource['Type'] == 'AWS::QuickSight::RefreshSchedule':
-                    # we need to add to the datasets group
-                    datasetId = resource['Properties']['DataSetId']
-                    refreshScheduleId = resource['Properties']['Schedule']['ScheduleId']
-                    target_group = get_resource_group(datasetId, grouped_resources_content)
-                    grouped_resources_content[target_group]['Resources'][resource_key] = resource
-                    parameter_list = [{key: template_parameters[key]} for key in list(template_parameters) if 'refresh-schedule:{schedule_id}'.format(schedule_id=refreshScheduleId) in template_parameters[key]['Description']]
-                    for parameter in parameter_list:
-                        param_key = list(parameter.keys())[0]
-                        grouped_parameters_content[target_group]['Parameters'][param_key] = parameter[param_key]
-                        added_parameters.append(param_key)
+                    owned = owned_parameters('vpcConnection', resource['Properties']['VPCConnectionId'])
+                elif resource_type == 'datasets':
+                    if resource_key not in colocated_datasets:
+                        # already added to the unit of the first dataset it is linked to by RLS
+                        continue
+                    # refresh schedules are deployed in the same group as their dataset
+                    owned = []
+                    for dataset_key in colocated_datasets[resource_key]:
+                        unit_resources[dataset_key] = template_resources[dataset_key]
+                        for schedule_key in colocated_by_dataset.get(template_resources[dataset_key]['Properties']['DataSetId'], []):
+                            unit_resources[schedule_key] = template_resources[schedule_key]
+                            owned = owned + owned_parameters('refresh-schedule', template_resources[schedule_key]['Properties']['Schedule']['ScheduleId'])
+                else:
+                    owned = []
+
+                for param_key in owned:
+                    unit_parameters[param_key] = template_parameters[param_key]
+                    added_parameters.append(param_key)
+                units.append(PackingUnit(resources=unit_resources, parameters=unit_parameters))
+
+            elif resource['Type'] in colocated_resources and resource_type == colocated_resources[resource['Type']] and resource['Properties']['DataSetId'] not in dataset_ids:
+                raise ValueError('Refresh schedule {resource_key} belongs to dataset {dataset_id} which is not part of the template'.format(resource_key=resource_key, dataset_id=resource['Properties']['DataSetId']))
+
+        groups = packResourceGroups(units, maxBytes=NESTED_STACK_MAX_BYTES, maxResources=NESTED_STACK_MAX_RESOURCES, maxParameters=NESTED_STACK_MAX_PARAMETERS)
+        for group_index, group in enumerate(groups):
+            resource_index = '{resource_type}_{index}'.format(resource_type=resource_type, index=group_index)
+            grouped_resources_content[resource_index] = {'Resources': group.resources}
+            grouped_parameters_content[resource_index] = {'Parameters': group.parameters}
 
     
     return grouped_resources_content, grouped_parameters_content
 
+# helper function that computes the groups each group of resources depends on from the references of its resources
+def get_nested_stack_dependencies(grouped_resources_content:dict):
+    """
+    Helper function that computes the groups each group of resources depends on from the references of its resources (QuickSight ARNs, Ref and Fn::GetAtt), so each
+    nested stack only waits for the nested stacks it uses and nested stacks of unrelated assets are deployed in parallel. References to assets that are not part of
+    the template (e.g. already deployed in the stage) don't add dependencies
+
+    Parameters:
+
+    grouped_resources_content(dict): Dictionary containing groups of resources
+
+    Returns:
+
+    dependencies(dict): Dictionary of group to the sorted list of groups it depends on
+
+    Raises:
+
+    ValueError: If the groups depend on each other in a cycle, which CloudFormation can't deploy
+
+    Examples:
+
+    >>> get_nested_stack_dependencies(grouped_resources_content)
+
+    """
+    resource_group_index = build_resource_group_index(grouped_resources_content)
+    dependencies = {}
+    for group in grouped_resources_content.keys():
+        depending_groups = set()
+        for resource in grouped_resources_content[group]['Resources'].values():
+            for id_property, resource_id in findReferences(resource):
+                target_group = get_resource_group(resource_id, resource_group_index, id_property)
+                if target_group is not None and target_group != group:
+                    depending_groups.add(target_group)
+        dependencies[group] = sorted(depending_groups)
+
+    cycle = findDependencyCycle(dependencies)
+    if cycle is not None:
+        raise ValueError('Nested stack groups have a circular dependency ({cycle}), adjust the NESTED_STACK_MAX_* budgets so the resources involved are grouped together'
+                         .format(cycle=' -> '.join(cycle)))
+
+    return dependencies
+
 # helper function that takes a dictionary of grouped resources and creates a cloudformation stack for each of the groups and persist the file in yaml format locally
 def generate_nested_stacks_from_grouped_resources(grouped_resources_content:dict, grouped_parameters_content:dict, credentials:object):
     """
@@ -1917,12 +3196,7 @@ def generate_nested_stacks_from_grouped_resources(grouped_resources_content:dict
 
     """
 
-    dependencies = {
-        'analysis': ['datasets'],
-        'datasets': ['datasources'],
-        'datasources': ['vpcConnections'],
-        'vpcConnections': []
-    }
+    dependencies = get_nested_stack_dependencies(grouped_resources_content)
     
     parent_stack_skel = {
             'AWSTemplateFormatVersion': '2010-09-09',
@@ -1945,32 +3219,25 @@ def generate_nested_stacks_from_grouped_resources(grouped_resources_content:dict
             all_parameters[parameter_key] = group_parameters[parameter_key]
 
 
-    
+    # NESTED STACK TEMPLATES GENERATION
+    # process the grouped resources content and create one nested stack for each group, then upload all of them in parallel
+    nested_stack_templates = {}
     for group in grouped_resources_content.keys():
-        # NESTED STACK TEMPLATES GENERATION
-        # process the grouped resources content and create one nested stack for each group
-        group_resources = grouped_resources_content[group]['Resources']
-        group_parameters = grouped_parameters_content[group]['Parameters']
-        nested_stack_skel['Resources'] = group_resources
-        nested_stack_skel['Description'] = 'Nested Stack for {group_name}'.format(group_name=group)            
-        nested_stack_skel['Parameters'] = group_parameters
-        
-        # write the nested stack skeleton to a file and upload it to a bucket
-        filename = '{group_name}.template'.format(group_name=group)
-        nested_stack_filename = '{output_dir}/{filename}'.format(output_dir=OUTPUT_DIR, filename=filename)
-        writeToFile(nested_stack_filename, nested_stack_skel, format="yaml")
-        uploadFileToS3(bucket=DEPLOYMENT_S3_BUCKET, filename=nested_stack_filename, region=AWS_REGION, object_name=filename,prefix=ASSETS_FILES_PREFIX, bucket_owner=DEPLOYMENT_ACCOUNT_ID, credentials=credentials)
+        nested_stack_template = dict(nested_stack_skel)
+        nested_stack_template['Resources'] = grouped_resources_content[group]['Resources']
+        nested_stack_template['Description'] = 'Nested Stack for {group_name}'.format(group_name=group)
+        nested_stack_template['Parameters'] = grouped_parameters_content[group]['Parameters']
+        nested_stack_templates['{group_name}.template'.format(group_name=group)] = nested_stack_template
 
+    url_map = uploadTemplatesToS3(bucket=DEPLOYMENT_S3_BUCKET, templates=nested_stack_templates, region=DEPLOYMENT_S3_REGION, prefix=ASSETS_FILES_PREFIX, bucket_owner=DEPLOYMENT_ACCOUNT_ID, credentials=credentials)
+
+    for group in grouped_resources_content.keys():
         # PARENT TEMPLATE GENERATION
         # process the grouped resources content and create one nested stack for each group in the parent template
         nested_stack_id = 'nestedStack{group_name}'.format(group_name=group.replace('_', ''))
-        depending_groups = [ 'nestedStack{group_name}'.format(group_name=x.replace('_','')) for x in grouped_resources_content if x.split('_')[0] in dependencies[group.split('_')[0]]]
+        depending_groups = [ 'nestedStack{group_name}'.format(group_name=x.replace('_','')) for x in dependencies[group]]
         parameters = {}
-        filename = '{group_name}.template'.format(group_name=group)
-        key= '{prefix}/{key}'.format(prefix=ASSETS_FILES_PREFIX, key=filename)
-        # generate a presigned URL
-        presignedUrl = generatePresignedUrl(key=key, bucket=DEPLOYMENT_S3_BUCKET, region=AWS_REGION, credentials=credentials)
-        templateUrlSkel = 'http://s3.amazonaws.com/{s3Bucket}/{prefix}/{group_name}.template'
+        template_url = url_map['{group_name}.template'.format(group_name=group)]
         for parameterKey in grouped_parameters_content[group]['Parameters'].keys():
             parameters[parameterKey] = {
                 'Ref' : parameterKey
@@ -1979,7 +3246,7 @@ def generate_nested_stacks_from_grouped_resources(grouped_resources_content:dict
         parent_stack_skel['Resources'][nested_stack_id] = {
             'Type' : 'AWS::CloudFormation::Stack',
             'Properties' : {
-                'TemplateURL' : presignedUrl,
+                'TemplateURL' : template_url,
                 'Parameters' : parameters
             }
         }
@@ -1991,6 +3258,69 @@ def generate_nested_stacks_from_grouped_resources(grouped_resources_content:dict
     
     return parent_stack_skel
 
+# Helper function that warms the describe cache with all the datasets, datasources and refresh schedules an analysis depends on, in parallel
+def prefetch_analysis_dependencies(dataset_arns:list, max_workers=RESOLVER_MAX_WORKERS):
+    """
+    Helper function that resolves in parallel all the assets an analysis depends on so the (sequential) object construction in getAnalysisAssociatedWithDashboard
+    is served from the describe cache. All the dataset describes are started at once, datasource describes and refresh schedule listings are queued as soon
+    as the dataset that references them is described and RLS datasets are handled as late discovered work
+
+    Parameters:
+
+    dataset_arns(List[String]): ARNs of the datasets used by the analysis
+    max_workers(Integer): Maximum number of concurrent describe calls, defaults to RESOLVER_MAX_WORKERS
+
+    Returns:
+
+    None
+
+    Examples:
+
+    >>> prefetch_analysis_dependencies(dataset_arns=dataset_arns)
+
+    """
+
+    def describe_dataset(datasetId):
+        return 'dataset', qs.describe_data_set(AwsAccountId=FIRST_STAGE_ACCOUNT_ID, DataSetId=datasetId)
+
+    def describe_datasource(datasourceId):
+        return 'datasource', qs.describe_data_source(AwsAccountId=FIRST_STAGE_ACCOUNT_ID, DataSourceId=datasourceId)
+
+    def list_schedules(datasetId):
+        return 'schedules', qs.list_refresh_schedules(AwsAccountId=FIRST_STAGE_ACCOUNT_ID, DataSetId=datasetId)
+
+    seen_dataset_ids = set()
+    seen_datasource_ids = set()
+    pending = set()
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for datasetarn in dataset_arns:
+            datasetId = datasetarn.split('dataset/')[-1]
+            if datasetId not in seen_dataset_ids:
+                seen_dataset_ids.add(datasetId)
+                pending.add(executor.submit(describe_dataset, datasetId))
+
+        while len(pending) > 0:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, ret = future.result()
+                if kind != 'dataset':
+                    continue
+                dataset = ret['DataSet']
+                if dataset['ImportMode'] == ImportMode.SPICE.name:
+                    pending.add(executor.submit(list_schedules, dataset['DataSetId']))
+                for physicalTableKey in dataset['PhysicalTableMap']:
+                    tableTypeKey = list(dataset['PhysicalTableMap'][physicalTableKey].keys()).pop()
+                    datasourceId = dataset['PhysicalTableMap'][physicalTableKey][tableTypeKey]['DataSourceArn'].split('datasource/')[-1]
+                    if datasourceId not in seen_datasource_ids:
+                        seen_datasource_ids.add(datasourceId)
+                        pending.add(executor.submit(describe_datasource, datasourceId))
+                if 'RowLevelPermissionDataSet' in dataset and bool(dataset['RowLevelPermissionDataSet']):
+                    rlsDatasetId = dataset['RowLevelPermissionDataSet']['Arn'].split('dataset/')[-1]
+                    if rlsDatasetId not in seen_dataset_ids:
+                        seen_dataset_ids.add(rlsDatasetId)
+                        pending.add(executor.submit(describe_dataset, rlsDatasetId))
+
 # Helper function that creates an QSAnalysisDef object from the analysis that originated the dashboard ID passed as argument, this object will be then used to generate a cloudformation template to build such analysis
 def getAnalysisAssociatedWithDashboard(dashboardId, ds_index):
     """
@@ -2017,10 +3347,12 @@ def getAnalysisAssociatedWithDashboard(dashboardId, ds_index):
     analysis_id = source_analysis_arn.split('analysis/')[1]
     ret = qs.describe_analysis(AwsAccountId=FIRST_STAGE_ACCOUNT_ID, AnalysisId=analysis_id)
     dataset_arns = ret['Analysis']['DataSetArns']
+    prefetch_analysis_dependencies(dataset_arns=dataset_arns)
     ds_count = ds_index
     datasourceDefObjList = []
     datasetsDefObjList = []
     analysis_name = ret['Analysis']['Name']
+    analysis_last_updated = ret['Analysis'].get('LastUpdatedTime')
     permissions = qs.describe_analysis_permissions(AwsAccountId=FIRST_STAGE_ACCOUNT_ID, AnalysisId=analysis_id)
     owner = permissions['Permissions'].pop()
     username =  owner['Principal'].split('default/')
@@ -2073,8 +3405,8 @@ def getAnalysisAssociatedWithDashboard(dashboardId, ds_index):
         
         
     analysis = QSAnalysisDef(name=analysis_name, arn=analysis_arn,QSAdminRegion=qs_admin_region, QSRegion=analysis_region, QSUser=username, AccountId=FIRST_STAGE_ACCOUNT_ID, PipelineName=PIPELINE_NAME, 
-                             AssociatedDashboardId=dashboardId)
-    analysis.datasets = datasetsDefObjList
+                             AssociatedDashboardId=dashboardId, LastUpdatedTime=analysis_last_updated)
+    analysis.setDatasets(datasetsDefObjList)
 
     #Now we need to tag RLS datasets to make sure they are not included in Analysis template definition
 
@@ -2084,6 +3416,45 @@ def getAnalysisAssociatedWithDashboard(dashboardId, ds_index):
 
     return analysis, ds_count
 
+def get_analyses_associated_with_dashboards(dashboard_ids, max_workers=DISCOVERY_MAX_WORKERS):
+    """
+    Helper function that resolves the analyses (and all their depending assets) of a list of dashboards concurrently using a bounded thread pool.
+    Discovery is I/O bound so dashboards are resolved in parallel, results are then returned in the order of the sorted dashboard ids and datasource
+    indexes are renumbered sequentially so the output is the same regardless of the order in which discovery calls complete
+
+    Parameters:
+
+    dashboard_ids(Iterable[String]): Dashboard IDs to resolve
+    max_workers(Integer): Maximum number of dashboards being resolved at the same time, defaults to DISCOVERY_MAX_WORKERS
+
+    Returns:
+
+    analysisObjList(List[QSAnalysisDef]): List of analysis objects, one per dashboard
+    ds_index(Integer): Total number of datasources across all the analyses
+
+    Examples:
+
+    >>> get_analyses_associated_with_dashboards(dashboard_ids=asset_id_list)
+
+    """
+
+    sorted_dashboard_ids = sorted(dashboard_ids)
+    analysisObjList = []
+    ds_index = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        # every analysis is resolved with a start index of 0, the final indexes are assigned below in dashboard order
+        results = executor.map(lambda dashboardId: getAnalysisAssociatedWithDashboard(dashboardId=dashboardId, ds_index=0), sorted_dashboard_ids)
+
+        for analysisObj, ds_count in results:
+            for datasetObj in analysisObj.datasets:
+                for datasourceObj in datasetObj.dependingDSources:
+                    datasourceObj.index = datasourceObj.index + ds_index
+            ds_index = ds_index + ds_count
+            analysisObjList.append(analysisObj)
+
+    return analysisObjList, ds_index
+
 def lambda_handler(event, context):
 
     calledViaEB = False
@@ -2093,49 +3464,135 @@ def lambda_handler(event, context):
 
     print("Execution MODE is {mode}".format(mode=MODE))
 
+    # Lambda containers are reused, cached describe results must not outlive the invocation
+    qs.reset()
+    aws_executor.resetMetrics()
+
     replication_handler = None
     credentials = assumeRoleInDeplAccount(role_arn=DEPLOYMENT_DEV_ACCOUNT_ROLE_ARN)        
 
     asset_id_list = read_all_assetIds_from_dynamo(region=AWS_REGION, credentials=credentials)
 
-    # Validate if each asset on the list is actually a Dashboard
-    for asset_id in asset_id_list:
-        if not validate_asset_id(assetId=asset_id, region=AWS_REGION):
-            return {
-                'statusCode': 500,
-                'body': 'Asset id {asset_id} is not a dashboard, at the moment only QuickSight dashboards are supported in this pipeline, please fix this and retry ...'.format(asset_id=asset_id)
-            }
-
-    analysisObjList = []
-
-    source_account_yaml = {}
-    dest_account_yaml = {}
-    ds_index = 0
-
-    # Now we are sure that all the assets on the list are dashboards, we can create a list of QSAnalysisDef objects with each of their originating analyses.
-    for dashboardId in asset_id_list:
-        analysisObj, ds_index = getAnalysisAssociatedWithDashboard(dashboardId=dashboardId, ds_index=ds_index)
-        analysisObjList.append(analysisObj)        
-    
+    updated_dashboard_id = None
     if 'source' in event and event['source'] == 'aws.quicksight':
         print('Lambda function called via EventBridge')
         calledViaEB = True
         if 'resources' in event:
             updated_dashboard_id = event['resources'].pop().split('dashboard/')[1]
         
+            # Events of untracked dashboards are discarded before any QuickSight call
             if updated_dashboard_id not in asset_id_list:
                 print('This lambda is configured to promote dashboards configured in the DDB table {table_name} whose ids are {dashboard_ids}, however the updated dashboard in event is {updated_dashboard_id}. Skipping ...'
                     .format(table_name=TRACKED_ASSETS_TABLE_NAME, dashboard_ids=asset_id_list, updated_dashboard_id=updated_dashboard_id))
                 return {
                     'statusCode': 200
                 }
+
+    # An Assets as Bundle export job left in progress by a previous invocation is resumed with the inputs of the synthesis that started it, unless a
+    # dashboard was updated since (its export would be stale)
+    export_job_store = None
+    pending_export_job = None
+    if REPLICATION_METHOD == 'ASSETS_AS_BUNDLE':
+        export_job_store = get_export_job_store(credentials=credentials)
+        pending_export_job = load_pending_export_job(store=export_job_store)
+        if pending_export_job is not None and calledViaEB:
+            print('Dashboard {dashboard_id} was updated while export job {job_id} was in progress, starting a new export job'.format(dashboard_id=updated_dashboard_id, job_id=pending_export_job['JobId']))
+            pending_export_job = None
+        elif pending_export_job is not None:
+            updated_dashboard_id = pending_export_job['Inputs'].get('UpdatedDashboardId')
+            calledViaEB = pending_export_job['Inputs'].get('CalledViaEB', False)
+
+    # Resume invocations requested by schedule_export_job_resume are discarded if their job was completed or replaced in the meantime
+    if RESUME_EXPORT_JOB_EVENT_KEY in event and (pending_export_job is None or pending_export_job['JobId'] != event[RESUME_EXPORT_JOB_EVENT_KEY]):
+        print('Export job {job_id} is no longer pending, nothing to resume'.format(job_id=event[RESUME_EXPORT_JOB_EVENT_KEY]))
+        return {
+            'statusCode': 200
+        }
+
+    metadata_store = get_metadata_store(credentials=credentials)
+    load_persistent_metadata_cache(store=metadata_store)
+
+    synthesis_state_store = get_synthesis_state_store(credentials=credentials)
+    previous_synthesis = load_previous_synthesis(store=synthesis_state_store)
+    synthesis_state = None
+    if updated_dashboard_id is not None and INCREMENTAL_SYNTHESIS == 'true':
+        synthesis_state = load_synthesis_state(state=previous_synthesis, asset_id_list=asset_id_list, remap=remap, updated_dashboard_id=updated_dashboard_id)
+
+    # Incremental synthesis only discovers and synthesizes the updated dashboard, the rest of the tracked dashboards are taken from the previous synthesis
+    dashboards_to_synthesize = [updated_dashboard_id] if synthesis_state is not None else asset_id_list
+    if synthesis_state is not None:
+        print('Incrementally synthesizing dashboard {dashboard_id}'.format(dashboard_id=updated_dashboard_id))
+
+    # Validate if each asset on the list is actually a Dashboard
+    invalid_asset_ids = validate_asset_ids(assetIds=dashboards_to_synthesize, region=AWS_REGION)
+    if len(invalid_asset_ids) > 0:
+        return {
+            'statusCode': 500,
+            'body': 'Asset ids {asset_ids} are not dashboards, at the moment only QuickSight dashboards are supported in this pipeline, please fix this and retry ...'.format(asset_ids=invalid_asset_ids)
+        }
+
+    source_account_yaml = {}
+    dest_account_yaml = {}
+
+    # Now we are sure that all the assets on the list are dashboards, we can create a list of QSAnalysisDef objects with each of their originating analyses.
+    analysisObjList, ds_index = get_analyses_associated_with_dashboards(dashboard_ids=dashboards_to_synthesize)
+    # Dependency graph is built once and shared by all the generators
+    assetGraph = QSAssetGraph(analysisObjList)
     
     if REPLICATION_METHOD == 'TEMPLATE':
         replication_handler = replicate_dashboard_via_template
     elif REPLICATION_METHOD == 'ASSETS_AS_BUNDLE':
-        replication_handler = replicate_dashboard_via_AAB
+        replication_handler = partial(replicate_dashboard_via_AAB, context=context, export_job_store=export_job_store, pending_export_job=pending_export_job,
+                                      export_job_inputs={'UpdatedDashboardId': updated_dashboard_id, 'CalledViaEB': calledViaEB})
     
-    source_account_yaml, dest_account_yaml = replication_handler(analysisObjList, remap)
+    try:
+        source_account_yaml, dest_account_yaml, parameter_index = replication_handler(analysisObjList, remap, assetGraph)
+    except ExportJobPending as pending:
+        # The discovered metadata is kept so the invocation that resumes the job doesn't describe the assets again
+        save_persistent_metadata_cache(store=metadata_store, keep_persisted=synthesis_state is not None)
+        print('{error}, it will be resumed by another invocation of this function'.format(error=pending))
+        schedule_export_job_resume(job=pending.job, store=export_job_store, context=context)
+        return {
+            'statusCode': 202,
+            'body': 'Assets as Bundle export job {job_id} is in progress, the synthesis will be resumed once it finishes'.format(job_id=pending.job['JobId'])
+        }
+    except ValueError as error:
+        return {
+            'statusCode': 500,
+            'error': str(error)
+        }
+
+    if previous_synthesis is not None:
+        # The incremental synthesis merges into the previous templates in place, the diff needs them as they were
+        previous_source_yaml = copyTree(previous_synthesis['Source']) if synthesis_state is not None else previous_synthesis['Source']
+        previous_dest_yaml = copyTree(previous_synthesis['Dest']) if synthesis_state is not None else previous_synthesis['Dest']
+
+    if synthesis_state is not None:
+        source_account_yaml, dest_account_yaml = merge_incremental_synthesis(state=synthesis_state, source_account_yaml=source_account_yaml, dest_account_yaml=dest_account_yaml,
+                                                                             updated_dashboard_id=updated_dashboard_id, asset_id_list=asset_id_list)
+        synthesis_manifest = build_synthesis_manifest(source_account_yaml=source_account_yaml, dest_account_yaml=dest_account_yaml, assetGraph=assetGraph, asset_id_list=asset_id_list,
+                                                      remap=remap, previous_manifest=synthesis_state['Manifest'])
+        # Parameters merged from the previous synthesis were not emitted by this invocation generators
+        parameter_index.indexDescriptions(dest_account_yaml.get('Parameters', {}))
+    else:
+        synthesis_manifest = build_synthesis_manifest(source_account_yaml=source_account_yaml, dest_account_yaml=dest_account_yaml, assetGraph=assetGraph, asset_id_list=asset_id_list, remap=remap)
+
+    # The artifacts are skipped when the templates didn't materially change and the artifacts of the previous synthesis were uploaded
+    artifacts_up_to_date = False
+    if previous_synthesis is not None:
+        source_account_yaml, dest_account_yaml, templates_unchanged = stabilize_synthesized_templates(previous_source_yaml=previous_source_yaml, previous_dest_yaml=previous_dest_yaml,
+                                                                                                      source_account_yaml=source_account_yaml, dest_account_yaml=dest_account_yaml)
+        artifacts_up_to_date = SKIP_UNCHANGED_ARTIFACTS == 'true' and templates_unchanged and previous_synthesis.get('Published', False)
+    save_synthesis_state(store=synthesis_state_store, manifest=synthesis_manifest, source_account_yaml=source_account_yaml, dest_account_yaml=dest_account_yaml)
+
+    cache_stats = qs.getStats()
+    print('QuickSight describe cache stats: {hits} hits, {misses} misses ({persistent_hits} served from the persistent cache, {entries} cached responses)'
+          .format(hits=cache_stats['hits'], misses=cache_stats['misses'], persistent_hits=cache_stats['persistentHits'], entries=cache_stats['entries']))
+    save_persistent_metadata_cache(store=metadata_store, keep_persisted=synthesis_state is not None)
+
+    for operation, metrics in sorted(aws_executor.getMetrics().items()):
+        print('AWS API {operation}: {calls} calls, {retries} retries, {throttles} throttled, {errors} errors, {latency:.3f}s total latency'
+              .format(operation=operation, calls=metrics['calls'], retries=metrics['retries'], throttles=metrics['throttles'], errors=metrics['errors'], latency=metrics['latencySeconds']))
 
     if REPLICATION_METHOD == 'ASSETS_AS_BUNDLE':
         dest_account_yaml = add_permissions_to_AAB_resources(dest_account_yaml)
@@ -2161,58 +3618,65 @@ def lambda_handler(event, context):
             source_param_help = summarize_template(template_content=source_account_yaml, templateName="SourceAssets", s3Credentials=credentials, conf_files_prefix=CONFIGURATION_FILES_PREFIX)
             dest_param_help = summarize_template(template_content=dest_account_yaml, templateName="DestinationAssets", s3Credentials=credentials, conf_files_prefix=CONFIGURATION_FILES_PREFIX)            
             
+            parameter_definitions = []
             for stage in deployment_stages:
                 source_assets_param_file_path = writeToFile('{output_dir}/source_cfn_template_parameters_{stage}.txt'.format(output_dir=OUTPUT_DIR, stage=stage.strip()), content=source_param_list, format='json')
                 uploadFileToS3(bucket=DEPLOYMENT_S3_BUCKET, filename=source_assets_param_file_path, prefix=CONFIGURATION_FILES_PREFIX, region=DEPLOYMENT_S3_REGION, bucket_owner=DEPLOYMENT_ACCOUNT_ID, credentials=credentials)
                 dest_assets_param_file_path = writeToFile('{output_dir}/dest_cfn_template_parameters_{stage}.txt'.format(output_dir=OUTPUT_DIR, stage=stage.strip()), content=dest_param_list, format='json')
                 uploadFileToS3(bucket=DEPLOYMENT_S3_BUCKET, filename=dest_assets_param_file_path, prefix=CONFIGURATION_FILES_PREFIX, bucket_owner=DEPLOYMENT_ACCOUNT_ID, region=DEPLOYMENT_S3_REGION, credentials=credentials)
 
-                # Store parameter definition initialization for each stage in DDB tables
+                # Parameter definition initialization for each stage, stored at once in the DDB table
                 #source Params
-                store_dashboard_parameter_definition_in_dynamo(table_name=PARAMETER_DEFINITION_TABLE_NAME, assetType="source", stage=stage.strip(),  parameter_definition=json.dumps(source_param_list, indent=2),
-                                                               parameter_help=json.dumps(source_param_help, indent=2), region=AWS_REGION, credentials=credentials)
+                parameter_definitions.append({'assetType': 'source', 'stage': stage.strip(), 'parameter_definition': source_param_list, 'parameter_help': source_param_help})
                 #dest Params
-                store_dashboard_parameter_definition_in_dynamo(table_name=PARAMETER_DEFINITION_TABLE_NAME, assetType="dest", stage=stage.strip(), parameter_definition=json.dumps(dest_param_list, indent=2),
-                                                               parameter_help=json.dumps(dest_param_help, indent=2), region=AWS_REGION, credentials=credentials)
+                parameter_definitions.append({'assetType': 'dest', 'stage': stage.strip(), 'parameter_definition': dest_param_list, 'parameter_help': dest_param_help})
+
+            store_dashboard_parameter_definitions_in_dynamo(parameter_definitions=parameter_definitions, table_name=PARAMETER_DEFINITION_TABLE_NAME, region=AWS_REGION, credentials=credentials)
 
 
         elif calledViaEB or (MODE == 'DEPLOY'):
             try:
-                check_parameters_cloudformation(template_param_list=source_param_list, region=AWS_REGION, credentials=credentials, assetType="source")
+                # the definitions of both asset types for every stage are read at once
+                parameter_definitions = read_dashboard_parameter_definitions_from_dynamo(table_name=PARAMETER_DEFINITION_TABLE_NAME, keys=[(assetType, stage.strip()) for assetType in ['source', 'dest'] for stage in deployment_stages],
+                                                                                         region=AWS_REGION, credentials=credentials)
 
-                check_parameters_cloudformation(template_param_list=dest_param_list, region=AWS_REGION, credentials=credentials, assetType="dest")
+                source_parameters_changed = check_parameters_cloudformation(template_param_list=source_param_list, region=AWS_REGION, credentials=credentials, assetType="source", parameter_definitions=parameter_definitions)
+
+                dest_parameters_changed = check_parameters_cloudformation(template_param_list=dest_param_list, region=AWS_REGION, credentials=credentials, assetType="dest", parameter_definitions=parameter_definitions)
             except ValueError as error:            
                 print('There was an issue with the CFN parameters file for stage, correct your CFN parameter file or run the function again with MODE: ''INITIALIZE''')
                 raise ValueError(error)
-                
+
+            if artifacts_up_to_date and not source_parameters_changed and not dest_parameters_changed:
+                print('Neither the templates nor the parameter files changed since the previous synthesis, the uploaded artifacts are up to date and will not be assembled again')
+                mark_synthesis_published(store=synthesis_state_store)
+                return {
+                    'statusCode': 200
+                }
 
             print("{mode} was requested via event in Lambda, proceeding with the generation of assets based with the config  files in {config_files_prefix}\
                     prefix on {bucket} in the deployment account {deployment_account}".format(mode=MODE, config_files_prefix=ASSETS_FILES_PREFIX, bucket=DEPLOYMENT_S3_BUCKET, deployment_account=DEPLOYMENT_ACCOUNT_ID))
             
-            # Create source artifact file
-            zip_file = '{output_dir}/SOURCE_assets_CFN.zip'.format(output_dir=OUTPUT_DIR)
-
-            source_files = get_s3_objects(bucket=DEPLOYMENT_S3_BUCKET, prefix='{config_files_prefix}/source_cfn_template_parameters_'.format(config_files_prefix=CONFIGURATION_FILES_PREFIX), region=DEPLOYMENT_S3_REGION, credentials=credentials)
-            source_files.append(QSSourceAssetsFilename)
-
-            ret_source = zipAndUploadToS3(bucket=DEPLOYMENT_S3_BUCKET, files=source_files, zip_name=zip_file,  prefix=ASSETS_FILES_PREFIX, bucket_owner=DEPLOYMENT_ACCOUNT_ID, region=DEPLOYMENT_S3_REGION, credentials=credentials)
+            # Create source artifact file, the stage parameter files are streamed from S3 into the zip
+            ret_source = assembleZipAndUploadToS3(bucket=DEPLOYMENT_S3_BUCKET, object_prefix='{config_files_prefix}/source_cfn_template_parameters_'.format(config_files_prefix=CONFIGURATION_FILES_PREFIX),
+                                                  files=[QSSourceAssetsFilename], object_name='SOURCE_assets_CFN.zip', prefix=ASSETS_FILES_PREFIX, bucket_owner=DEPLOYMENT_ACCOUNT_ID, region=DEPLOYMENT_S3_REGION, credentials=credentials)
 
             # Create dest artifact file
-            zip_file = '{output_dir}/DEST_assets_CFN.zip'.format(output_dir=OUTPUT_DIR)
 
             if generate_nested_stacks:
                 if REPLICATION_METHOD == 'ASSETS_AS_BUNDLE':
                     resource_id_mapping = generate_resource_id_mapping(template_content=dest_account_yaml)
                     updated_dest_account_yaml = change_stack_references_to_ids(template_content=dest_account_yaml, resource_id_mapping=resource_id_mapping)
-                    grouped_resources_content, grouped_parameters_content = split_stack_resources_and_parameters_into_groups(updated_dest_account_yaml)
+                    grouped_resources_content, grouped_parameters_content = split_stack_resources_and_parameters_into_groups(updated_dest_account_yaml, parameter_index)
                 else:
-                    grouped_resources_content, grouped_parameters_content = split_stack_resources_and_parameters_into_groups(dest_account_yaml)
+                    grouped_resources_content, grouped_parameters_content = split_stack_resources_and_parameters_into_groups(dest_account_yaml, parameter_index)
                 parent_dest_stack_yaml = generate_nested_stacks_from_grouped_resources(grouped_resources_content=grouped_resources_content, grouped_parameters_content=grouped_parameters_content, credentials=credentials)
                 writeToFile(filename=QSDestAssetsFilename, content=parent_dest_stack_yaml)
             
-            dest_files = get_s3_objects(bucket=DEPLOYMENT_S3_BUCKET, prefix='{config_files_prefix}/dest_cfn_template_parameters_'.format(config_files_prefix=CONFIGURATION_FILES_PREFIX), region=DEPLOYMENT_S3_REGION, credentials=credentials)
-            dest_files.append(QSDestAssetsFilename)
-            ret_dest = zipAndUploadToS3(bucket=DEPLOYMENT_S3_BUCKET, files=dest_files, zip_name=zip_file,  prefix=ASSETS_FILES_PREFIX, bucket_owner=DEPLOYMENT_ACCOUNT_ID, region=DEPLOYMENT_S3_REGION, credentials=credentials)
+            ret_dest = assembleZipAndUploadToS3(bucket=DEPLOYMENT_S3_BUCKET, object_prefix='{config_files_prefix}/dest_cfn_template_parameters_'.format(config_files_prefix=CONFIGURATION_FILES_PREFIX),
+                                                files=[QSDestAssetsFilename], object_name='DEST_assets_CFN.zip', prefix=ASSETS_FILES_PREFIX, bucket_owner=DEPLOYMENT_ACCOUNT_ID, region=DEPLOYMENT_S3_REGION, credentials=credentials)
+            if ret_source and ret_dest:
+                mark_synthesis_published(store=synthesis_state_store)
     
     except ValueError as error:
         return {
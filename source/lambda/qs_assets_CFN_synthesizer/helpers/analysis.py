@@ -4,6 +4,7 @@ class QSAnalysisDef:
     arn = ''
     CFNId = ''
     datasets = {}    
+    datasetsById = {}
     QSUser = ''
     QSRegion = ''
     QSAdminRegion = ''
@@ -11,8 +12,9 @@ class QSAnalysisDef:
     TemplateId = ''
     PipelineName = ''
     AssociatedDashboardId = ''
+    LastUpdatedTime = None
     
-    def __init__(self, name: str, arn: str, QSUser:str, QSRegion:str, QSAdminRegion:str, AccountId:str,  PipelineName:str, AssociatedDashboardId: str):
+    def __init__(self, name: str, arn: str, QSUser:str, QSRegion:str, QSAdminRegion:str, AccountId:str,  PipelineName:str, AssociatedDashboardId: str, LastUpdatedTime=None):
         self.name = name
         self.arn = arn
         self.id = arn.split('analysis/')[-1]
@@ -24,16 +26,20 @@ class QSAnalysisDef:
         self.TemplateId = '{analysis_name}-template'.format(analysis_name=name.replace(' ', '-'))
         self.PipelineName = PipelineName
         self.AssociatedDashboardId = AssociatedDashboardId
+        self.LastUpdatedTime = LastUpdatedTime
         
 
     def getDependingDatasets(self):
                 
         return ['DSet{dataset_id}'.format(dataset_id=dataset.id.replace('-', '')) for dataset in self.datasets ]
     
+    def setDatasets(self, datasets:list):
+        self.datasets = datasets
+        self.datasetsById = {}
+        for dataset in datasets:
+            self.datasetsById.setdefault(dataset.id, dataset)
+    
     def getDatasetById(self, datasetId:str):
-        for dataset in self.datasets:
-            if dataset.id == datasetId:
-                return dataset
-        return None
+        return self.datasetsById.get(datasetId)
 
 
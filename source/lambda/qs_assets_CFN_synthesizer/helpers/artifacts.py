@@ -0,0 +1,200 @@
+import hashlib
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from zipfile import ZipFile, ZipInfo, ZIP_STORED
+from botocore.exceptions import ClientError
+from helpers.emitter import iterYamlChunks
+
+
+CONTENT_HASH_METADATA_KEY = 'content-sha256'
+# Fixed timestamp (the minimum allowed in a zip) and permissions of every zip entry so zipping the same files always yields the same bytes
+ZIP_ENTRY_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+ZIP_ENTRY_ATTRIBUTES = 0o644 << 16
+HASH_CHUNK_SIZE = 1024 * 1024
+# Zips smaller than this are assembled in memory, bigger ones roll over to a temporary file
+ZIP_SPOOL_MAX_MEMORY = 64 * 1024 * 1024
+
+
+class ContentHash:
+    """
+    SHA256 (stored in the object metadata) and MD5 (the ETag of objects uploaded in a single part) of an artifact, computed in a single pass
+    """
+
+    def __init__(self):
+        self._sha256 = hashlib.sha256()
+        self._md5 = hashlib.md5(usedforsecurity=False)
+
+    def update(self, data: bytes):
+        self._sha256.update(data)
+        self._md5.update(data)
+
+    @property
+    def sha256(self):
+        return self._sha256.hexdigest()
+
+    @property
+    def md5(self):
+        return self._md5.hexdigest()
+
+    def getMetadata(self):
+        return {CONTENT_HASH_METADATA_KEY: self.sha256}
+
+
+def hashFile(filename: str):
+    contentHash = ContentHash()
+    with open(filename, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            contentHash.update(chunk)
+    return contentHash
+
+
+def hashYaml(content):
+    """
+    Hashes the YAML serialization of content (as emitted by streamYaml) without keeping the document in memory
+    """
+    contentHash = ContentHash()
+    for chunk in iterYamlChunks(content):
+        contentHash.update(chunk.encode('utf-8'))
+    return contentHash
+
+
+def isUnchanged(client, bucket: str, key: str, contentHash: ContentHash, bucketOwner: str = None):
+    """
+    Checks whether the object stored in bucket/key already has the given content. The SHA256 stored in the object metadata is compared and, for
+    objects uploaded without it, the ETag is compared with the MD5 (only equal for single part uploads, which is the common case). Missing objects
+    are reported as changed
+    """
+    extraArgs = {'ExpectedBucketOwner': bucketOwner} if bucketOwner is not None else {}
+    try:
+        ret = client.head_object(Bucket=bucket, Key=key, **extraArgs)
+    except ClientError as error:
+        if error.response['Error']['Code'] in ['404', 'NoSuchKey', 'NotFound']:
+            return False
+        raise error
+
+    storedHash = ret.get('Metadata', {}).get(CONTENT_HASH_METADATA_KEY)
+    if storedHash is not None:
+        return storedHash == contentHash.sha256
+    return ret.get('ETag', '').strip('"') == contentHash.md5
+
+
+def newZipEntry(name: str):
+    entry = ZipInfo(filename=name, date_time=ZIP_ENTRY_DATE_TIME)
+    entry.compress_type = ZIP_STORED
+    entry.external_attr = ZIP_ENTRY_ATTRIBUTES
+    return entry
+
+
+class ZipArtifact:
+    """
+    Deterministic zip (entries stored with a fixed timestamp and permissions, so the same entries always produce a byte identical zip) assembled in a
+    SpooledTemporaryFile, entries are copied from streams (e.g. the body of an S3 object) so small artifacts never touch the disk. Once closed, the
+    zip is rewound so it can be uploaded with upload_fileobj
+    """
+
+    def __init__(self, maxMemory: int = ZIP_SPOOL_MAX_MEMORY):
+        self.maxMemory = maxMemory
+        self.buffer = tempfile.SpooledTemporaryFile(max_size=maxMemory)
+        self.zip = ZipFile(self.buffer, 'w')
+        self.names = []
+        self.size = 0
+
+    def addStream(self, name: str, stream):
+        with self.zip.open(newZipEntry(name), 'w') as destination:
+            shutil.copyfileobj(stream, destination, HASH_CHUNK_SIZE)
+        self.names.append(name)
+
+    def addFile(self, name: str, filename: str):
+        with open(filename, 'rb') as source:
+            self.addStream(name, source)
+
+    def close(self):
+        """
+        Finishes the zip and returns its ContentHash
+        """
+        self.zip.close()
+        self.size = self.buffer.tell()
+        self.buffer.seek(0)
+        contentHash = ContentHash()
+        for chunk in iter(lambda: self.buffer.read(HASH_CHUNK_SIZE), b''):
+            contentHash.update(chunk)
+        self.buffer.seek(0)
+        return contentHash
+
+    def isInMemory(self):
+        # the spooled file rolls over to disk as soon as it grows past maxMemory, only valid once closed
+        return self.size <= self.maxMemory
+
+    def discard(self):
+        self.buffer.close()
+
+
+class CapturingReader:
+    """
+    Readable stream wrapper that keeps a copy of what is read from the stream as long as it stays within maxCapture bytes, so a body can be streamed
+    to its destination and still be cached when it is small
+    """
+
+    def __init__(self, stream, maxCapture: int):
+        self.stream = stream
+        self.maxCapture = maxCapture
+        self._captured = []
+        self._size = 0
+
+    def read(self, size: int = -1):
+        data = self.stream.read(size)
+        self._size += len(data)
+        if self._size <= self.maxCapture:
+            self._captured.append(data)
+        else:
+            self._captured = None
+        return data
+
+    def getCaptured(self):
+        """
+        Returns everything read from the stream, None if it exceeded maxCapture bytes
+        """
+        return b''.join(self._captured) if self._captured is not None else None
+
+
+class ETagCache:
+    """
+    Values derived from S3 objects (a local copy, the content ...) keyed by bucket and key along with the ETag of the object they were derived from,
+    kept across warm invocations so objects whose ETag didn't change are not fetched again. The least recently used entries are evicted once the
+    entries add up to more than maxBytes (the size of each value is given when it is put)
+    """
+
+    def __init__(self, maxBytes: int = None):
+        self.maxBytes = maxBytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, bucket: str, key: str, etag: str):
+        with self._lock:
+            entry = self._entries.get((bucket, key))
+            if entry is None or entry[0] != etag:
+                return None
+            self._entries.move_to_end((bucket, key))
+        return entry[1]
+
+    def put(self, bucket: str, key: str, etag: str, value, size: int = 0):
+        if self.maxBytes is not None and size > self.maxBytes:
+            return
+        with self._lock:
+            self._pop((bucket, key))
+            self._entries[(bucket, key)] = (etag, value, size)
+            self._size += size
+            while self.maxBytes is not None and self._size > self.maxBytes:
+                self._pop(next(iter(self._entries)))
+
+    def discard(self, bucket: str, key: str):
+        with self._lock:
+            self._pop((bucket, key))
+
+    def _pop(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[2]
@@ -0,0 +1,161 @@
+import copy
+import threading
+from concurrent.futures import Future
+
+
+class QSDescribeCache:
+    """
+    Memoizing proxy placed in front of a boto3 QuickSight client. Describe/list operations listed in CACHEABLE_OPERATIONS are
+    keyed by (operation, resource id) so every dataset, datasource, analysis ... is only fetched once per invocation no matter
+    how many dashboards or generators ask for it. Any other attribute (e.g. asset bundle jobs, exceptions) is delegated untouched
+    to the wrapped client.
+
+    Responses are deep copied when handed out as generators mutate them in place when building CFN resources. The cache is
+    thread safe and concurrent requests for the same key while a call is in flight wait for that call instead of issuing a new one.
+
+    Responses of PERSISTABLE_OPERATIONS can also be loaded from (and dumped to) a persistent store across invocations, a persisted response
+    is only reused when its LastUpdatedTime matches the one currently reported by the QuickSight list APIs.
+    """
+
+    CACHEABLE_OPERATIONS = ['describe_dashboard', 'describe_analysis', 'describe_analysis_permissions', 'describe_data_set', 'describe_data_source',
+                            'list_refresh_schedules', 'describe_refresh_schedule']
+
+    # operation -> key of the response object that holds the LastUpdatedTime attribute
+    PERSISTABLE_OPERATIONS = {
+        'describe_analysis': 'Analysis',
+        'describe_data_set': 'DataSet',
+        'describe_data_source': 'DataSource'
+    }
+
+    def __init__(self, client):
+        self.client = client
+        self.hits = 0
+        self.misses = 0
+        self.persistentHits = 0
+        self._entries = {}
+        self._pending = {}
+        self._persisted = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if name not in self.CACHEABLE_OPERATIONS:
+            return attr
+
+        def cachedCall(**kwargs):
+            return self.call(name, attr, **kwargs)
+
+        return cachedCall
+
+    @staticmethod
+    def getResourceId(kwargs: dict):
+        return '/'.join(str(kwargs[key]) for key in sorted(kwargs.keys()) if key != 'AwsAccountId')
+
+    def call(self, operation: str, method, **kwargs):
+        key = (operation, self.getResourceId(kwargs))
+        owner = False
+
+        with self._lock:
+            if key in self._entries:
+                self.hits = self.hits + 1
+                return copy.deepcopy(self._entries[key])
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = Future()
+                self._pending[key] = pending
+                owner = True
+            else:
+                # Another thread is already fetching this resource, count it as a hit and wait for its result
+                self.hits = self.hits + 1
+
+        if not owner:
+            return copy.deepcopy(pending.result())
+
+        try:
+            response = self._getPersisted(key)
+            if response is None:
+                response = method(**kwargs)
+            else:
+                with self._lock:
+                    self.persistentHits = self.persistentHits + 1
+        except Exception as error:
+            with self._lock:
+                del self._pending[key]
+            pending.set_exception(error)
+            raise
+
+        with self._lock:
+            self.misses = self.misses + 1
+            self._entries[key] = response
+            del self._pending[key]
+        pending.set_result(response)
+
+        return copy.deepcopy(response)
+
+    def _getPersisted(self, key: tuple):
+        operation, resourceId = key
+        currentVersion = self._versions.get(operation, {}).get(resourceId)
+        entry = self._persisted.get(operation, {}).get(resourceId)
+        if currentVersion is None or entry is None or entry['LastUpdatedTime'] != currentVersion:
+            return None
+        return entry['Response']
+
+    def loadPersistentEntries(self, entries: dict, versions: dict):
+        """
+        Loads responses persisted by a previous invocation
+
+        Parameters:
+
+        entries(dict): Persisted entries as returned by dumpPersistentEntries {operation: {resourceId: {'LastUpdatedTime': str, 'Response': dict}}}
+        versions(dict): Current LastUpdatedTime of each resource as reported by the list APIs {operation: {resourceId: str}}
+
+        """
+        with self._lock:
+            self._persisted = entries
+            self._versions = versions
+
+    def dumpPersistentEntries(self, keepPersisted: bool = False):
+        """
+        Returns the responses of PERSISTABLE_OPERATIONS used in this invocation in the format expected by loadPersistentEntries, resources that are no
+        longer used by any tracked asset are not carried over unless keepPersisted is set (used when only part of the tracked assets were described),
+        in that case loaded entries that are still up to date are kept as well
+        """
+        entries = {}
+        with self._lock:
+            if keepPersisted:
+                for operation, persistedEntries in self._persisted.items():
+                    for resourceId, entry in persistedEntries.items():
+                        if self._versions.get(operation, {}).get(resourceId) == entry['LastUpdatedTime']:
+                            entries.setdefault(operation, {})[resourceId] = entry
+            for (operation, resourceId), response in self._entries.items():
+                if operation not in self.PERSISTABLE_OPERATIONS:
+                    continue
+                responseObj = response[self.PERSISTABLE_OPERATIONS[operation]]
+                if 'LastUpdatedTime' not in responseObj:
+                    continue
+                persistedResponse = {key: value for key, value in response.items() if key != 'ResponseMetadata'}
+                entries.setdefault(operation, {})[resourceId] = {
+                    'LastUpdatedTime': str(responseObj['LastUpdatedTime']),
+                    'Response': persistedResponse
+                }
+        return entries
+
+    def reset(self):
+        with self._lock:
+            self._entries = {}
+            self._pending = {}
+            self._persisted = {}
+            self._versions = {}
+            self.hits = 0
+            self.misses = 0
+            self.persistentHits = 0
+
+    def getStats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'persistentHits': self.persistentHits,
+                'entries': len(self._entries)
+            }
@@ -0,0 +1,117 @@
+import threading
+from datetime import datetime, timezone
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+
+# Enough pooled connections for every worker thread of the synthesizer (discovery, resolver and upload pools) to share a single client
+CLIENT_MAX_POOL_CONNECTIONS = 32
+
+
+def getCredentialIdentity(credentials: dict = None):
+    """
+    Returns the identity clients are cached by, the access key id of the credentials or None for the credentials of the function
+    """
+    return credentials['AccessKeyId'] if credentials is not None else None
+
+
+class AWSClientRegistry:
+    """
+    Registry of boto3 clients and resources keyed by (service, region, credential identity), so every call of an invocation (and of the following warm
+    invocations) reuses the same connection pool instead of building a client and opening new TLS connections each time. Clients, resources (whose
+    actions, such as batch_get_item, are requests too) and tables are wrapped by the executor. The bucket ownership verifications are cached per
+    bucket for the life of the credentials, entries of expired credentials are evicted
+    """
+
+    def __init__(self, executor, maxPoolConnections: int = CLIENT_MAX_POOL_CONNECTIONS, tcpKeepalive: bool = True):
+        self.executor = executor
+        # The executor retries the calls of the clients it wraps, botocore doesn't retry them so throttles reach its AIMD limiter right away. The
+        # managed clients (paginators, managed transfers and batch writers, which the executor doesn't retry) keep the botocore retries
+        self.config = Config(max_pool_connections=maxPoolConnections, tcp_keepalive=tcpKeepalive, retries={'mode': 'standard', 'total_max_attempts': 1})
+        self.managedConfig = Config(max_pool_connections=maxPoolConnections, tcp_keepalive=tcpKeepalive, retries={'mode': 'standard'})
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._bucketOwners = {}
+        self._expirations = {}
+
+    def _credentialArgs(self, credentials: dict = None):
+        if credentials is None:
+            return {}
+        return {'aws_access_key_id': credentials['AccessKeyId'], 'aws_secret_access_key': credentials['SecretAccessKey'], 'aws_session_token': credentials['SessionToken']}
+
+    def _evictExpired(self):
+        now = datetime.now(timezone.utc)
+        expired = [identity for identity, expiration in self._expirations.items() if expiration <= now]
+        for identity in expired:
+            del self._expirations[identity]
+            self._clients = {key: value for key, value in self._clients.items() if key[-1] != identity}
+            self._bucketOwners = {key: value for key, value in self._bucketOwners.items() if key[-1] != identity}
+
+    def _get(self, kind: str, service: str, region: str, credentials: dict, factory):
+        identity = getCredentialIdentity(credentials)
+        key = (kind, service, region, identity)
+        with self._lock:
+            if key not in self._clients:
+                self._evictExpired()
+                if credentials is not None and isinstance(credentials.get('Expiration'), datetime):
+                    self._expirations[identity] = credentials['Expiration']
+                self._clients[key] = factory()
+            return self._clients[key]
+
+    def _newClient(self, service: str, region: str, credentials: dict, config: Config):
+        return boto3.client(service, region_name=region, config=config, **self._credentialArgs(credentials))
+
+    def _newResource(self, service: str, region: str, credentials: dict, config: Config):
+        return boto3.resource(service, region_name=region, config=config, **self._credentialArgs(credentials))
+
+    def _getManagedClient(self, service: str, region: str = None, credentials: dict = None):
+        return self._get('managed-client', service, region, credentials, lambda: self._newClient(service, region, credentials, self.managedConfig))
+
+    def _getManagedTable(self, tableName: str, region: str = None, credentials: dict = None):
+        dynamodb = self._get('managed-resource', 'dynamodb', region, credentials, lambda: self._newResource('dynamodb', region, credentials, self.managedConfig))
+        return self._get('managed-table:{table}'.format(table=tableName), 'dynamodb', region, credentials, lambda: dynamodb.Table(tableName))
+
+    def getClient(self, service: str, region: str = None, credentials: dict = None):
+        return self._get('client', service, region, credentials,
+                         lambda: self.executor.wrap(self._newClient(service, region, credentials, self.config), service,
+                                                    managedFactory=lambda: self._getManagedClient(service, region=region, credentials=credentials)))
+
+    def _getRawResource(self, service: str, region: str = None, credentials: dict = None):
+        return self._get('raw-resource', service, region, credentials, lambda: self._newResource(service, region, credentials, self.config))
+
+    def getResource(self, service: str, region: str = None, credentials: dict = None):
+        resource = self._getRawResource(service, region=region, credentials=credentials)
+        return self._get('resource', service, region, credentials, lambda: self.executor.wrap(resource, service))
+
+    def getTable(self, tableName: str, region: str = None, credentials: dict = None):
+        dynamodb = self._getRawResource('dynamodb', region=region, credentials=credentials)
+        return self._get('table:{table}'.format(table=tableName), 'dynamodb', region, credentials,
+                         lambda: self.executor.wrap(dynamodb.Table(tableName), 'dynamodb',
+                                                    managedFactory=lambda: self._getManagedTable(tableName, region=region, credentials=credentials)))
+
+    def isBucketOwnedBy(self, bucket: str, bucketOwner: str, region: str = None, credentials: dict = None):
+        """
+        Checks (once per bucket, owner and credentials) that the bucket belongs to bucketOwner, only successful verifications are cached
+        """
+        key = (bucket, bucketOwner, getCredentialIdentity(credentials))
+        with self._lock:
+            if key in self._bucketOwners:
+                return self._bucketOwners[key]
+
+        s3 = self.getClient('s3', region=region, credentials=credentials)
+        try:
+            s3.get_bucket_location(Bucket=bucket, ExpectedBucketOwner=bucketOwner)
+        except ClientError:
+            # failures are not cached, the next call checks again
+            return False
+
+        with self._lock:
+            self._bucketOwners[key] = True
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._clients = {}
+            self._bucketOwners = {}
+            self._expirations = {}
@@ -0,0 +1,127 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+
+
+# DynamoDB quota of keys per BatchGetItem request
+BATCH_GET_MAX_KEYS = 100
+UNPROCESSED_MAX_ATTEMPTS = 5
+UNPROCESSED_BASE_DELAY = 0.05
+
+
+class DynamoTable:
+    """
+    Access layer of a DynamoDB table: scans and queries follow every page (scans optionally with parallel segments), reads of several keys are batched with
+    BatchGetItem (unprocessed keys are retried with backoff) and writes go through a batch writer skipping the items that didn't change
+    """
+
+    def __init__(self, resource, table, keyAttributes: list):
+        self.resource = resource
+        self.table = table
+        self.tableName = table.name
+        self.keyAttributes = keyAttributes
+
+    def getKey(self, item: dict):
+        return tuple(item[attribute] for attribute in self.keyAttributes)
+
+    def _projection(self, attributes: list = None):
+        """
+        Returns the ProjectionExpression (with placeholders, so reserved words can be projected) reading the attributes and the key attributes
+        """
+        if attributes is None:
+            return {}
+        names = list(dict.fromkeys(self.keyAttributes + attributes))
+        return {'ProjectionExpression': ', '.join('#a{index}'.format(index=index) for index in range(len(names))),
+                'ExpressionAttributeNames': {'#a{index}'.format(index=index): name for index, name in enumerate(names)}}
+
+    def _scanSegment(self, segment: int = None, totalSegments: int = None, **kwargs):
+        if totalSegments is not None and totalSegments > 1:
+            kwargs = dict(kwargs, Segment=segment, TotalSegments=totalSegments)
+        items = []
+        while True:
+            ret = self.table.scan(**kwargs)
+            items.extend(ret.get('Items', []))
+            if 'LastEvaluatedKey' not in ret:
+                return items
+            kwargs = dict(kwargs, ExclusiveStartKey=ret['LastEvaluatedKey'])
+
+    def scan(self, segments: int = 1, **kwargs):
+        """
+        Returns every item of the table, with segments > 1 the table is scanned by that many parallel segments
+        """
+        if segments <= 1:
+            return self._scanSegment(**kwargs)
+        with ThreadPoolExecutor(max_workers=segments) as executor:
+            pages = list(executor.map(lambda segment: self._scanSegment(segment, segments, **kwargs), range(segments)))
+        return [item for page in pages for item in page]
+
+    def query(self, keyCondition, attributes: list = None, **kwargs):
+        """
+        Returns every item matching the key condition (all the pages of the query). If attributes is provided only those attributes (and the key
+        attributes) are read
+        """
+        kwargs = dict(kwargs, KeyConditionExpression=keyCondition, **self._projection(attributes))
+        items = []
+        while True:
+            ret = self.table.query(**kwargs)
+            items.extend(ret.get('Items', []))
+            if 'LastEvaluatedKey' not in ret:
+                return items
+            kwargs = dict(kwargs, ExclusiveStartKey=ret['LastEvaluatedKey'])
+
+    def batchGet(self, keys: list, attributes: list = None):
+        """
+        Returns the items of the given keys (dictionaries of the key attributes) keyed by getKey, missing items are not returned. If attributes
+        is provided only those attributes (and the key attributes) are read
+        """
+        items = {}
+        uniqueKeys = list({self.getKey(key): key for key in keys}.values())
+        projection = self._projection(attributes)
+        for start in range(0, len(uniqueKeys), BATCH_GET_MAX_KEYS):
+            requestItems = {self.tableName: dict({'Keys': uniqueKeys[start:start + BATCH_GET_MAX_KEYS], 'ConsistentRead': True}, **projection)}
+            attempt = 0
+            while len(requestItems) > 0:
+                ret = self.resource.batch_get_item(RequestItems=requestItems)
+                for item in ret.get('Responses', {}).get(self.tableName, []):
+                    items[self.getKey(item)] = item
+                requestItems = ret.get('UnprocessedKeys', {})
+                if len(requestItems) > 0:
+                    attempt = attempt + 1
+                    if attempt >= UNPROCESSED_MAX_ATTEMPTS:
+                        raise RuntimeError('Keys of table {table} remained unprocessed after {attempts} BatchGetItem attempts'.format(table=self.tableName, attempts=attempt))
+                    time.sleep(random.uniform(0, UNPROCESSED_BASE_DELAY * (2 ** attempt)))
+        return items
+
+    def putChanged(self, items: list):
+        """
+        Writes the items that differ from the ones stored in the table with a batch writer and returns the keys of the written items
+        """
+        existing = self.batchGet([{attribute: item[attribute] for attribute in self.keyAttributes} for item in items])
+        changed = [item for item in items if existing.get(self.getKey(item)) != item]
+        if len(changed) > 0:
+            with self.table.batch_writer(overwrite_by_pkeys=self.keyAttributes) as writer:
+                for item in changed:
+                    writer.put_item(Item=item)
+        return [self.getKey(item) for item in changed]
+
+    def putConditional(self, item: dict, condition):
+        """
+        Writes the item only if the condition (evaluated against the stored item) holds, returns False if it didn't
+        """
+        try:
+            self.table.put_item(Item=item, ConditionExpression=condition)
+        except ClientError as error:
+            if error.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+        return True
+
+    def deleteKeys(self, keys: list):
+        """
+        Deletes the items of the given keys (dictionaries of the key attributes) with a batch writer
+        """
+        if len(keys) > 0:
+            with self.table.batch_writer(overwrite_by_pkeys=self.keyAttributes) as writer:
+                for key in keys:
+                    writer.delete_item(Key={attribute: key[attribute] for attribute in self.keyAttributes})
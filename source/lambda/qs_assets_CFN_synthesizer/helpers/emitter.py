@@ -0,0 +1,157 @@
+import json
+from helpers.serialization import dumpYaml
+
+
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+
+
+class FileSink:
+    """
+    Sink that writes the emitted chunks to a local file
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.file = open(filename, 'w')
+
+    def write(self, text: str):
+        self.file.write(text)
+
+    def close(self):
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+
+
+class S3MultipartSink:
+    """
+    Sink that uploads the emitted chunks to S3 in parts of partSize bytes as they are produced, so only one part is buffered at a time. Documents
+    smaller than a part are uploaded with a single put_object
+    """
+
+    def __init__(self, client, bucket: str, key: str, bucketOwner: str = None, metadata: dict = None, partSize: int = MULTIPART_PART_SIZE):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.partSize = partSize
+        self.extraArgs = {'ExpectedBucketOwner': bucketOwner} if bucketOwner is not None else {}
+        self.metadata = metadata if metadata is not None else {}
+        self.buffer = bytearray()
+        self.uploadId = None
+        self.parts = []
+
+    def _uploadPart(self, body: bytes):
+        if self.uploadId is None:
+            self.uploadId = self.client.create_multipart_upload(Bucket=self.bucket, Key=self.key, Metadata=self.metadata, **self.extraArgs)['UploadId']
+        partNumber = len(self.parts) + 1
+        ret = self.client.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self.uploadId, PartNumber=partNumber, Body=body, **self.extraArgs)
+        self.parts.append({'ETag': ret['ETag'], 'PartNumber': partNumber})
+
+    def write(self, text: str):
+        self.buffer.extend(text.encode('utf-8'))
+        while len(self.buffer) >= self.partSize:
+            self._uploadPart(bytes(self.buffer[:self.partSize]))
+            del self.buffer[:self.partSize]
+
+    def close(self):
+        if self.uploadId is None:
+            self.client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self.buffer), Metadata=self.metadata, **self.extraArgs)
+        else:
+            if len(self.buffer) > 0:
+                self._uploadPart(bytes(self.buffer))
+            self.client.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.uploadId, MultipartUpload={'Parts': self.parts}, **self.extraArgs)
+        self.buffer = bytearray()
+
+    def abort(self):
+        if self.uploadId is not None:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.uploadId, **self.extraArgs)
+        self.buffer = bytearray()
+
+
+def iterYamlChunks(content):
+    """
+    Yields the YAML serialization of content one top level entry at a time, splitting the mappings (Resources, Parameters, Outputs ...) by entry so
+    only one resource is serialized at a time. Joined, the chunks are byte for byte the output of dumpYaml(content) (sorted keys, block style) as
+    long as no object is shared between entries (which would be dumped as an anchor/alias pair)
+    """
+    if type(content) is not dict:
+        yield dumpYaml(content)
+        return
+
+    for key in sorted(content.keys()):
+        value = content[key]
+        if type(value) is not dict or len(value) == 0:
+            yield dumpYaml({key: value})
+            continue
+        header = None
+        for entryKey in sorted(value.keys()):
+            text = dumpYaml({key: {entryKey: value[entryKey]}})
+            entryHeader, entryText = text.split('\n', 1)
+            if header is None:
+                header = entryHeader
+                yield header + '\n'
+            yield entryText
+
+
+def streamYaml(content, sink):
+    """
+    Emits content as YAML to the sink one chunk at a time, the sink is closed when done or aborted on failure
+    """
+    try:
+        for chunk in iterYamlChunks(content):
+            sink.write(chunk)
+    except Exception:
+        sink.abort()
+        raise
+    sink.close()
+
+
+def streamJson(content, sink):
+    """
+    Emits content as JSON (same output as dumpJson) to the sink one chunk at a time, the sink is closed when done or aborted on failure
+    """
+    try:
+        for chunk in json.JSONEncoder(indent=2).iterencode(content):
+            sink.write(chunk)
+    except Exception:
+        sink.abort()
+        raise
+    sink.close()
+
+
+if __name__ == '__main__':
+    # Peak memory of serializing a synthetic template at once (previous behavior) vs streaming it, both outputs must be identical
+    import os
+    import tempfile
+    import tracemalloc
+
+    def buildTemplate(resourceCount: int):
+        template = {'AWSTemplateFormatVersion': '2010-09-09', 'Description': 'Synthetic template', 'Parameters': {}, 'Resources': {}}
+        for index in range(resourceCount):
+            template['Resources']['Analysis{index}'.format(index=index)] = {
+                'Type': 'AWS::QuickSight::Analysis',
+                'Properties': {'AnalysisId': 'analysis-{index}'.format(index=index), 'Definition': {'Sheets': [
+                    {'SheetId': 'sheet-{sheet}'.format(sheet=sheet), 'Visuals': [{'BarChartVisual': {'VisualId': 'visual-{visual}'.format(visual=visual), 'Title': {'Visibility': 'VISIBLE'}}}
+                                                                               for visual in range(20)]} for sheet in range(5)]}}
+            }
+        return template
+
+    template = buildTemplate(500)
+    directory = tempfile.mkdtemp()
+    fullFilename = os.path.join(directory, 'full.yaml')
+    streamedFilename = os.path.join(directory, 'streamed.yaml')
+
+    tracemalloc.start()
+    with open(fullFilename, 'w') as file:
+        dumpYaml(template, file)
+    fullPeak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    streamYaml(template, FileSink(streamedFilename))
+    streamedPeak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    with open(fullFilename) as full, open(streamedFilename) as streamed:
+        assert full.read() == streamed.read()
+    print('{size:.1f} MB document: peak serialization memory {full:.1f} MB -> {streamed:.1f} MB'
+          .format(size=os.path.getsize(fullFilename) / 1024 / 1024, full=fullPeak / 1024 / 1024, streamed=streamedPeak / 1024 / 1024))
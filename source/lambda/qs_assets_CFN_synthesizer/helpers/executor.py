@@ -0,0 +1,262 @@
+import random
+import threading
+import time
+from botocore.exceptions import ClientError, ConnectTimeoutError, ReadTimeoutError, EndpointConnectionError, ConnectionClosedError
+
+
+THROTTLING_ERROR_CODES = ['ThrottlingException', 'Throttling', 'TooManyRequestsException', 'RequestLimitExceeded', 'RequestThrottled',
+                          'ProvisionedThroughputExceededException', 'RequestThrottledException', 'SlowDown']
+TRANSIENT_ERROR_CODES = ['InternalFailure', 'InternalFailureException', 'InternalServerError', 'InternalServerException', 'ServiceUnavailable',
+                         'ServiceUnavailableException', 'RequestTimeout', 'RequestTimeoutException']
+# Connection errors raised before a response was received, retried like transient errors
+TRANSIENT_EXCEPTIONS = (ConnectTimeoutError, ReadTimeoutError, EndpointConnectionError, ConnectionClosedError)
+
+# Default client side rate limits (requests per second) of each operation ('quicksight.describe_data_set') or of the rest of the operations of a
+# service ('quicksight'). The QuickSight ones are kept below the default per API throttling quotas, list operations (paginated over the whole
+# account) and the Assets as Bundle export ones have lower quotas than the describe operations. Overriding a service drops its operation defaults
+DEFAULT_RATE_LIMITS = {
+    'quicksight': 10,
+    'quicksight.describe_dashboard': 10,
+    'quicksight.describe_analysis': 10,
+    'quicksight.describe_analysis_permissions': 10,
+    'quicksight.describe_data_set': 10,
+    'quicksight.describe_data_source': 10,
+    'quicksight.describe_refresh_schedule': 5,
+    'quicksight.list_refresh_schedules': 5,
+    'quicksight.list_dashboards': 2,
+    'quicksight.list_analyses': 2,
+    'quicksight.list_data_sets': 2,
+    'quicksight.list_data_sources': 2,
+    'quicksight.start_asset_bundle_export_job': 1,
+    'quicksight.describe_asset_bundle_export_job': 2,
+    's3': 100,
+    'dynamodb': 50
+}
+
+# Client methods that don't perform requests (or that manage their own requests) and are returned as they are. Managed transfers retry each part
+# themselves, retrying a whole transfer would resume reading its file object wherever the failed attempt left it
+PASSTHROUGH_METHODS = ['get_paginator', 'generate_presigned_url', 'can_paginate', 'get_waiter', 'batch_writer', 'upload_file', 'upload_fileobj',
+                       'download_file', 'download_fileobj', 'copy']
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter, acquire blocks the calling thread until a token is available. Tokens are reserved under the lock and waited
+    for outside of it so concurrent callers are served in arrival order without busy waiting
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updatedAt = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updatedAt) * self.rate)
+            self.updatedAt = now
+            self.tokens = self.tokens - 1
+            wait = 0 if self.tokens >= 0 else -self.tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+class AIMDLimiter:
+    """
+    Concurrency limiter with additive increase / multiplicative decrease: the number of calls allowed in flight grows by one after a full
+    window of successful calls and is halved each time a call is throttled
+    """
+
+    def __init__(self, initialLimit: int = 4, minLimit: int = 1, maxLimit: int = 16):
+        self.limit = float(initialLimit)
+        self.minLimit = minLimit
+        self.maxLimit = maxLimit
+        self.inFlight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.inFlight >= int(self.limit):
+                self._condition.wait()
+            self.inFlight = self.inFlight + 1
+
+    def release(self, throttled: bool):
+        with self._condition:
+            self.inFlight = self.inFlight - 1
+            if throttled:
+                self.limit = max(self.minLimit, self.limit / 2)
+            else:
+                self.limit = min(self.maxLimit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class AWSCallExecutor:
+    """
+    Central executor for AWS API calls. Each call goes through a token bucket of its operation (client side rate limit) and through the AIMD
+    concurrency limiter of its service, throttled and transient errors are retried with exponential backoff and full jitter. Per operation metrics
+    (calls, retries, throttles, errors and latency) are collected so they can be reported at the end of the invocation
+    """
+
+    def __init__(self, rateLimits: dict = None, maxRetries: int = 5, baseDelay: float = 0.2, maxDelay: float = 10.0, initialConcurrency: int = 4, maxConcurrency: int = 16):
+        overridden = rateLimits.keys() if rateLimits is not None else []
+        self.rateLimits = {key: rate for key, rate in DEFAULT_RATE_LIMITS.items() if key.split('.')[0] not in overridden}
+        if rateLimits is not None:
+            self.rateLimits.update(rateLimits)
+        self.maxRetries = maxRetries
+        self.baseDelay = baseDelay
+        self.maxDelay = maxDelay
+        self.initialConcurrency = initialConcurrency
+        self.maxConcurrency = maxConcurrency
+        self._buckets = {}
+        self._limiters = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _getBucket(self, service: str, operation: str):
+        key = '{service}.{operation}'.format(service=service, operation=operation)
+        with self._lock:
+            if key not in self._buckets:
+                rate = self.rateLimits.get(key, self.rateLimits.get(service, 10))
+                self._buckets[key] = TokenBucket(rate=rate)
+            return self._buckets[key]
+
+    def _getLimiter(self, service: str):
+        with self._lock:
+            if service not in self._limiters:
+                self._limiters[service] = AIMDLimiter(initialLimit=self.initialConcurrency, maxLimit=self.maxConcurrency)
+            return self._limiters[service]
+
+    def _record(self, service: str, operation: str, metric: str, value=1):
+        key = '{service}.{operation}'.format(service=service, operation=operation)
+        with self._lock:
+            metrics = self._metrics.setdefault(key, {'calls': 0, 'retries': 0, 'throttles': 0, 'errors': 0, 'latencySeconds': 0.0})
+            metrics[metric] = metrics[metric] + value
+
+    def getBackoffDelay(self, attempt: int):
+        return random.uniform(0, min(self.maxDelay, self.baseDelay * (2 ** attempt)))
+
+    def call(self, service: str, operation: str, method, *args, **kwargs):
+        bucket = self._getBucket(service, operation)
+        limiter = self._getLimiter(service)
+        attempt = 0
+
+        while True:
+            bucket.acquire()
+            limiter.acquire()
+            start = time.monotonic()
+            try:
+                result = method(*args, **kwargs)
+            except (ClientError,) + TRANSIENT_EXCEPTIONS as error:
+                code = error.response.get('Error', {}).get('Code', '') if isinstance(error, ClientError) else None
+                throttled = code in THROTTLING_ERROR_CODES
+                limiter.release(throttled=throttled)
+                self._record(service, operation, 'calls')
+                self._record(service, operation, 'latencySeconds', time.monotonic() - start)
+                if throttled:
+                    self._record(service, operation, 'throttles')
+                if (code is not None and not throttled and code not in TRANSIENT_ERROR_CODES) or attempt >= self.maxRetries:
+                    self._record(service, operation, 'errors')
+                    raise
+                self._record(service, operation, 'retries')
+                time.sleep(self.getBackoffDelay(attempt))
+                attempt = attempt + 1
+                continue
+            except Exception:
+                limiter.release(throttled=False)
+                self._record(service, operation, 'calls')
+                self._record(service, operation, 'errors')
+                raise
+
+            limiter.release(throttled=False)
+            self._record(service, operation, 'calls')
+            self._record(service, operation, 'latencySeconds', time.monotonic() - start)
+            return result
+
+    def wrap(self, client, service: str, managedFactory=None):
+        return ThrottledClient(client=client, service=service, executor=self, managedFactory=managedFactory)
+
+    def getMetrics(self):
+        with self._lock:
+            return {key: dict(value) for key, value in self._metrics.items()}
+
+    def resetMetrics(self):
+        with self._lock:
+            self._metrics = {}
+
+
+class ThrottledClient:
+    """
+    Proxy of a boto3 client (or DynamoDB Table resource) that routes every API method through an AWSCallExecutor, paginators are wrapped so each
+    page request is also rate limited. Non callable attributes (exceptions, meta ...) are delegated untouched. The executor retries the API methods
+    so the client is expected not to retry them, paginators and passthrough methods (which the executor doesn't retry) are taken from the client
+    returned by managedFactory (built on first use) that keeps the botocore retries
+    """
+
+    def __init__(self, client, service: str, executor: AWSCallExecutor, managedFactory=None):
+        self.client = client
+        self.service = service
+        self.executor = executor
+        self._managedFactory = managedFactory
+        self._managed = None
+
+    def _getManaged(self):
+        if self._managedFactory is None:
+            return self.client
+        if self._managed is None:
+            self._managed = self._managedFactory()
+        return self._managed
+
+    def __getattr__(self, name):
+        if name == 'get_paginator':
+            attr = self._getManaged().get_paginator
+            return lambda operation: ThrottledPaginator(paginator=attr(operation), service=self.service, operation=operation, executor=self.executor)
+        if name in PASSTHROUGH_METHODS:
+            return getattr(self._getManaged(), name)
+        attr = getattr(self.client, name)
+        if not callable(attr) or name.startswith('_'):
+            return attr
+
+        def throttledCall(*args, **kwargs):
+            return self.executor.call(self.service, name, attr, *args, **kwargs)
+
+        return throttledCall
+
+
+class ThrottledPaginator:
+    """
+    Paginator proxy, each page is fetched through the executor rate limiter and concurrency limiter. Page requests are retried by botocore
+    itself as a failed page iterator cannot be resumed transparently
+    """
+
+    def __init__(self, paginator, service: str, operation: str, executor: AWSCallExecutor):
+        self.paginator = paginator
+        self.service = service
+        self.operation = operation
+        self.executor = executor
+
+    def paginate(self, **kwargs):
+        pages = iter(self.paginator.paginate(**kwargs))
+        bucket = self.executor._getBucket(self.service, self.operation)
+        limiter = self.executor._getLimiter(self.service)
+        while True:
+            bucket.acquire()
+            limiter.acquire()
+            start = time.monotonic()
+            throttled = False
+            try:
+                page = next(pages)
+            except StopIteration:
+                return
+            except ClientError as error:
+                throttled = error.response.get('Error', {}).get('Code', '') in THROTTLING_ERROR_CODES
+                self.executor._record(self.service, self.operation, 'errors')
+                if throttled:
+                    self.executor._record(self.service, self.operation, 'throttles')
+                raise
+            finally:
+                limiter.release(throttled=throttled)
+            self.executor._record(self.service, self.operation, 'calls')
+            self.executor._record(self.service, self.operation, 'latencySeconds', time.monotonic() - start)
+            yield page
@@ -0,0 +1,126 @@
+import json
+import random
+import time
+from botocore.exceptions import ClientError
+
+
+EXPORT_TERMINAL_STATUSES = ['SUCCESSFUL', 'FAILED']
+
+
+class ExportJobPending(Exception):
+    """
+    Raised when an Assets as Bundle export job didn't reach a terminal status within the time the invocation could wait for it, the job has been
+    persisted so a later invocation resumes it
+    """
+
+    def __init__(self, job: dict):
+        super().__init__('Assets as Bundle export job {id} is still {status}'.format(id=job['JobId'], status=job.get('JobStatus')))
+        self.job = job
+
+
+class S3ExportJobStore:
+    """
+    Store of the Assets as Bundle export job in progress (its id, status and the inputs of the synthesis that started it), kept as a single JSON object
+    in the deployment bucket so the invocation can return while the job runs and a later invocation resumes it
+    """
+
+    def __init__(self, client, bucket: str, key: str, bucketOwner: str):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.bucketOwner = bucketOwner
+
+    def load(self):
+        try:
+            ret = self.client.get_object(Bucket=self.bucket, Key=self.key, ExpectedBucketOwner=self.bucketOwner)
+        except ClientError as error:
+            if error.response['Error']['Code'] in ['NoSuchKey', '404']:
+                return None
+            raise
+        return json.loads(ret['Body'].read())
+
+    def save(self, job: dict):
+        self.client.put_object(Bucket=self.bucket, Key=self.key, Body=json.dumps(job, default=str).encode('utf-8'), ExpectedBucketOwner=self.bucketOwner)
+
+    def loadPending(self):
+        """
+        Returns the persisted job if it still has to be resumed, None if there is none or it was already completed (jobs are marked as completed instead
+        of deleted, the deployment bucket role can't delete objects)
+        """
+        job = self.load()
+        return job if job is not None and not job.get('Completed', False) else None
+
+    def complete(self, job: dict):
+        self.save(dict(job, Completed=True))
+
+
+class JitteredBackoff:
+    """
+    Polling delays with decorrelated jitter: each delay is drawn between the initial delay and three times the previous one (capped to maxDelay), so
+    short jobs are noticed early and long ones are polled less and less often without every poller waking up at the same time
+    """
+
+    def __init__(self, initialDelay: float, maxDelay: float):
+        self.initialDelay = initialDelay
+        self.maxDelay = maxDelay
+        self.delay = initialDelay
+
+    def nextDelay(self):
+        self.delay = min(self.maxDelay, random.uniform(self.initialDelay, self.delay * 3))
+        return self.delay
+
+
+def pollExportJob(describe, backoff: JitteredBackoff, remainingSeconds):
+    """
+    Describes the export job until it reaches a terminal status waiting the backoff delays in between, no wait goes past remainingSeconds() (the time the
+    invocation can still spend polling). Returns the last description, whose JobStatus is not terminal if the time ran out
+    """
+    while True:
+        ret = describe()
+        if ret['JobStatus'] in EXPORT_TERMINAL_STATUSES:
+            return ret
+        remaining = remainingSeconds()
+        if remaining <= 0:
+            return ret
+        delay = min(backoff.nextDelay(), remaining)
+        print('Assets as Bundle export job is currently in a non terminal status ({status}) waiting for {seconds:.1f} seconds'.format(status=ret['JobStatus'], seconds=delay))
+        time.sleep(delay)
+
+
+def runExportJob(pendingJob: dict, resourceArns: list, remap: bool, start, wait, store=None):
+    """
+    Resumes pendingJob if it exported the same resources with the same remap setting and still exists, otherwise starts a new job with start() (which
+    returns the job) and persists it in the store right away. wait(job) returns the last description of the job. Returns the job and its description
+    once it reached a terminal status (the job is then marked as completed), raises ExportJobPending after persisting its status otherwise
+    """
+    job = None
+    ret = None
+    if pendingJob is not None and sorted(pendingJob['ResourceArns']) == sorted(resourceArns) and pendingJob['Remap'] == remap:
+        job = pendingJob
+        print('Resuming Assets as Bundle export job with id {id} started at {startedAt}'.format(id=job['JobId'], startedAt=job['StartedAt']))
+        try:
+            ret = wait(job)
+        except ClientError as error:
+            if error.response['Error']['Code'] != 'ResourceNotFoundException':
+                raise
+            print('Assets as Bundle export job with id {id} no longer exists, starting a new one'.format(id=job['JobId']))
+            job = None
+    elif pendingJob is not None:
+        print('Assets as Bundle export job with id {id} exported different assets, starting a new one'.format(id=pendingJob['JobId']))
+
+    if job is None:
+        job = start()
+        if store is not None:
+            store.save(job)
+        ret = wait(job)
+
+    job['JobStatus'] = ret['JobStatus']
+
+    if ret['JobStatus'] not in EXPORT_TERMINAL_STATUSES:
+        if store is not None:
+            store.save(job)
+        raise ExportJobPending(job)
+
+    if store is not None:
+        store.complete(job)
+    return job, ret
@@ -0,0 +1,54 @@
+import json
+import os
+import shutil
+import time
+from urllib.parse import urlparse
+from botocore.exceptions import ClientError
+
+
+STUB_URL_SCHEME = 'file'
+
+
+class LocalAssetBundleExportStub:
+    """
+    Local stand-in of the QuickSight Assets as Bundle export APIs (start_asset_bundle_export_job and describe_asset_bundle_export_job), used to run the
+    asynchronous export orchestration without a QuickSight account. Jobs are kept in a JSON file (so they survive across invocations) and become
+    SUCCESSFUL durationSeconds after they were started, their DownloadUrl points to the local bundle file. A job id listed in failJobIds FAILS instead
+    """
+
+    def __init__(self, bundleFile: str, durationSeconds: float, stateFile: str, failJobIds: list = None):
+        self.bundleFile = bundleFile
+        self.durationSeconds = durationSeconds
+        self.stateFile = stateFile
+        self.failJobIds = failJobIds or []
+
+    def _load(self):
+        if not os.path.exists(self.stateFile):
+            return {}
+        with open(self.stateFile, 'r') as file:
+            return json.load(file)
+
+    def _save(self, jobs: dict):
+        with open(self.stateFile, 'w') as file:
+            json.dump(jobs, file)
+
+    def start_asset_bundle_export_job(self, AwsAccountId: str, AssetBundleExportJobId: str, ResourceArns: list, **kwargs):
+        jobs = self._load()
+        jobs[AssetBundleExportJobId] = {'StartedAt': time.time(), 'ResourceArns': ResourceArns}
+        self._save(jobs)
+        return {'Status': 200, 'AssetBundleExportJobId': AssetBundleExportJobId}
+
+    def describe_asset_bundle_export_job(self, AwsAccountId: str, AssetBundleExportJobId: str):
+        job = self._load().get(AssetBundleExportJobId)
+        if job is None:
+            raise ClientError({'Error': {'Code': 'ResourceNotFoundException', 'Message': 'Export job {id} does not exist'.format(id=AssetBundleExportJobId)}},
+                              'DescribeAssetBundleExportJob')
+        if time.time() - job['StartedAt'] < self.durationSeconds:
+            return {'JobStatus': 'IN_PROGRESS', 'AssetBundleExportJobId': AssetBundleExportJobId}
+        if AssetBundleExportJobId in self.failJobIds:
+            return {'JobStatus': 'FAILED', 'AssetBundleExportJobId': AssetBundleExportJobId, 'Errors': [{'Message': 'Failed by the export stub'}]}
+        return {'JobStatus': 'SUCCESSFUL', 'AssetBundleExportJobId': AssetBundleExportJobId, 'DownloadUrl': '{scheme}://{path}'.format(scheme=STUB_URL_SCHEME, path=os.path.abspath(self.bundleFile))}
+
+    def download(self, url: str, filename: str):
+        shutil.copyfile(urlparse(url).path, filename)
+        return filename, None
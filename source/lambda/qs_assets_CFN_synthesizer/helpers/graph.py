@@ -0,0 +1,123 @@
+from helpers.analysis import QSAnalysisDef
+
+
+class QSAssetGraph:
+    """
+    Dependency graph of the QuickSight assets discovered for the tracked dashboards (analyses -> datasets -> datasources -> VPC connections).
+    Every asset is indexed by id (and ARN for datasources and VPC connections) and reverse edges are kept so dependency questions (e.g. which
+    analyses use a given datasource) are answered with dictionary lookups instead of walking the analysis list.
+
+    The same dataset/datasource can be referenced by several analyses, in that case the first object discovered is the one indexed. Insertion order
+    is preserved so iterating the graph is deterministic.
+    """
+
+    def __init__(self, analysisObjList: list = None):
+        self.analyses = {}
+        self.datasets = {}
+        self.datasources = {}
+        self.datasourceIdsToArn = {}
+        self.vpcConnections = {}
+        self.refreshSchedules = {}
+        self.analysisDatasets = {}
+        self.datasetDatasources = {}
+        self.datasetAnalyses = {}
+        self.datasourceDatasets = {}
+
+        if analysisObjList is not None:
+            for analysisObj in analysisObjList:
+                self.addAnalysis(analysisObj)
+
+    def addAnalysis(self, analysisObj: QSAnalysisDef):
+        self.analyses[analysisObj.id] = analysisObj
+        self.analysisDatasets.setdefault(analysisObj.id, {})
+
+        for datasetObj in analysisObj.datasets:
+            self.datasets.setdefault(datasetObj.id, datasetObj)
+            self.analysisDatasets[analysisObj.id][datasetObj.id] = True
+            self.datasetAnalyses.setdefault(datasetObj.id, {})[analysisObj.id] = True
+            self.datasetDatasources.setdefault(datasetObj.id, {})
+
+            for schedule in datasetObj.refreshSchedules:
+                self.refreshSchedules.setdefault(schedule['Arn'], schedule)
+
+            for datasourceObj in datasetObj.dependingDSources:
+                self.datasources.setdefault(datasourceObj.arn, datasourceObj)
+                self.datasourceIdsToArn.setdefault(datasourceObj.id, datasourceObj.arn)
+                self.datasetDatasources[datasetObj.id][datasourceObj.arn] = True
+                self.datasourceDatasets.setdefault(datasourceObj.arn, {})[datasetObj.id] = True
+                vpcConnectionArn = getattr(datasourceObj, 'vpcConnectionArn', '')
+                if vpcConnectionArn != '':
+                    self.vpcConnections.setdefault(vpcConnectionArn, {})[datasourceObj.arn] = True
+
+    def getAnalysis(self, analysisId: str):
+        return self.analyses.get(analysisId)
+
+    def getDataset(self, datasetId: str):
+        return self.datasets.get(datasetId)
+
+    def getDatasource(self, datasourceArnOrId: str):
+        if datasourceArnOrId in self.datasources:
+            return self.datasources[datasourceArnOrId]
+        return self.datasources.get(self.datasourceIdsToArn.get(datasourceArnOrId))
+
+    def getAnalyses(self):
+        return list(self.analyses.values())
+
+    def getDatasets(self):
+        return list(self.datasets.values())
+
+    def getDatasources(self):
+        return list(self.datasources.values())
+
+    def getVpcConnectionArns(self):
+        return list(self.vpcConnections.keys())
+
+    def getRefreshSchedules(self):
+        return list(self.refreshSchedules.values())
+
+    def getDatasetsOfAnalysis(self, analysisId: str):
+        return [self.datasets[datasetId] for datasetId in self.analysisDatasets.get(analysisId, {})]
+
+    def getDatasourcesOfDataset(self, datasetId: str):
+        return [self.datasources[datasourceArn] for datasourceArn in self.datasetDatasources.get(datasetId, {})]
+
+    def getAnalysesUsingDataset(self, datasetId: str):
+        return [self.analyses[analysisId] for analysisId in self.datasetAnalyses.get(datasetId, {})]
+
+    def getDatasetsUsingDatasource(self, datasourceArn: str):
+        return [self.datasets[datasetId] for datasetId in self.datasourceDatasets.get(datasourceArn, {})]
+
+    def getAnalysesUsingDatasource(self, datasourceArn: str):
+        analyses = {}
+        for datasetId in self.datasourceDatasets.get(datasourceArn, {}):
+            for analysisId in self.datasetAnalyses.get(datasetId, {}):
+                analyses[analysisId] = self.analyses[analysisId]
+        return list(analyses.values())
+
+    def getDatasourcesUsingVpcConnection(self, vpcConnectionArn: str):
+        return [self.datasources[datasourceArn] for datasourceArn in self.vpcConnections.get(vpcConnectionArn, {})]
+
+    def getAssetIdsOfAnalysis(self, analysisId: str):
+        """
+        Returns the QuickSight ids of every asset in the subgraph of an analysis (dashboard, analysis, template, datasets, RLS datasets, refresh schedules,
+        datasources and VPC connections)
+        """
+        analysisObj = self.analyses[analysisId]
+        assetIds = {analysisObj.id: True, analysisObj.TemplateId: True}
+        if getattr(analysisObj, 'AssociatedDashboardId', '') != '':
+            assetIds[analysisObj.AssociatedDashboardId] = True
+
+        for datasetObj in self.getDatasetsOfAnalysis(analysisId):
+            assetIds[datasetObj.id] = True
+            # once the dataset is synthesized the RLS dataset Arn is replaced by a Fn::GetAtt reference
+            if datasetObj.rlsDSetDef is not None and isinstance(datasetObj.rlsDSetDef['Arn'], str):
+                assetIds[datasetObj.rlsDSetDef['Arn'].split('dataset/')[-1]] = True
+            for schedule in datasetObj.refreshSchedules:
+                assetIds[schedule['ScheduleId']] = True
+            for datasourceObj in self.getDatasourcesOfDataset(datasetObj.id):
+                assetIds[datasourceObj.id] = True
+                vpcConnectionArn = getattr(datasourceObj, 'vpcConnectionArn', '')
+                if vpcConnectionArn != '':
+                    assetIds[vpcConnectionArn.split('/')[-1]] = True
+
+        return list(assetIds.keys())
@@ -0,0 +1,232 @@
+import re
+from botocore.exceptions import ClientError
+from helpers.serialization import loadYaml, dumpYaml
+
+
+# Properties that carry the QuickSight id of the asset modeled by a CFN resource
+QS_ID_PROPERTIES = ['AnalysisId', 'DashboardId', 'TemplateId', 'DataSetId', 'DataSourceId', 'VPCConnectionId', 'ThemeId']
+SUB_REFERENCE_PATTERN = re.compile(r'\$\{([^}!][^}]*)\}')
+
+
+def getReferencedNames(node, names: dict = None):
+    """
+    Returns the logical names (resources or parameters) referenced by a CFN template node through Ref, Fn::GetAtt and Fn::Sub
+    """
+    if names is None:
+        names = {}
+
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == 'Ref' and isinstance(value, str):
+                names[value] = True
+            elif key == 'Fn::GetAtt' and isinstance(value, list) and len(value) > 0 and isinstance(value[0], str):
+                names[value[0]] = True
+            elif key == 'Fn::GetAtt' and isinstance(value, str):
+                names[value.split('.')[0]] = True
+            elif key == 'Fn::Sub':
+                subTemplate = value[0] if isinstance(value, list) and len(value) > 0 else value
+                if isinstance(subTemplate, str):
+                    for match in SUB_REFERENCE_PATTERN.findall(subTemplate):
+                        names[match.split('.')[0]] = True
+                if isinstance(value, list) and len(value) > 1:
+                    getReferencedNames(value[1], names)
+            else:
+                getReferencedNames(value, names)
+    elif isinstance(node, list):
+        for item in node:
+            getReferencedNames(item, names)
+
+    return names
+
+
+def getResourceReferences(resource: dict):
+    names = getReferencedNames(resource)
+    dependsOn = resource.get('DependsOn', []) if isinstance(resource, dict) else []
+    if isinstance(dependsOn, str):
+        dependsOn = [dependsOn]
+    for name in dependsOn:
+        names[name] = True
+    return names
+
+
+def getResourceOwnership(template: dict, assetIdsByDashboard: dict):
+    """
+    Computes which resources of a synthesized template belong to each dashboard. A resource belongs to a dashboard when it models one of the
+    QuickSight assets of the dashboard subgraph or when it is (transitively) referenced by a resource that does
+
+    Parameters:
+
+    template(dict): Synthesized CFN template
+    assetIdsByDashboard(dict): QuickSight asset ids of each dashboard subgraph {dashboardId: [assetId]}
+
+    Returns:
+
+    ownership(dict): Logical ids of the resources owned by each dashboard, in template order {dashboardId: [logicalId]}
+    """
+    resources = template.get('Resources', {})
+    ownership = {}
+
+    for dashboardId, assetIds in assetIdsByDashboard.items():
+        assetIds = set(assetIds)
+        pending = []
+        for logicalId, resource in resources.items():
+            properties = resource.get('Properties', {}) if isinstance(resource, dict) else {}
+            if any(isinstance(properties.get(prop), str) and properties[prop] in assetIds for prop in QS_ID_PROPERTIES):
+                pending.append(logicalId)
+
+        owned = {}
+        while len(pending) > 0:
+            logicalId = pending.pop()
+            if logicalId in owned:
+                continue
+            owned[logicalId] = True
+            for name in getResourceReferences(resources[logicalId]):
+                if name in resources and name not in owned:
+                    pending.append(name)
+
+        ownership[dashboardId] = [logicalId for logicalId in resources if logicalId in owned]
+
+    return ownership
+
+
+def getOutputOwnership(template: dict, assetIdsByDashboard: dict, ownership: dict):
+    """
+    Computes which outputs of a synthesized template belong to each dashboard. An output belongs to a dashboard when it references one of the
+    resources the dashboard owns or when its value is (or ends a path with) the id of one of the QuickSight assets of the dashboard subgraph
+
+    Parameters:
+
+    template(dict): Synthesized CFN template
+    assetIdsByDashboard(dict): QuickSight asset ids of each dashboard subgraph {dashboardId: [assetId]}
+    ownership(dict): Resource ownership of the template as returned by getResourceOwnership
+
+    Returns:
+
+    outputOwnership(dict): Outputs owned by each dashboard {dashboardId: {outputName: output}}
+    """
+    outputs = template.get('Outputs', {})
+    outputOwnership = {}
+
+    for dashboardId, assetIds in assetIdsByDashboard.items():
+        owned = set(ownership.get(dashboardId, []))
+        idPattern = re.compile(r'(^|[/:])({ids})$'.format(ids='|'.join(re.escape(assetId) for assetId in sorted(assetIds, key=len, reverse=True)))) if len(assetIds) > 0 else None
+        outputOwnership[dashboardId] = {}
+        for name, output in outputs.items():
+            value = output.get('Value') if isinstance(output, dict) else None
+            referencesOwned = len(owned.intersection(getReferencedNames(value))) > 0
+            if referencesOwned or (isinstance(value, str) and idPattern is not None and idPattern.search(value) is not None):
+                outputOwnership[dashboardId][name] = output
+
+    return outputOwnership
+
+
+def mergeTemplates(previous: dict, partial: dict, ownership: dict, dashboardId: str, outputOwnership: dict, dashboardOrder: list):
+    """
+    Merges the template synthesized for a single dashboard into the template previously synthesized for all the tracked dashboards. Resources
+    that belonged only to the dashboard and are not in the new synthesis are removed (and so are the parameters only they referenced), resources of
+    the new synthesis replace the previous ones in place or are appended. Outputs are rebuilt the way a full synthesis writes them: the outputs of every
+    dashboard in processing order (later dashboards overriding the outputs with the same name), the ones of the updated dashboard taken from the new synthesis
+
+    Parameters:
+
+    previous(dict): Template previously synthesized for all the tracked dashboards, it is updated in place
+    partial(dict): Template synthesized for the updated dashboard
+    ownership(dict): Resource ownership of the previous template as returned by getResourceOwnership
+    dashboardId(str): Id of the updated dashboard
+    outputOwnership(dict): Outputs of the previous template owned by each dashboard as returned by getOutputOwnership
+    dashboardOrder(list): Ids of the tracked dashboards in the order a full synthesis processes them
+
+    Returns:
+
+    previous(dict): Merged template
+    """
+    resources = previous.setdefault('Resources', {})
+    partialResources = partial.get('Resources', {})
+
+    ownedByOthers = {}
+    for ownerId, logicalIds in ownership.items():
+        if ownerId != dashboardId:
+            for logicalId in logicalIds:
+                ownedByOthers[logicalId] = True
+
+    removedReferences = {}
+    for logicalId in ownership.get(dashboardId, []):
+        if logicalId in resources and logicalId not in ownedByOthers and logicalId not in partialResources:
+            removedReferences.update(getResourceReferences(resources[logicalId]))
+            del resources[logicalId]
+
+    for logicalId, resource in partialResources.items():
+        resources[logicalId] = resource
+
+    ownedOutputs = {name: True for outputs in outputOwnership.values() for name in outputs}
+    mergedOutputs = {name: output for name, output in previous.get('Outputs', {}).items() if name not in ownedOutputs}
+    for ownerId in dashboardOrder:
+        mergedOutputs.update(partial.get('Outputs', {}) if ownerId == dashboardId else outputOwnership.get(ownerId, {}))
+    if len(mergedOutputs) > 0:
+        previous['Outputs'] = mergedOutputs
+    else:
+        previous.pop('Outputs', None)
+
+    for section, content in partial.items():
+        if section not in ['Resources', 'Outputs'] and isinstance(content, dict):
+            previous.setdefault(section, {}).update(content)
+
+    parameters = previous.get('Parameters', {})
+    if len(removedReferences) > 0 and len(parameters) > 0:
+        stillReferenced = getReferencedNames(resources)
+        getReferencedNames(previous.get('Outputs', {}), stillReferenced)
+        for name in removedReferences:
+            if name in parameters and name not in stillReferenced and name not in partial.get('Parameters', {}):
+                del parameters[name]
+
+    return previous
+
+
+class S3SynthesisStateStore:
+    """
+    Store of the last synthesized SOURCE/DEST templates and of the manifest describing which resources belong to each dashboard, kept in the
+    deployment bucket so EventBridge invocations can re-synthesize a single dashboard and merge it into the previous result. Everything is kept in a
+    single YAML object (templates can contain dates that JSON would not round trip) so the state is always replaced atomically. A marker object holds
+    the ETag of the state whose artifacts were uploaded, loaded states are flagged as Published when they match it
+    """
+
+    def __init__(self, client, bucket: str, key: str, bucketOwner: str):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.publishedKey = '{key}.published'.format(key=key)
+        self.bucketOwner = bucketOwner
+        self.etag = None
+
+    def _getObject(self, key: str):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key, ExpectedBucketOwner=self.bucketOwner)
+        except ClientError as error:
+            if error.response['Error']['Code'] in ['NoSuchKey', '404']:
+                return None
+            raise
+
+    def load(self):
+        ret = self._getObject(self.key)
+        if ret is None:
+            return None
+        state = loadYaml(ret['Body'].read())
+        published = self._getObject(self.publishedKey)
+        state['Published'] = published is not None and published['Body'].read().decode('utf-8') == ret['ETag']
+        return state
+
+    def save(self, manifest: dict, sourceTemplate: dict, destTemplate: dict):
+        state = {
+            'Manifest': manifest,
+            'Source': sourceTemplate,
+            'Dest': destTemplate
+        }
+        ret = self.client.put_object(Bucket=self.bucket, Key=self.key, Body=dumpYaml(state).encode('utf-8'), ExpectedBucketOwner=self.bucketOwner)
+        self.etag = ret['ETag']
+
+    def markPublished(self):
+        """
+        Records that the artifacts built from the last saved state were uploaded
+        """
+        if self.etag is not None:
+            self.client.put_object(Bucket=self.bucket, Key=self.publishedKey, Body=self.etag.encode('utf-8'), ExpectedBucketOwner=self.bucketOwner)
@@ -0,0 +1,63 @@
+import json
+import os
+from datetime import datetime
+from botocore.exceptions import ClientError
+
+
+# Datetimes of the describe responses (LastUpdatedTime, CreatedTime ...) are persisted tagged so cached responses keep the types of the live ones
+DATETIME_TAG = '__datetime__'
+
+
+def encodeValue(value):
+    if isinstance(value, datetime):
+        return {DATETIME_TAG: value.isoformat()}
+    return str(value)
+
+
+def decodeObject(obj: dict):
+    if len(obj) == 1 and DATETIME_TAG in obj:
+        return datetime.fromisoformat(obj[DATETIME_TAG])
+    return obj
+
+
+class LocalFileMetadataStore:
+    """
+    Metadata cache store backed by a local JSON file, useful for tests and local executions of the synthesizer
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r') as file:
+            return json.load(file, object_hook=decodeObject)
+
+    def save(self, entries: dict):
+        with open(self.path, 'w') as file:
+            json.dump(entries, file, default=encodeValue)
+
+
+class S3MetadataStore:
+    """
+    Metadata cache store backed by a single JSON object in S3 (the deployment bucket), it is read at the beginning of each invocation and rewritten at the end
+    """
+
+    def __init__(self, client, bucket: str, key: str, bucketOwner: str):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.bucketOwner = bucketOwner
+
+    def load(self):
+        try:
+            ret = self.client.get_object(Bucket=self.bucket, Key=self.key, ExpectedBucketOwner=self.bucketOwner)
+        except ClientError as error:
+            if error.response['Error']['Code'] in ['NoSuchKey', '404']:
+                return {}
+            raise
+        return json.loads(ret['Body'].read(), object_hook=decodeObject)
+
+    def save(self, entries: dict):
+        self.client.put_object(Bucket=self.bucket, Key=self.key, Body=json.dumps(entries, default=encodeValue).encode('utf-8'), ExpectedBucketOwner=self.bucketOwner)
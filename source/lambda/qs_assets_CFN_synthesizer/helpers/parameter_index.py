@@ -0,0 +1,44 @@
+import re
+
+
+# Parameter descriptions reference the asset they belong to as <type>:<id>, e.g. '(datasource:my-datasource-id, type ATHENA)'
+PARAMETER_OWNER_PATTERN = re.compile(r'(datasource|vpcConnection|refresh-schedule):([\w\-]+)')
+
+
+class ParameterIndex:
+    """
+    Index of the CFN template parameters that belong to a QuickSight asset (datasource, VPC connection or refresh schedule), so the parameters
+    of an asset are found with a dictionary lookup instead of scanning every parameter. A parameter can belong to more than one asset
+    """
+
+    def __init__(self):
+        self._parametersByOwner = {}
+        self._ownersByParameter = {}
+
+    def addOwner(self, parameterName: str, ownerType: str, ownerId: str):
+        owners = self._ownersByParameter.setdefault(parameterName, [])
+        if (ownerType, ownerId) in owners:
+            return
+        owners.append((ownerType, ownerId))
+        self._parametersByOwner.setdefault((ownerType, ownerId), []).append(parameterName)
+
+    def hasParameter(self, parameterName: str):
+        return parameterName in self._ownersByParameter
+
+    def getOwners(self, parameterName: str):
+        return list(self._ownersByParameter.get(parameterName, []))
+
+    def getParameters(self, ownerType: str, ownerId: str):
+        return list(self._parametersByOwner.get((ownerType, ownerId), []))
+
+    def indexDescriptions(self, parameters: dict):
+        """
+        Indexes the owners referenced in the description of the parameters that are not indexed yet (parameters of the AAB export or of a previous
+        synthesis), each description is matched once
+        """
+        for parameterName, parameter in parameters.items():
+            if self.hasParameter(parameterName):
+                continue
+            for match in PARAMETER_OWNER_PATTERN.finditer(str(parameter.get('Description', ''))):
+                self.addOwner(parameterName, match.group(1), match.group(2))
+        return self
@@ -0,0 +1,95 @@
+import json
+import yaml
+
+try:
+    from yaml import CSafeLoader as FastSafeLoader, CSafeDumper as FastSafeDumper
+    LIBYAML_AVAILABLE = True
+except ImportError:
+    from yaml import SafeLoader as FastSafeLoader, SafeDumper as FastSafeDumper
+    LIBYAML_AVAILABLE = False
+
+
+def loadYaml(stream):
+    """
+    Equivalent of yaml.safe_load backed by libyaml when it is available
+    """
+    return yaml.load(stream, Loader=FastSafeLoader)
+
+
+def dumpYaml(content, stream=None):
+    """
+    Equivalent of yaml.dump (block style, sorted keys) backed by libyaml when it is available. The output is byte for byte the one of yaml.dump for
+    templates made of plain YAML types, content with python specific types is dumped with the default (pure python) Dumper as before
+    """
+    try:
+        text = yaml.dump(content, Dumper=FastSafeDumper)
+    except yaml.representer.RepresenterError:
+        text = yaml.dump(content)
+
+    if stream is None:
+        return text
+    stream.write(text)
+
+
+def sortKeys(node):
+    """
+    Returns a copy of a tree of plain nodes with the keys of every mapping sorted, which is the order a yaml.dump/yaml.safe_load round trip returns
+    """
+    if type(node) is dict:
+        return {key: sortKeys(node[key]) for key in sorted(node.keys())}
+    if type(node) is list:
+        return [sortKeys(item) for item in node]
+    return node
+
+
+def loadJson(stream):
+    return json.load(stream)
+
+
+def dumpJson(content, stream):
+    json.dump(content, stream, indent=2)
+
+
+if __name__ == '__main__':
+    # Micro benchmark of the pure python yaml.dump/yaml.safe_load vs the libyaml backed dumpYaml/loadYaml over synthetic templates
+    import datetime
+    import timeit
+
+    def buildTemplate(resourceCount: int):
+        template = {'AWSTemplateFormatVersion': datetime.date(2010, 9, 9), 'Description': 'Synthetic template', 'Parameters': {}, 'Resources': {}}
+        for index in range(resourceCount):
+            template['Parameters']['DS{index}SecretArn'.format(index=index)] = {
+                'Description': 'Secret Arn to use for datasource {index} in the stage, to be parametrized via CFN deploy action in codepipeline see https://a.co/2aOOOTA for more information'.format(index=index),
+                'Type': 'String'
+            }
+            template['Resources']['DSet{index}'.format(index=index)] = {
+                'Type': 'AWS::QuickSight::DataSet',
+                'DependsOn': ['DS{index}'.format(index=index)],
+                'Properties': {
+                    'AwsAccountId': {'Ref': 'AWS::AccountId'},
+                    'DataSetId': 'dset-{index}'.format(index=index),
+                    'ImportMode': 'SPICE',
+                    'Name': 'Dataset {index}'.format(index=index),
+                    'Permissions': [{'Actions': ['quicksight:DescribeDataSet', 'quicksight:UpdateDataSet', 'quicksight:DeleteDataSet'],
+                                     'Principal': {'Fn::Sub': 'arn:aws:quicksight:${DstQSAdminRegion}:${AWS::AccountId}:user/default/${QSUser}'}}],
+                    'PhysicalTableMap': {'p{index}'.format(index=index): {'RelationalTable': {
+                        'DataSourceArn': {'Fn::GetAtt': ['DS{index}'.format(index=index), 'Arn']},
+                        'InputColumns': [{'Name': 'column_{column}'.format(column=column), 'Type': 'STRING'} for column in range(10)],
+                        'Name': 'table', 'Schema': 'public'}}}
+                }
+            }
+        return template
+
+    print('libyaml available: {available}'.format(available=LIBYAML_AVAILABLE))
+    for resourceCount in [1000, 5000]:
+        template = buildTemplate(resourceCount)
+        text = yaml.dump(template)
+        assert dumpYaml(template) == text
+        assert loadYaml(text) == yaml.safe_load(text)
+
+        dumpTime = timeit.timeit(lambda: yaml.dump(template), number=1)
+        fastDumpTime = timeit.timeit(lambda: dumpYaml(template), number=1)
+        loadTime = timeit.timeit(lambda: yaml.safe_load(text), number=1)
+        fastLoadTime = timeit.timeit(lambda: loadYaml(text), number=1)
+        print('{count} resources ({size:.1f} MB): dump {dump:.2f}s -> {fastDump:.2f}s, load {load:.2f}s -> {fastLoad:.2f}s'
+              .format(count=resourceCount, size=len(text) / 1024 / 1024, dump=dumpTime, fastDump=fastDumpTime, load=loadTime, fastLoad=fastLoadTime))
@@ -0,0 +1,61 @@
+import os
+import timeit
+import yaml
+from helpers.serialization import loadYaml
+
+
+SKELETONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'resources')
+
+
+def copyTree(node):
+    """
+    Copies a tree of plain YAML nodes (dicts, lists and scalars). Much cheaper than copy.deepcopy as there is no memo bookkeeping, scalars (including
+    dates) are immutable so they are shared
+    """
+    if type(node) is dict:
+        return {key: copyTree(value) for key, value in node.items()}
+    if type(node) is list:
+        return [copyTree(item) for item in node]
+    return node
+
+
+class SkeletonRegistry:
+    """
+    Registry of the CFN skeletons stored in the resources directory. Every skeleton is parsed once (when the registry is created, i.e. once per Lambda
+    container) and each get returns an independent copy that callers can freely modify
+    """
+
+    def __init__(self, directory: str = SKELETONS_DIR):
+        self.directory = directory
+        self._skeletons = {}
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith('.yaml'):
+                with open(os.path.join(directory, filename), 'r') as file:
+                    self._skeletons[filename] = loadYaml(file)
+
+    def get(self, name: str):
+        if name not in self._skeletons:
+            raise ValueError('Skeleton {name} not found in {directory}'.format(name=name, directory=self.directory))
+        return copyTree(self._skeletons[name])
+
+    def getNames(self):
+        return list(self._skeletons.keys())
+
+
+if __name__ == '__main__':
+    # Benchmark of the per resource cost of loading each skeleton from disk (previous behavior) vs copying it from the registry
+    ITERATIONS = 2000
+    registry = SkeletonRegistry()
+
+    print('{name:45} {load:>14} {copy:>14} {speedup:>8}'.format(name='skeleton', load='safe_load (us)', copy='registry (us)', speedup='speedup'))
+    for name in registry.getNames():
+        path = os.path.join(SKELETONS_DIR, name)
+
+        def loadFromDisk():
+            with open(path, 'r') as file:
+                return yaml.safe_load(file)
+
+        assert loadFromDisk() == registry.get(name)
+        loadTime = timeit.timeit(loadFromDisk, number=ITERATIONS) / ITERATIONS * 1e6
+        copyTime = timeit.timeit(lambda: registry.get(name), number=ITERATIONS) / ITERATIONS * 1e6
+        print('{name:45} {load:14.1f} {copy:14.1f} {speedup:7.0f}x'.format(name=name, load=loadTime, copy=copyTime, speedup=loadTime / copyTime))
@@ -0,0 +1,157 @@
+import re
+from helpers.serialization import dumpYaml
+
+
+# CloudFormation quotas of a template (uploaded to S3), the default budgets of a nested stack group leave room for the template header
+CFN_MAX_TEMPLATE_BYTES = 1024 * 1024
+CFN_MAX_RESOURCES = 500
+CFN_MAX_PARAMETERS = 200
+# QuickSight ARNs built with Fn::Sub reference the asset by id, e.g. arn:aws:quicksight:${AWS::Region}:${AWS::AccountId}:dataset/my-dataset-id
+ASSET_ARN_PATTERN = re.compile(r':(datasource|dataset|theme|vpcConnection|analysis)/([\w\-]+)')
+ASSET_ARN_ID_PROPERTIES = {
+    'datasource': 'DataSourceId',
+    'dataset': 'DataSetId',
+    'theme': 'ThemeId',
+    'vpcConnection': 'VPCConnectionId',
+    'analysis': 'AnalysisId'
+}
+
+
+def measureYamlEntry(section: str, key: str, value):
+    """
+    Returns the number of bytes key: value adds to the given section of a template serialized with dumpYaml
+    """
+    return len(dumpYaml({section: {key: value}}).encode('utf-8')) - len('{section}:\n'.format(section=section))
+
+
+class ResourceGroup:
+    """
+    Resources and parameters of a nested stack group along with their serialized size
+    """
+
+    def __init__(self):
+        self.resources = {}
+        self.parameters = {}
+        self.size = 0
+
+    def _newParameters(self, parameters: dict):
+        return {key: value for key, value in parameters.items() if key not in self.parameters}
+
+    def fits(self, unit: 'PackingUnit', maxBytes: int, maxResources: int, maxParameters: int):
+        newParameters = self._newParameters(unit.parameters)
+        return (self.size + unit.resourcesSize + sum(unit.parameterSizes[key] for key in newParameters) <= maxBytes
+                and len(self.resources) + len(unit.resources) <= maxResources
+                and len(self.parameters) + len(newParameters) <= maxParameters)
+
+    def add(self, unit: 'PackingUnit'):
+        newParameters = self._newParameters(unit.parameters)
+        self.resources.update(unit.resources)
+        self.parameters.update(newParameters)
+        self.size += unit.resourcesSize + sum(unit.parameterSizes[key] for key in newParameters)
+
+
+class PackingUnit:
+    """
+    Resources that must be deployed in the same nested stack (e.g. a dataset and its refresh schedules) and the parameters they use
+    """
+
+    def __init__(self, resources: dict, parameters: dict):
+        self.resources = resources
+        self.parameters = parameters
+        self.resourcesSize = sum(measureYamlEntry('Resources', key, value) for key, value in resources.items())
+        self.parameterSizes = {key: measureYamlEntry('Parameters', key, value) for key, value in parameters.items()}
+
+
+def packResourceGroups(units: list, maxBytes: int, maxResources: int, maxParameters: int):
+    """
+    Packs the units (in order) into as few groups as possible with a first fit strategy, so no group exceeds the byte (serialized resources and
+    parameters), resource count and parameter count budgets. A unit that exceeds a budget on its own is placed alone in a group
+    """
+    groups = []
+    for unit in units:
+        target = next((group for group in groups if group.fits(unit, maxBytes, maxResources, maxParameters)), None)
+        if target is None:
+            target = ResourceGroup()
+            groups.append(target)
+            if not target.fits(unit, maxBytes, maxResources, maxParameters):
+                print('WARNING: resources {resources} exceed the nested stack budgets ({max_bytes} bytes, {max_resources} resources, {max_parameters} parameters)'
+                      .format(resources=list(unit.resources.keys()), max_bytes=maxBytes, max_resources=maxResources, max_parameters=maxParameters))
+        target.add(unit)
+    return groups
+
+
+def findReferences(node, references: set = None):
+    """
+    Returns the (kind, id) of everything a resource references, kind being 'logical' for Ref, Fn::GetAtt and DependsOn targets (pseudo parameters
+    excluded) or the id property of the asset (DataSetId, DataSourceId ...) for QuickSight ARNs
+    """
+    references = references if references is not None else set()
+    if type(node) is dict:
+        for key, value in node.items():
+            if key == 'Ref' and type(value) is str and not value.startswith('AWS::'):
+                references.add(('logical', value))
+            elif key == 'Fn::GetAtt':
+                references.add(('logical', value[0] if type(value) is list else str(value).split('.')[0]))
+            elif key == 'DependsOn':
+                for logicalId in value if type(value) is list else [value]:
+                    references.add(('logical', logicalId))
+            else:
+                findReferences(value, references)
+    elif type(node) is list:
+        for item in node:
+            findReferences(item, references)
+    elif type(node) is str:
+        for match in ASSET_ARN_PATTERN.finditer(node):
+            references.add((ASSET_ARN_ID_PROPERTIES[match.group(1)], match.group(2)))
+    return references
+
+
+def findConnectedGroups(nodes: list, links: dict):
+    """
+    Returns the groups of nodes connected by links (dictionary of node to the nodes it is linked to, in either direction), each group keeps the order
+    of nodes and groups are ordered by their first node. Links to nodes that are not in the list are ignored
+    """
+    parents = {node: node for node in nodes}
+
+    def root(node):
+        while parents[node] != node:
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
+
+    for node in nodes:
+        for linked in links.get(node, []):
+            if linked in parents:
+                parents[root(linked)] = root(node)
+    groups = {}
+    for node in nodes:
+        groups.setdefault(root(node), []).append(node)
+    return list(groups.values())
+
+
+def findDependencyCycle(dependencies: dict):
+    """
+    Returns a dependency cycle (list of nodes, first and last being the same) of a dictionary of node to the nodes it depends on, None if it has none
+    """
+    visited = set()
+    for start in sorted(dependencies.keys()):
+        if start in visited:
+            continue
+        path = [start]
+        onPath = {start}
+        stack = [iter(sorted(dependencies.get(start, [])))]
+        visited.add(start)
+        while stack:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()
+                onPath.discard(path.pop())
+                continue
+            if node in onPath:
+                return path[path.index(node):] + [node]
+            if node not in visited:
+                visited.add(node)
+                path.append(node)
+                onPath.add(node)
+                stack.append(iter(sorted(dependencies.get(node, []))))
+    return None
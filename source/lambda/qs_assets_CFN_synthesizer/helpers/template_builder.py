@@ -0,0 +1,111 @@
+from contextlib import contextmanager
+from helpers.parameter_index import ParameterIndex
+
+
+_MISSING = object()
+
+
+class TemplateBuilder:
+    """
+    Append only builder of a CFN template (resources, parameters, outputs and DependsOn). Existence checks are dictionary lookups and every change made
+    inside a transaction is journaled (container, key and previous value) so a partially added resource can be rolled back without copying the template.
+    The owner of the parameters added for an asset is recorded in parameterIndex
+    """
+
+    def __init__(self, template: dict = None, parameterIndex: ParameterIndex = None):
+        self.template = template if template is not None else {}
+        self.template.setdefault('Resources', {})
+        self.parameterIndex = parameterIndex if parameterIndex is not None else ParameterIndex()
+        self._journal = None
+        self._pendingOwners = []
+
+    def _set(self, container: dict, key: str, value):
+        if self._journal is not None:
+            self._journal.append((container, key, container[key] if key in container else _MISSING))
+        container[key] = value
+
+    def _getSection(self, section: str):
+        if section not in self.template:
+            self._set(self.template, section, {})
+        return self.template[section]
+
+    def hasResource(self, logicalId: str):
+        return logicalId in self.template['Resources']
+
+    def getResource(self, logicalId: str):
+        return self.template['Resources'].get(logicalId)
+
+    def addResource(self, logicalId: str, resource: dict):
+        self._set(self.template['Resources'], logicalId, resource)
+        return resource
+
+    def hasParameter(self, name: str):
+        return name in self.template.get('Parameters', {})
+
+    def addParameter(self, name: str, definition: dict, ownerType: str = None, ownerId: str = None):
+        self._set(self._getSection('Parameters'), name, definition)
+        if ownerType is not None:
+            if self._journal is not None:
+                # Ownership is only indexed once the transaction is committed
+                self._pendingOwners.append((name, ownerType, ownerId))
+            else:
+                self.parameterIndex.addOwner(name, ownerType, ownerId)
+
+    def addParameters(self, parameters: dict, ownerType: str = None, ownerId: str = None):
+        for name, definition in parameters.items():
+            self.addParameter(name, definition, ownerType=ownerType, ownerId=ownerId)
+
+    def addOutput(self, name: str, output: dict):
+        self._set(self._getSection('Outputs'), name, output)
+
+    def setOutputs(self, outputs: dict):
+        self._set(self.template, 'Outputs', outputs)
+
+    def addDependsOn(self, logicalId: str, dependencies):
+        """
+        Sets the DependsOn of a resource (a single logical id or a list of them) or, if it already has one, extends it with the given dependencies
+        """
+        resource = self.template['Resources'][logicalId]
+        if 'DependsOn' not in resource:
+            self._set(resource, 'DependsOn', dependencies)
+            return
+        dependsOn = resource['DependsOn']
+        dependsOn = [dependsOn] if isinstance(dependsOn, str) else list(dependsOn)
+        dependsOn.extend([dependencies] if isinstance(dependencies, str) else dependencies)
+        self._set(resource, 'DependsOn', dependsOn)
+
+    def begin(self):
+        self._journal = []
+        self._pendingOwners = []
+
+    def commit(self):
+        self._journal = None
+        for name, ownerType, ownerId in self._pendingOwners:
+            self.parameterIndex.addOwner(name, ownerType, ownerId)
+        self._pendingOwners = []
+
+    def rollback(self):
+        journal = self._journal if self._journal is not None else []
+        self._journal = None
+        self._pendingOwners = []
+        for container, key, previous in reversed(journal):
+            if previous is _MISSING:
+                del container[key]
+            else:
+                container[key] = previous
+
+    @contextmanager
+    def transaction(self):
+        """
+        Changes made inside the block are rolled back if it raises
+        """
+        self.begin()
+        try:
+            yield self
+        except Exception:
+            self.rollback()
+            raise
+        self.commit()
+
+    def build(self):
+        return self.template
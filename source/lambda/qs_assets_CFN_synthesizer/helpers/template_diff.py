@@ -0,0 +1,103 @@
+from helpers.skeletons import copyTree
+
+
+# Fields stamped with the synthesis time, they change on every run so they are ignored when deciding if a resource changed. The template
+# VersionDescription and the analysis Updated tag are not volatile, they are derived from the source analysis LastUpdatedTime and a new value
+# means the analysis was edited
+VOLATILE_PROPERTIES = {
+    'AWS::QuickSight::RefreshSchedule': [['Properties', 'Schedule', 'StartAfterDateTime']]
+}
+VOLATILE_TAGS = {}
+
+
+def _getPath(node, path: list):
+    for key in path:
+        if type(node) is not dict or key not in node:
+            return None
+        node = node[key]
+    return node
+
+
+def getVolatileValues(resource: dict):
+    """
+    Returns the volatile values of a resource keyed by their location (a property path or a tag key)
+    """
+    values = {}
+    resourceType = resource.get('Type')
+    for path in VOLATILE_PROPERTIES.get(resourceType, []):
+        value = _getPath(resource, path)
+        if value is not None:
+            values[tuple(path)] = value
+    for tag in _getPath(resource, ['Properties', 'Tags']) or []:
+        if tag.get('Key') in VOLATILE_TAGS.get(resourceType, []):
+            values[('Tags', tag['Key'])] = tag.get('Value')
+    return values
+
+
+def setVolatileValues(resource: dict, values: dict):
+    for location, value in values.items():
+        if location[0] == 'Tags':
+            for tag in _getPath(resource, ['Properties', 'Tags']) or []:
+                if tag.get('Key') == location[1]:
+                    tag['Value'] = value
+            continue
+        parent = _getPath(resource, list(location[:-1]))
+        if type(parent) is dict and location[-1] in parent:
+            parent[location[-1]] = value
+
+
+def normalizeResource(resource: dict):
+    """
+    Returns a copy of the resource without its volatile values, two resources are materially equal if their normalized versions are equal
+    """
+    normalized = copyTree(resource)
+    for location in getVolatileValues(resource).keys():
+        if location[0] == 'Tags':
+            normalized['Properties']['Tags'] = [tag for tag in normalized['Properties']['Tags'] if tag.get('Key') != location[1]]
+        else:
+            del _getPath(normalized, list(location[:-1]))[location[-1]]
+    return normalized
+
+
+class TemplateDiff:
+    """
+    Semantic diff of two versions of a CFN template, volatile values are ignored
+    """
+
+    def __init__(self, previous: dict, current: dict):
+        previousResources = (previous or {}).get('Resources', {})
+        currentResources = current.get('Resources', {})
+        self.added = sorted(set(currentResources.keys()) - set(previousResources.keys()))
+        self.removed = sorted(set(previousResources.keys()) - set(currentResources.keys()))
+        self.changed = []
+        self.unchanged = []
+        for logicalId in sorted(set(currentResources.keys()) & set(previousResources.keys())):
+            if normalizeResource(currentResources[logicalId]) == normalizeResource(previousResources[logicalId]):
+                self.unchanged.append(logicalId)
+            else:
+                self.changed.append(logicalId)
+
+        previousParameters = (previous or {}).get('Parameters', {})
+        currentParameters = current.get('Parameters', {})
+        self.changedParameters = sorted(name for name in set(previousParameters.keys()) | set(currentParameters.keys())
+                                        if previousParameters.get(name) != currentParameters.get(name))
+        self.outputsChanged = (previous or {}).get('Outputs') != current.get('Outputs')
+
+    def getChangedResources(self):
+        return self.added + self.removed + self.changed
+
+    def hasMaterialChanges(self):
+        return len(self.getChangedResources()) > 0 or len(self.changedParameters) > 0 or self.outputsChanged
+
+
+def reuseVolatileValues(previous: dict, current: dict, logicalIds: list, notBefore: str = None):
+    """
+    Copies the volatile values of the given (materially unchanged) resources from the previous template into the current one, so they are
+    serialized exactly as before. Date-time values earlier than notBefore (same '%Y-%m-%dT%H:%M:%SZ' format) are stale and are not reused
+    """
+    for logicalId in logicalIds:
+        values = getVolatileValues(previous['Resources'][logicalId])
+        if notBefore is not None:
+            values = {location: value for location, value in values.items() if location[-1] != 'StartAfterDateTime' or str(value) >= notBefore}
+        setVolatileValues(current['Resources'][logicalId], values)
+    return current
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# helpers are imported as a top level package, the same way the lambda handler imports them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,92 @@
+import json
+import time
+import pytest
+from helpers.export_jobs import ExportJobPending, JitteredBackoff, pollExportJob, runExportJob
+from helpers.export_stub import LocalAssetBundleExportStub
+
+
+ACCOUNT_ID = '111111111111'
+RESOURCE_ARNS = ['arn:aws:quicksight:us-east-1:111111111111:analysis/ana-1']
+
+
+class MemoryExportJobStore:
+    """
+    In memory stand-in of S3ExportJobStore, jobs go through a JSON round trip as they do in S3
+    """
+
+    def __init__(self):
+        self.body = None
+
+    def save(self, job: dict):
+        self.body = json.dumps(job)
+
+    def loadPending(self):
+        job = json.loads(self.body) if self.body is not None else None
+        return job if job is not None and not job.get('Completed', False) else None
+
+    def complete(self, job: dict):
+        self.save(dict(job, Completed=True))
+
+
+@pytest.fixture
+def stub(tmp_path):
+    bundle = tmp_path / 'bundle.json'
+    bundle.write_text('{"Resources": {}}')
+    return LocalAssetBundleExportStub(bundleFile=str(bundle), durationSeconds=0.2, stateFile=str(tmp_path / 'jobs.json'))
+
+
+def invoke(stub, store, jobId: str, waitSeconds: float, resourceArns: list = RESOURCE_ARNS):
+    """
+    Runs the export job the way an invocation does: resumes the job pending in the store or starts jobId, waiting at most waitSeconds
+    """
+    def start():
+        stub.start_asset_bundle_export_job(AwsAccountId=ACCOUNT_ID, AssetBundleExportJobId=jobId, ResourceArns=resourceArns)
+        return {'JobId': jobId, 'JobStatus': 'QUEUED_FOR_IMMEDIATE_EXECUTION', 'StartedAt': str(time.time()), 'ResourceArns': resourceArns, 'Remap': True}
+
+    def wait(job):
+        deadline = time.monotonic() + waitSeconds
+        return pollExportJob(describe=lambda: stub.describe_asset_bundle_export_job(AwsAccountId=ACCOUNT_ID, AssetBundleExportJobId=job['JobId']),
+                             backoff=JitteredBackoff(initialDelay=0.01, maxDelay=0.05), remainingSeconds=lambda: deadline - time.monotonic())
+
+    return runExportJob(pendingJob=store.loadPending(), resourceArns=resourceArns, remap=True, start=start, wait=wait, store=store)
+
+
+def test_job_left_in_progress_is_resumed_until_successful(stub):
+    store = MemoryExportJobStore()
+
+    with pytest.raises(ExportJobPending) as pending:
+        invoke(stub, store, jobId='job-1', waitSeconds=0)
+    assert pending.value.job['JobId'] == 'job-1'
+    assert store.loadPending()['JobStatus'] == 'IN_PROGRESS'
+
+    job, ret = invoke(stub, store, jobId='job-2', waitSeconds=5)
+
+    # the pending job was resumed instead of starting job-2
+    assert job['JobId'] == 'job-1'
+    assert ret['JobStatus'] == 'SUCCESSFUL'
+    assert ret['DownloadUrl'].endswith('bundle.json')
+    assert store.loadPending() is None
+
+
+def test_pending_job_of_other_assets_is_not_resumed(stub):
+    store = MemoryExportJobStore()
+    with pytest.raises(ExportJobPending):
+        invoke(stub, store, jobId='job-1', waitSeconds=0)
+
+    job, ret = invoke(stub, store, jobId='job-2', waitSeconds=5, resourceArns=RESOURCE_ARNS + ['arn:aws:quicksight:us-east-1:111111111111:analysis/ana-2'])
+
+    assert job['JobId'] == 'job-2'
+    assert ret['JobStatus'] == 'SUCCESSFUL'
+
+
+def test_pending_job_that_no_longer_exists_is_started_again(stub, tmp_path):
+    store = MemoryExportJobStore()
+    with pytest.raises(ExportJobPending):
+        invoke(stub, store, jobId='job-1', waitSeconds=0)
+    # the export service forgot the job
+    (tmp_path / 'jobs.json').write_text('{}')
+
+    job, ret = invoke(stub, store, jobId='job-2', waitSeconds=5)
+
+    assert job['JobId'] == 'job-2'
+    assert ret['JobStatus'] == 'SUCCESSFUL'
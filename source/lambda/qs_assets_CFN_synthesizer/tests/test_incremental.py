@@ -0,0 +1,133 @@
+import copy
+from helpers.incremental import getResourceOwnership, getOutputOwnership, mergeTemplates
+
+
+ASSET_IDS = {
+    'dash-1': ['dash-1', 'ana-1', 'dset-shared', 'dset-1', 'ds-1'],
+    'dash-2': ['dash-2', 'ana-2', 'dset-shared', 'ds-1']
+}
+
+
+def dataSource(dataSourceId: str):
+    return {'Type': 'AWS::QuickSight::DataSource', 'Properties': {'DataSourceId': dataSourceId, 'Name': {'Ref': 'DataSourceName'}}}
+
+
+def dataSet(dataSetId: str, dataSourceLogicalId: str, parameter: str = None):
+    properties = {'DataSetId': dataSetId, 'DataSourceArn': {'Fn::GetAtt': [dataSourceLogicalId, 'Arn']}}
+    if parameter is not None:
+        properties['Name'] = {'Ref': parameter}
+    return {'Type': 'AWS::QuickSight::DataSet', 'Properties': properties, 'DependsOn': [dataSourceLogicalId]}
+
+
+def analysis(analysisId: str, dataSetLogicalIds: list):
+    return {'Type': 'AWS::QuickSight::Analysis', 'Properties': {'AnalysisId': analysisId, 'DataSets': [{'Fn::GetAtt': [logicalId, 'Arn']} for logicalId in dataSetLogicalIds]}}
+
+
+def analysisOutput(analysisId: str):
+    return {'AnalysisURL': {'Description': 'URL of the analysis', 'Value': 'https://us-east-1.quicksight.aws.amazon.com/sn/analyses/{id}'.format(id=analysisId)}}
+
+
+def fullSynthesis():
+    """
+    Dest template of a full synthesis of dash-1 and dash-2 (processed in id order, so the outputs are the ones of dash-2), both analyses use the shared
+    dataset, only dash-1 uses dset-1 and its parameter
+    """
+    return {
+        'Parameters': {
+            'DataSourceName': {'Type': 'String'},
+            'DataSetOneName': {'Type': 'String'}
+        },
+        'Resources': {
+            'DataSourceOne': dataSource('ds-1'),
+            'DataSetShared': dataSet('dset-shared', 'DataSourceOne'),
+            'DataSetOne': dataSet('dset-1', 'DataSourceOne', parameter='DataSetOneName'),
+            'AnalysisOne': analysis('ana-1', ['DataSetShared', 'DataSetOne']),
+            'AnalysisTwo': analysis('ana-2', ['DataSetShared'])
+        },
+        'Outputs': analysisOutput('ana-2')
+    }
+
+
+def merge(previous: dict, partial: dict, dashboardId: str):
+    ownership = getResourceOwnership(template=previous, assetIdsByDashboard=ASSET_IDS)
+    outputOwnership = getOutputOwnership(template=previous, assetIdsByDashboard=ASSET_IDS, ownership=ownership)
+    return mergeTemplates(previous=previous, partial=partial, ownership=ownership, dashboardId=dashboardId, outputOwnership=outputOwnership,
+                          dashboardOrder=sorted(ASSET_IDS.keys()))
+
+
+def test_ownership_includes_shared_and_referenced_resources():
+    ownership = getResourceOwnership(template=fullSynthesis(), assetIdsByDashboard=ASSET_IDS)
+
+    assert ownership['dash-1'] == ['DataSourceOne', 'DataSetShared', 'DataSetOne', 'AnalysisOne']
+    assert ownership['dash-2'] == ['DataSourceOne', 'DataSetShared', 'AnalysisTwo']
+
+
+def test_removed_resource_and_its_parameter_are_dropped():
+    # dash-1 no longer uses dset-1
+    partial = {
+        'Parameters': {'DataSourceName': {'Type': 'String'}},
+        'Resources': {
+            'DataSourceOne': dataSource('ds-1'),
+            'DataSetShared': dataSet('dset-shared', 'DataSourceOne'),
+            'AnalysisOne': analysis('ana-1', ['DataSetShared'])
+        },
+        'Outputs': analysisOutput('ana-1')
+    }
+
+    merged = merge(previous=fullSynthesis(), partial=partial, dashboardId='dash-1')
+
+    assert 'DataSetOne' not in merged['Resources']
+    assert 'DataSetOneName' not in merged['Parameters']
+    assert 'DataSourceName' in merged['Parameters']
+    assert merged['Resources']['AnalysisOne'] == partial['Resources']['AnalysisOne']
+    assert list(merged['Resources'].keys()) == ['DataSourceOne', 'DataSetShared', 'AnalysisOne', 'AnalysisTwo']
+
+
+def test_shared_dataset_is_kept_when_only_one_dashboard_drops_it():
+    # dash-1 stops using the shared dataset, dash-2 still uses it
+    partial = {
+        'Parameters': {'DataSourceName': {'Type': 'String'}, 'DataSetOneName': {'Type': 'String'}},
+        'Resources': {
+            'DataSourceOne': dataSource('ds-1'),
+            'DataSetOne': dataSet('dset-1', 'DataSourceOne', parameter='DataSetOneName'),
+            'AnalysisOne': analysis('ana-1', ['DataSetOne'])
+        }
+    }
+
+    merged = merge(previous=fullSynthesis(), partial=partial, dashboardId='dash-1')
+
+    assert merged['Resources']['DataSetShared'] == fullSynthesis()['Resources']['DataSetShared']
+    assert merged['Resources']['AnalysisTwo'] == fullSynthesis()['Resources']['AnalysisTwo']
+    assert merged['Resources']['AnalysisOne'] == partial['Resources']['AnalysisOne']
+
+
+def test_shared_dataset_changed_by_the_updated_dashboard_is_replaced():
+    partial = copy.deepcopy(fullSynthesis())
+    del partial['Resources']['AnalysisTwo']
+    partial['Resources']['DataSetShared']['Properties']['ImportMode'] = 'SPICE'
+    partial['Outputs'] = analysisOutput('ana-1')
+
+    merged = merge(previous=fullSynthesis(), partial=partial, dashboardId='dash-1')
+
+    assert merged['Resources']['DataSetShared']['Properties']['ImportMode'] == 'SPICE'
+    assert 'AnalysisTwo' in merged['Resources']
+
+
+def test_outputs_are_rebuilt_in_dashboard_order():
+    # dash-1 is not the last dashboard processed, the outputs of dash-2 are kept
+    partial = {'Resources': {'AnalysisOne': analysis('ana-1', ['DataSetShared'])}, 'Outputs': analysisOutput('ana-1-renamed')}
+    merged = merge(previous=fullSynthesis(), partial=partial, dashboardId='dash-1')
+    assert merged['Outputs'] == analysisOutput('ana-2')
+
+    # dash-2 is the last one, its new outputs replace the previous ones
+    partial = {'Resources': {'AnalysisTwo': analysis('ana-2', ['DataSetShared'])}, 'Outputs': {'AnalysisURL': {'Description': 'URL of the analysis', 'Value': 'https://new/ana-2'}}}
+    merged = merge(previous=fullSynthesis(), partial=partial, dashboardId='dash-2')
+    assert merged['Outputs'] == partial['Outputs']
+
+
+def test_outputs_removed_by_the_updated_dashboard_are_dropped():
+    partial = {'Resources': {'AnalysisTwo': analysis('ana-2', ['DataSetShared'])}}
+
+    merged = merge(previous=fullSynthesis(), partial=partial, dashboardId='dash-2')
+
+    assert 'Outputs' not in merged